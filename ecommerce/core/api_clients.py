@@ -0,0 +1,100 @@
+"""
+Process-wide registry of the API clients used to call other services on behalf of a site.
+
+Clients are shared by all requests served by the process, per site and service, so that their pooled keep-alive
+HTTP connections are reused instead of opening a new TCP and TLS session for every request. The site's access
+token is attached to each outgoing request, rather than to the client, so that a long-lived client picks up the
+refreshed token once the cached one is about to expire.
+"""
+
+
+import threading
+
+from django.conf import settings
+from edx_rest_api_client.client import EdxRestApiClient
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """ HTTP adapter which applies a default timeout to the requests which do not set one. """
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super(TimeoutHTTPAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super(TimeoutHTTPAdapter, self).send(request, **kwargs)
+
+
+class SiteAccessTokenAuth(AuthBase):
+    """ Attaches the current access token of the site's service user to each request. """
+
+    def __init__(self, site_configuration):
+        self.site_configuration = site_configuration
+
+    def __call__(self, r):
+        r.headers['Authorization'] = 'JWT {}'.format(self.site_configuration.access_token)
+        return r
+
+
+def _get_client_fingerprint(site_configuration, url, client_kwargs):
+    """ Returns the values which, when changed, require the client of a site and service to be rebuilt. """
+    return (
+        url,
+        tuple(sorted(client_kwargs.items())),
+        site_configuration.oauth2_provider_url,
+        site_configuration.oauth_settings.get('BACKEND_SERVICE_EDX_OAUTH2_KEY'),
+    )
+
+
+def _create_client(site_configuration, service, url, client_kwargs):
+    adapter = TimeoutHTTPAdapter(
+        timeout=settings.API_CLIENT_TIMEOUTS.get(service, settings.API_CLIENT_TIMEOUT),
+        pool_maxsize=settings.API_CLIENT_POOL_MAXSIZE,
+    )
+    client = EdxRestApiClient(url, **client_kwargs)
+    session = client._store['session']  # pylint: disable=protected-access
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.auth = SiteAccessTokenAuth(site_configuration)
+    return client
+
+
+def get_site_api_client(site_configuration, service, url, **client_kwargs):
+    """
+    Returns the shared API client of the given site and service.
+
+    Args:
+        site_configuration (SiteConfiguration): Configuration of the site calling the service.
+        service (str): Name of the service, used to look up its timeout in API_CLIENT_TIMEOUTS.
+        url (str): Root URL of the service API.
+        **client_kwargs: Additional arguments of EdxRestApiClient, e.g. append_slash.
+
+    Returns:
+        EdxRestApiClient
+    """
+    key = (site_configuration.id, service)
+    fingerprint = _get_client_fingerprint(site_configuration, url, client_kwargs)
+
+    entry = _clients.get(key)
+    if entry is None or entry[0] != fingerprint:
+        with _clients_lock:
+            entry = _clients.get(key)
+            if entry is None or entry[0] != fingerprint:
+                entry = (fingerprint, _create_client(site_configuration, service, url, client_kwargs))
+                _clients[key] = entry
+    return entry[1]
+
+
+def clear_site_api_clients(site_configuration_id=None):
+    """ Discards the shared API clients of the given site, or of all sites if no site is given. """
+    with _clients_lock:
+        for key in list(_clients):
+            if site_configuration_id is None or key[0] == site_configuration_id:
+                del _clients[key]
@@ -64,6 +64,113 @@ ALLOW_MISSING_LMS_USER_ID = 'allow_missing_lms_user_id'
 # .. toggle_status: supported
 HUBSPOT_FORMS_INTEGRATION_ENABLE = "hubspot_forms_integration_enable"
 
+# .. toggle_name: enable_concurrent_fulfillment
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for sending the LMS enrollment and entitlement requests of an order's lines
+#   concurrently, over a thread pool of at most FULFILLMENT_MAX_WORKERS threads, instead of one after another
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+CONCURRENT_FULFILLMENT_SWITCH = 'enable_concurrent_fulfillment'
+
+# .. toggle_name: enable_shared_api_clients
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for sharing the Discovery, LMS and Enterprise API clients of a site between the
+#   requests of a process, so that their pooled keep-alive connections are reused
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+SHARED_API_CLIENTS_SWITCH = 'enable_shared_api_clients'
+
+# .. toggle_name: enable_program_ownership_snapshot
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for evaluating program offers against a cached snapshot of the user's enrollments and
+#   entitlements, which is updated by fulfillment and refreshed in the background, instead of retrieving them from
+#   the LMS every LMS_API_CACHE_TIMEOUT seconds
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+PROGRAM_OWNERSHIP_SNAPSHOT_SWITCH = 'enable_program_ownership_snapshot'
+
+# .. toggle_name: enable_enterprise_discount_ledger
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for reading the bookings of enterprise offers, when checking the per user bookings
+#   limit and sending offer usage emails, from the running totals of the offer discount ledgers, instead of summing
+#   the discounts of the completed orders
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+ENTERPRISE_DISCOUNT_LEDGER_SWITCH = 'enable_enterprise_discount_ledger'
+
+# .. toggle_name: enable_enterprise_catalog_list_lookup
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for determining which catalogs of an enterprise contain the course run in a basket
+#   with a single Enterprise Catalog API request, shared by all of the enterprise's offers, instead of one request
+#   per offer catalog. Requires the get_catalog_list parameter of the contains_content_items endpoint.
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+ENTERPRISE_CATALOG_LIST_SWITCH = 'enable_enterprise_catalog_list_lookup'
+
+# .. toggle_name: enable_cybersource_shared_soap_client
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for sharing the CyberSource SOAP client, built from a WSDL cached on disk, between the
+#   credits and Apple Pay authorizations of a process, instead of downloading and parsing the WSDL for each of them
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+CYBERSOURCE_SHARED_SOAP_CLIENT_SWITCH = 'enable_cybersource_shared_soap_client'
+
+# .. toggle_name: enable_basket_line_display_cache
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for caching the display data of the products in baskets (course metadata, SKUs,
+#   switch link and certificate type), used by the basket summary and payment API, per site, language and version
+#   of the product, instead of building it for every line of every request
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+BASKET_LINE_DISPLAY_CACHE_SWITCH = 'enable_basket_line_display_cache'
+
+# .. toggle_name: enable_shared_segment_clients
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for sharing the Segment client of a Segment key between the requests of a process,
+#   with a bounded queue uploaded in batches by a single consumer thread, instead of creating a client, queue and
+#   thread for every loaded site configuration. See ecommerce.core.segment_clients.
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+SHARED_SEGMENT_CLIENTS_SWITCH = 'enable_shared_segment_clients'
+
+# .. toggle_name: enable_async_post_checkout_side_effects
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for running the side effects of placed orders which are not needed to complete them,
+#   i.e. the order completed tracking event and purchase email, in the background once the order is committed,
+#   instead of in the request placing the order. See ecommerce.extensions.checkout.side_effects.
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+POST_CHECKOUT_SIDE_EFFECTS_SWITCH = 'enable_async_post_checkout_side_effects'
+
+# .. toggle_name: enable_active_offer_index
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for looking up the program, enterprise and site offers applied to baskets in the
+#   process-local active offer index, instead of querying them for every basket. See
+#   ecommerce.extensions.offer.applicator.ActiveOfferIndex.
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+ACTIVE_OFFER_INDEX_SWITCH = 'enable_active_offer_index'
+
+# .. toggle_name: enable_catalog_query_membership_prefetch
+# .. toggle_implementation: WaffleSwitch
+# .. toggle_default: False
+# .. toggle_description: Toggle for resolving the catalog query membership of the basket lines for the benefit ranges
+#   of all the offers applied to a basket at once, before the offers are applied, instead of for each benefit as it
+#   is applied. See ecommerce.extensions.offer.applicator.Applicator.apply_offers.
+# .. toggle_use_cases: open_edx
+# .. toggle_status: supported
+CATALOG_QUERY_MEMBERSHIP_PREFETCH_SWITCH = 'enable_catalog_query_membership_prefetch'
+
 
 class Status:
     """Health statuses."""
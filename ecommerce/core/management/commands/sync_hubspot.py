@@ -1,5 +1,9 @@
 """
 Django management command to Sync Product, Orders and Lines to Hubspot server.
+
+The carts of each site are synced incrementally: a run syncs the carts created or submitted since the previous run,
+in chunks of carts whose batches are uploaded concurrently. The progress of a run is persisted, per site, once Hubspot
+has acknowledged each chunk, so that a failed run is resumed by the next one instead of restarting from scratch.
 """
 
 
@@ -7,12 +11,14 @@ import json
 import logging
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal as D
 
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from django.utils.timezone import now
 from edx_rest_api_client.client import EdxRestApiClient
 from oscar.core.loading import get_class, get_model
 from slumber.exceptions import HttpClientError, HttpServerError
@@ -24,13 +30,15 @@ CartLine = get_model('basket', 'Line')
 Order = get_model('order', 'Order')
 OrderLine = get_model('order', 'Line')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
-Product = get_model('catalogue', 'Product')
+HubspotSyncState = get_model('core', 'HubspotSyncState')
 SiteConfiguration = get_model('core', 'SiteConfiguration')
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
 DEFAULT_INITIAL_DAYS = 1
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_WORKERS = 4
 HUBSPOT_API_BASE_URL = 'https://api.hubapi.com'
 HUBSPOT_ECOMMERCE_SETTINGS = {
     'enabled': True,
@@ -173,11 +181,17 @@ PRODUCT = "PRODUCT"
 LINE_ITEM = "LINE_ITEM"
 DEAL = "DEAL"
 BATCH_SIZE = 200
+MAX_RETRIES = 5
+# Delay, in seconds, before retrying a rate limited or failed batch, doubled at every retry.
+RETRY_DELAY = 1
+TOO_MANY_REQUESTS = 429
 
 
 class Command(BaseCommand):
     help = 'Sync Product, Orders and Lines to Hubspot server.'
     initial_sync_days = None
+    chunk_size = None
+    workers = None
 
     def _get_hubspot_enable_sites(self):
         """
@@ -265,7 +279,7 @@ class Command(BaseCommand):
     def _get_carts_extra_properties(self, cart):
         total_price = D(0.0)
         description = ''
-        lines = cart.all_lines()
+        lines = cart.lines.all()
         for line in lines:
             total_price += self._get_cart_line_prices(line, 'price_incl_tax')
             description += self._get_cart_line_information(line)
@@ -302,9 +316,14 @@ class Command(BaseCommand):
             })
         return hubspot_contacts
 
-    def _get_hubspot_deal_structure(self, carts, partner):
+    def _get_hubspot_deal_structure(self, carts, orders, partner):
         """
         Returns list of dicts, each dict represents hubspot DEAL.
+
+        Arguments:
+            carts (list): Carts, with their lines prefetched.
+            orders (dict): Orders of the submitted carts, keyed by cart id.
+            partner (Partner): Partner of the site of the carts.
         """
         hubspot_deals = []
         for cart in carts:
@@ -315,22 +334,22 @@ class Command(BaseCommand):
                 'propertyNameToValues': {}
             }
             total_price, description = self._get_carts_extra_properties(cart)
-            if cart.status == Basket.SUBMITTED:
-                order = Order.objects.filter(basket=cart).first()
+            order = orders.get(cart.id)
+            if order:
                 deal['propertyNameToValues'] = {
                     'deal_name': order.number,
                     'total_incl_tax': float(order.total_incl_tax),
                     'checkout_status': ORDER_TO_HUBSPOT_STATUS.get(order.status),
                     'date_placed': self._get_timestamp(date=order.date_placed),
                     'number': order.number,
-                    'user_id': str(order.user.id) if order.user else ''
+                    'user_id': str(order.user_id) if order.user_id else ''
                 }
             else:
                 deal['propertyNameToValues'] = {
                     'deal_name': OrderNumberGenerator().order_number_from_basket_id(partner, cart.id),
                     'total_incl_tax': total_price,
                     'checkout_status': BASKET_TO_HUBSPOT_STATUS.get(cart.status),
-                    'user_id': str(cart.owner.id) if cart.owner else ''
+                    'user_id': str(cart.owner_id) if cart.owner_id else ''
                 }
             deal['propertyNameToValues']['description'] = description
             hubspot_deals.append(deal)
@@ -349,10 +368,10 @@ class Command(BaseCommand):
                 'action': 'UPSERT',
                 'changeOccurredTimestamp': self._get_timestamp(),
                 'propertyNameToValues': {
-                    'order_id': str(line.basket.id),
+                    'order_id': str(line.basket_id),
                     'price_currency': str(line.price_currency),
                     'tax': float(line_price_incl_tax - line_price_excl_tax),
-                    'product_id': str(line.product.id),
+                    'product_id': str(line.product_id),
                     'price_incl_tax': float(line_price_incl_tax),
                     'price_excl_tax': float(line_price_excl_tax),
                     'quantity': line.quantity
@@ -381,47 +400,95 @@ class Command(BaseCommand):
             })
         return hubspot_products
 
-    def _upsert_hubspot_objects(self, object_type, objects, site_configuration):
+    def _get_retry_delay(self, response, attempt):
         """
-        Calls the sync message endpoint on given objects (PRODUCT, DEAL
-        and LINE_ITEM) and each request can has 200 (BATCH_SIZE) objects.
+        Returns the number of seconds to wait before retrying a batch, as requested by Hubspot if it rate limited the
+        batch, otherwise RETRY_DELAY doubled at every attempt.
         """
         try:
-            total = len(objects)
-            for start in range(0, total, BATCH_SIZE):
-                batch = objects[start:start + BATCH_SIZE]
-                self.stdout.write(
-                    'Syncing {object_type}s batch from {start} to {end} of total: {total} for site {site}'.format(
-                        object_type=object_type,
-                        start=start,
-                        end=start + BATCH_SIZE,
-                        total=total,
-                        site=site_configuration.site.domain
-                    )
-                )
-                self._hubspot_endpoint(
+            return float(response.headers['Retry-After'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return RETRY_DELAY * 2 ** attempt
+
+    def _upsert_hubspot_batch(self, object_type, batch, site_configuration):
+        """
+        Calls the sync message endpoint on given batch, retrying it if Hubspot rate limited it or failed.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return self._hubspot_endpoint(
                     object_type,
                     'extensions/ecomm/v1/sync-messages/',
                     'PUT',
                     body=batch,
                     hapikey=site_configuration.hubspot_secret_key
                 )
-                self.stdout.write(
-                    'Successfully synced {object_type}s batch from {start} to {end} of total: '
-                    '{total} for site {site}'.format(
-                        object_type=object_type,
-                        start=start,
-                        end=start + BATCH_SIZE,
-                        total=total,
-                        site=site_configuration.site.domain
-                    )
+            except (HttpClientError, HttpServerError) as ex:
+                response = getattr(ex, 'response', None)
+                rate_limited = getattr(response, 'status_code', None) == TOO_MANY_REQUESTS
+                if attempt == MAX_RETRIES or not (rate_limited or isinstance(ex, HttpServerError)):
+                    raise
+                delay = self._get_retry_delay(response, attempt)
+                logger.warning(
+                    'Retrying %s batch for site %s in %s seconds: %s',
+                    object_type, site_configuration.site.domain, delay, ex
                 )
+                time.sleep(delay)
+        return None
+
+    def _sync_hubspot_batch(self, object_type, start, total, batch, site_configuration):
+        self.stdout.write(
+            'Syncing {object_type}s batch from {start} to {end} of total: {total} for site {site}'.format(
+                object_type=object_type,
+                start=start,
+                end=start + BATCH_SIZE,
+                total=total,
+                site=site_configuration.site.domain
+            )
+        )
+        self._upsert_hubspot_batch(object_type, batch, site_configuration)
+        self.stdout.write(
+            'Successfully synced {object_type}s batch from {start} to {end} of total: '
+            '{total} for site {site}'.format(
+                object_type=object_type,
+                start=start,
+                end=start + BATCH_SIZE,
+                total=total,
+                site=site_configuration.site.domain
+            )
+        )
+
+    def _upsert_hubspot_objects(self, object_type, objects, site_configuration):
+        """
+        Calls the sync message endpoint on given objects (PRODUCT, DEAL
+        and LINE_ITEM) and each request can has 200 (BATCH_SIZE) objects.
+        The batches are uploaded concurrently by up to `workers` threads.
+
+        Returns:
+            bool: True if all the batches have been synced.
+        """
+        total = len(objects)
+        batches = [
+            (object_type, start, total, objects[start:start + BATCH_SIZE], site_configuration)
+            for start in range(0, total, BATCH_SIZE)
+        ]
+        try:
+            if self.workers > 1 and len(batches) > 1:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as executor:
+                    futures = [executor.submit(self._sync_hubspot_batch, *batch) for batch in batches]
+                    for future in futures:
+                        future.result()
+            else:
+                for batch in batches:
+                    self._sync_hubspot_batch(*batch)
         except (HttpClientError, HttpServerError) as ex:
             self.stderr.write(
                 'An error occurred while upserting {object_type} for site {site}: {message}'.format(
                     object_type=object_type, site=site_configuration.site.domain, message=ex
                 )
             )
+            return False
+        return True
 
     def _call_sync_errors_messages_endpoint(self, site_configuration):
         """
@@ -450,54 +517,120 @@ class Command(BaseCommand):
                 )
             )
 
-    def _get_unsynced_carts(self, site_configuration):
-        carts = Basket.objects.filter(site=site_configuration.site, lines__isnull=False)
-        start_date = datetime.now().date() - timedelta(self.initial_sync_days)
-        unsynced_carts = carts.filter(
-            Q(date_created__date=start_date) | Q(date_submitted__date=start_date)
+    def _get_sync_state(self, site_configuration):
+        """
+        Returns the sync state of given site_configuration, starting a sync of the carts up to now unless the
+        previous one has been interrupted.
+        """
+        sync_state, __ = HubspotSyncState.objects.get_or_create(site_configuration=site_configuration)
+        if sync_state.window_end is None:
+            sync_state.window_end = now()
+            sync_state.save()
+        elif sync_state.last_synced_basket_id:
+            self.stdout.write(
+                'Resuming sync for site {site} after cart {basket_id}'.format(
+                    site=site_configuration.site.domain, basket_id=sync_state.last_synced_basket_id
+                )
+            )
+        return sync_state
+
+    def _get_unsynced_carts(self, site_configuration, sync_state):
+        """
+        Returns the ids, in ascending order, of the carts created or submitted since the previous sync, or the
+        initial sync days if the site has never been synced, which have not been synced by the current one.
+        """
+        if sync_state.synced_until:
+            start_date = sync_state.synced_until
+        else:
+            start_date = (now() - timedelta(self.initial_sync_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        end_date = sync_state.window_end
+
+        unsynced_carts = Basket.objects.filter(site=site_configuration.site, lines__isnull=False).filter(
+            Q(date_created__gt=start_date, date_created__lte=end_date) |
+            Q(date_submitted__gt=start_date, date_submitted__lte=end_date)
         )
+        if sync_state.last_synced_basket_id:
+            unsynced_carts = unsynced_carts.filter(id__gt=sync_state.last_synced_basket_id)
+        unsynced_cart_ids = list(unsynced_carts.order_by('id').values_list('id', flat=True).distinct())
         self.stdout.write(
             'Pulled unsynced carts for site {site} from {start_date} and total count is total: {count}'.format(
-                site=site_configuration.site.domain, start_date=start_date, count=unsynced_carts.count()
+                site=site_configuration.site.domain, start_date=start_date, count=len(unsynced_cart_ids)
             )
         )
-        return unsynced_carts
+        return unsynced_cart_ids
 
-    def _sync_data(self, site_configuration):
+    def _sync_carts(self, cart_ids, site_configuration):
         """
-        Create lists of Order, OrderLine and Product objects and
-        call upsert(PUT) sync-messages endpoint for each objects.
+        Loads the carts with given ids, with their lines, orders, users and products,
+        and call upsert(PUT) sync-messages endpoint for each objects.
+
+        Returns:
+            bool: True if all the objects have been synced.
         """
-        unsynced_carts = self._get_unsynced_carts(site_configuration)
-        if unsynced_carts:
-            # we need to exclude the CartLines without product
-            # because product is required in hubspot for LINE_ITEM.
-            unsynced_cart_lines = CartLine.objects.filter(basket__in=unsynced_carts).exclude(product=None)
-            unsynced_products = Product.objects.filter(basket_lines__in=unsynced_cart_lines)
-            unsynced_users = User.objects.filter(baskets__in=unsynced_carts)
+        carts = list(
+            Basket.objects.filter(id__in=cart_ids).order_by('id').prefetch_related(
+                Prefetch('lines', queryset=CartLine.objects.select_related('product__course').order_by('id'))
+            )
+        )
+        orders = {}
+        submitted_cart_ids = [cart.id for cart in carts if cart.status == Basket.SUBMITTED]
+        # The last placed order of a cart wins.
+        for order in Order.objects.filter(basket_id__in=submitted_cart_ids).order_by('date_placed'):
+            orders[order.basket_id] = order
+
+        # we need to exclude the CartLines without product
+        # because product is required in hubspot for LINE_ITEM.
+        cart_lines = [line for cart in carts for line in cart.lines.all() if line.product_id]
+        products = list({line.product_id: line.product for line in cart_lines}.values())
+        users = User.objects.filter(id__in={cart.owner_id for cart in carts if cart.owner_id})
+
+        # Deals are synced before their line items, which are associated with them.
+        return (
             self._upsert_hubspot_objects(
                 CONTACT,
-                self._get_hubspot_contact_structure(unsynced_users),
+                self._get_hubspot_contact_structure(users),
                 site_configuration
-            )
+            ) and
             self._upsert_hubspot_objects(
                 PRODUCT,
-                self._get_hubspot_product_structure(unsynced_products),
+                self._get_hubspot_product_structure(products),
                 site_configuration
-            )
+            ) and
             self._upsert_hubspot_objects(
                 DEAL,
-                self._get_hubspot_deal_structure(unsynced_carts, site_configuration.partner),
+                self._get_hubspot_deal_structure(carts, orders, site_configuration.partner),
                 site_configuration
-            )
+            ) and
             self._upsert_hubspot_objects(
                 LINE_ITEM,
-                self._get_hubspot_line_item_structure(unsynced_cart_lines),
+                self._get_hubspot_line_item_structure(cart_lines),
                 site_configuration
             )
+        )
+
+    def _sync_data(self, site_configuration):
+        """
+        Sync the unsynced carts in chunks of `chunk_size` carts, persisting the
+        last cart acknowledged by Hubspot after each chunk. If a chunk fails,
+        the next run resumes the sync from it.
+        """
+        sync_state = self._get_sync_state(site_configuration)
+        unsynced_cart_ids = self._get_unsynced_carts(site_configuration, sync_state)
+        if unsynced_cart_ids:
+            for start in range(0, len(unsynced_cart_ids), self.chunk_size):
+                chunk = unsynced_cart_ids[start:start + self.chunk_size]
+                if not self._sync_carts(chunk, site_configuration):
+                    return
+                sync_state.last_synced_basket_id = chunk[-1]
+                sync_state.save()
         else:
             self.stdout.write('No data found to sync for site {site}'.format(site=site_configuration.site.domain))
 
+        sync_state.synced_until = sync_state.window_end
+        sync_state.window_end = None
+        sync_state.last_synced_basket_id = None
+        sync_state.save()
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--initial-sync-days',
@@ -506,12 +639,28 @@ class Command(BaseCommand):
             type=int,
             help='Number of days before today to start initial sync',
         )
+        parser.add_argument(
+            '--chunk-size',
+            default=DEFAULT_CHUNK_SIZE,
+            dest='chunk_size',
+            type=int,
+            help='Number of carts synced before the progress of the sync is saved',
+        )
+        parser.add_argument(
+            '--workers',
+            default=DEFAULT_WORKERS,
+            dest='workers',
+            type=int,
+            help='Number of batches uploaded concurrently',
+        )
 
     def handle(self, *args, **options):
         """
         Main command handler.
         """
         self.initial_sync_days = options['initial_sync_days']
+        self.chunk_size = options['chunk_size']
+        self.workers = options['workers']
         try:
             site_configurations = self._get_hubspot_enable_sites()
             if not site_configurations:
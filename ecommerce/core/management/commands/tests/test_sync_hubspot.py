@@ -8,10 +8,13 @@ from io import StringIO
 
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from factory.django import get_model
-from mock import patch
+from mock import Mock, patch
 from slumber.exceptions import HttpClientError
 
+from ecommerce.core.management.commands import sync_hubspot
 from ecommerce.core.management.commands.sync_hubspot import Command as sync_command
 from ecommerce.extensions.test.factories import create_basket, create_order
 from ecommerce.tests.factories import SiteConfigurationFactory, UserFactory
@@ -19,6 +22,7 @@ from ecommerce.tests.testcases import TestCase
 
 SiteConfiguration = get_model('core', 'SiteConfiguration')
 Basket = get_model('basket', 'Basket')
+HubspotSyncState = get_model('core', 'HubspotSyncState')
 
 DEFAULT_INITIAL_DAYS = 1
 
@@ -82,18 +86,35 @@ class TestSyncHubspotCommand(TestCase):
             {'objectType': 'PRODUCT', 'integratorObjectId': '4321', 'details': 'dummy-details-product'},
         ]}
 
-    def _get_command_output(self, is_stderr=False):
+    def _get_command_output(self, is_stderr=False, args=()):
         """
         Runs the command and returns the stdout or stderr output of command.
         """
         out = StringIO()
         initial_sync_days_param = '--initial-sync-day=' + str(DEFAULT_INITIAL_DAYS)
         if is_stderr:
-            call_command('sync_hubspot', initial_sync_days_param, stderr=out)
+            call_command('sync_hubspot', initial_sync_days_param, *args, stderr=out)
         else:
-            call_command('sync_hubspot', initial_sync_days_param, stdout=out)
+            call_command('sync_hubspot', initial_sync_days_param, *args, stdout=out)
         return out.getvalue()
 
+    def _get_synced_deal_ids(self, mocked_hubspot):
+        """
+        Returns the ids of the carts synced as deals by the mocked _hubspot_endpoint.
+        """
+        return [
+            deal['integratorObjectId']
+            for call in mocked_hubspot.call_args_list if call[0][0] == 'DEAL'
+            for deal in call[1]['body']
+        ]
+
+    def _get_cart_ids(self):
+        return [
+            str(cart_id) for cart_id in Basket.objects.filter(
+                site=self.hubspot_site_configuration.site
+            ).order_by('id').values_list('id', flat=True)
+        ]
+
     @patch.object(sync_command, '_hubspot_endpoint')
     def test_with_no_hubspot_secret_keys(self, mocked_hubspot):
         """
@@ -219,3 +240,89 @@ class TestSyncHubspotCommand(TestCase):
             with self.assertRaises(CommandError):
                 output = self._get_command_output(is_stderr=True)
                 self.assertIn('Command failed with ', output)
+
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_incremental_sync(self, mocked_hubspot):
+        """
+        Test the carts synced by a run are not synced again by the next one.
+        """
+        self._get_command_output()
+        self.assertEqual(self._get_synced_deal_ids(mocked_hubspot), self._get_cart_ids())
+        sync_state = HubspotSyncState.objects.get(site_configuration=self.hubspot_site_configuration)
+        self.assertIsNotNone(sync_state.synced_until)
+        self.assertIsNone(sync_state.window_end)
+
+        mocked_hubspot.reset_mock()
+        output = self._get_command_output()
+        self.assertIn('No data found to sync for site', output)
+        self.assertEqual(self._get_synced_deal_ids(mocked_hubspot), [])
+
+        basket = create_basket(site=self.hubspot_site_configuration.site)
+        self._get_command_output()
+        self.assertEqual(self._get_synced_deal_ids(mocked_hubspot), [str(basket.id)])
+
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_sync_resumed(self, mocked_hubspot):
+        """
+        Test a failed run is resumed by the next one from the last chunk of carts acknowledged by Hubspot.
+        """
+        first_cart_id, second_cart_id = self._get_cart_ids()
+
+        def fail_second_chunk(hubspot_object, api_url, method, body=None, **kwargs):  # pylint: disable=unused-argument
+            if hubspot_object == 'DEAL' and body[0]['integratorObjectId'] == second_cart_id:
+                raise HttpClientError
+            return {'results': []}
+
+        mocked_hubspot.side_effect = fail_second_chunk
+        output = self._get_command_output(True, ['--chunk-size=1'])
+        self.assertIn('An error occurred while upserting DEAL', output)
+        sync_state = HubspotSyncState.objects.get(site_configuration=self.hubspot_site_configuration)
+        self.assertEqual(str(sync_state.last_synced_basket_id), first_cart_id)
+        self.assertIsNone(sync_state.synced_until)
+
+        mocked_hubspot.reset_mock()
+        mocked_hubspot.side_effect = None
+        output = self._get_command_output(args=['--chunk-size=1'])
+        self.assertIn('Resuming sync for site', output)
+        self.assertEqual(self._get_synced_deal_ids(mocked_hubspot), [second_cart_id])
+        sync_state.refresh_from_db()
+        self.assertIsNone(sync_state.last_synced_basket_id)
+        self.assertIsNotNone(sync_state.synced_until)
+
+    @patch.object(sync_hubspot, 'RETRY_DELAY', 0)
+    @patch.object(sync_hubspot, 'BATCH_SIZE', 1)
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_rate_limited_batches_retried(self, mocked_hubspot):
+        """
+        Test the batches, uploaded concurrently, are retried when Hubspot rate limits them.
+        """
+        rate_limited = HttpClientError(response=Mock(status_code=429, headers={'Retry-After': '0'}))
+        attempts = []
+
+        def rate_limit_first_attempts(hubspot_object, api_url, method, body=None, **kwargs):  # pylint: disable=unused-argument
+            if hubspot_object == 'DEAL' and body[0]['integratorObjectId'] not in attempts:
+                attempts.append(body[0]['integratorObjectId'])
+                raise rate_limited
+            return {'results': []}
+
+        mocked_hubspot.side_effect = rate_limit_first_attempts
+        self.assertNotIn('An error occurred', self._get_command_output(True, ['--workers=2']))
+        self.assertEqual(sorted(self._get_synced_deal_ids(mocked_hubspot)), sorted(self._get_cart_ids() * 2))
+
+    def test_carts_loaded_in_constant_queries(self):
+        """
+        Test the carts, with their orders, lines, users and products, are loaded with a constant number of queries.
+        """
+        command = sync_command()
+        command.workers = 1
+
+        def count_queries():
+            cart_ids = [int(cart_id) for cart_id in self._get_cart_ids()]
+            with patch.object(sync_command, '_hubspot_endpoint'), CaptureQueriesContext(connection) as queries:
+                self.assertTrue(command._sync_carts(cart_ids, self.hubspot_site_configuration))  # pylint: disable=protected-access
+            return len(queries)
+
+        num_queries = count_queries()
+        self._create_basket(self.hubspot_site_configuration.site)
+        self._create_order('3344', self.hubspot_site_configuration.site)
+        self.assertEqual(count_queries(), num_queries)
@@ -4,17 +4,27 @@ Tests for Django management command to verify ecommerce transactions.
 
 
 import datetime
+import json
+from concurrent.futures import Executor, Future
+from io import StringIO
 
 import ddt
+import mock
 import pytz
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from oscar.core.loading import get_class, get_model
 from oscar.test.factories import OrderFactory, OrderLineFactory, ProductFactory
 
 from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.management.commands.tests.factories import PaymentEventFactory
-from ecommerce.core.management.commands.verify_transactions import DEFAULT_END_DELTA_TIME, DEFAULT_START_DELTA_TIME
+from ecommerce.core.management.commands.verify_transactions import (
+    DEFAULT_END_DELTA_TIME,
+    DEFAULT_START_DELTA_TIME,
+    verify_chunk
+)
 from ecommerce.tests.testcases import TestCase
 
 PaymentEventType = get_model('order', 'PaymentEventType')
@@ -22,6 +32,18 @@ PaymentEventTypeName = get_class('order.constants', 'PaymentEventTypeName')
 ProductClass = get_model('catalogue', 'ProductClass')
 
 
+class SerialExecutor(Executor):
+    """ Executor running the chunks of orders in the test process, which owns the test database. """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def submit(self, fn, *args, **kwargs):  # pylint: disable=arguments-differ
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
 @ddt.ddt
 class VerifyTransactionsTest(TestCase):
 
@@ -252,3 +274,54 @@ class VerifyTransactionsTest(TestCase):
         self.assertIn(str(refund.id), exception)
         self.assertIn('"amount": 90.0', exception)
         self.assertIn('"amount": 100.0', exception)
+
+    def _create_paid_order(self, total, payment_amounts):
+        order = OrderFactory(total_incl_tax=total, date_placed=self.timestamp)
+        OrderLineFactory(order=order, product=self.product, partner_sku='test_sku')
+        for amount in payment_amounts:
+            PaymentEventFactory(order=order, amount=amount, event_type_id=self.payevent.id)
+        order.save()
+        return order
+
+    def test_chunks_verified_in_parallel(self):
+        """ Verify the errors of all the chunks of orders are reported when they are verified by several workers """
+        mismatched_order = self._create_paid_order(50, [40])
+        self._create_paid_order(60, [60])
+
+        # The test database cannot be shared with worker processes.
+        with mock.patch('ecommerce.core.management.commands.verify_transactions.ProcessPoolExecutor',
+                        wraps=SerialExecutor) as mock_executor, \
+                mock.patch('ecommerce.core.management.commands.verify_transactions.connections'):
+            with self.assertRaises(CommandError) as cm:
+                call_command('verify_transactions', '--chunk-size=1', '--workers=2')
+        mock_executor.assert_called_once_with(max_workers=2)
+        exception = str(cm.exception)
+        self.assertIn("The following orders are without payments", exception)
+        self.assertIn('"order_id": {}'.format(self.order.id), exception)
+        self.assertIn("The following order totals mismatch payments received", exception)
+        self.assertIn('"order_id": {}'.format(mismatched_order.id), exception)
+
+    def test_stream(self):
+        """ Verify errors are written to stdout, one per line, and only counted in the exception, when streaming """
+        out = StringIO()
+        with self.assertRaises(CommandError) as cm:
+            call_command('verify_transactions', '--stream', stdout=out)
+        errors = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(errors, [{
+            'error': 'orders_no_payment',
+            'order': {'order_id': self.order.id, 'order_number': self.order.number, 'amount': 90.0},
+        }])
+        self.assertIn('"orders_no_payment": {"message": "The following orders are without payments", "count": 1}',
+                      str(cm.exception))
+
+    def test_chunk_verified_in_constant_queries(self):
+        """ Verify the number of queries verifying a chunk of orders does not depend on its number of orders """
+        def count_queries(order_ids):
+            with CaptureQueriesContext(connection) as queries:
+                verify_chunk(order_ids, self.payevent.id, self.refundevent.id)
+            return len(queries)
+
+        order_ids = [self.order.id, self._create_paid_order(50, [40]).id]
+        num_queries = count_queries(order_ids)
+        order_ids += [self._create_paid_order(60, [30, 30]).id, self._create_paid_order(70, [80]).id]
+        self.assertEqual(count_queries(order_ids), num_queries)
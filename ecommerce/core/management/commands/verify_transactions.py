@@ -25,20 +25,32 @@ Example output:
     'totals_mismatch': "Order totals mismatch with payments received.
     [('Order: 72 Amount: 100.00', 'Payment: 67 Amount: 10000.00'),
     ('Order: 71 Amount: 100.00', 'Payment: 65 Amount: 10.00')]"}
+
+Orders are verified in chunks of orders, with the payment totals, refund totals
+and lines of each chunk aggregated by order in the database. The payments of
+an order are only loaded if it has errors. Chunks can be verified in parallel
+by worker processes, so that long time windows, e.g. a month of orders run
+nightly, can be verified. With --stream, errors are written to stdout, one
+JSON object per line, as their chunks are verified, instead of being gathered
+into the CommandError.
 """
 import datetime
 import json
 import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import pytz
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Sum
+from django.db import connections
+from django.db.models import Count, Exists, OuterRef, Q, Sum
 from oscar.core.loading import get_class, get_model
 
 from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.utils import use_read_replica_if_available
 
 logger = logging.getLogger(__name__)
+Line = get_model('order', 'Line')
 Order = get_model('order', 'Order')
 PaymentEvent = get_model('order', 'PaymentEvent')
 PaymentEventType = get_model('order', 'PaymentEventType')
@@ -46,7 +58,144 @@ PaymentEventTypeName = get_class('order.constants', 'PaymentEventTypeName')
 
 DEFAULT_START_DELTA_TIME = 240
 DEFAULT_END_DELTA_TIME = 60
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_WORKERS = 1
 VALID_PRODUCT_CLASS_NAMES = [SEAT_PRODUCT_CLASS_NAME, COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME]
+ERROR_MESSAGES = {
+    'orders_no_payment': 'The following orders are without payments',
+    'orders_multi_payment': 'The following orders had multiple payments',
+    'orders_mismatched_totals': 'The following order totals mismatch payments received',
+    'orders_refund_exceeded': 'The following orders had excessive refunds',
+    'orders_mismatched_totals_support':
+        'There was a mismatch in the totals in the following order that require a refund',
+}
+
+
+def get_chunk_orders(order_ids, paid_event_type_id, refunded_event_type_id):
+    """
+    Returns the orders with given ids, annotated with the number and total of their payments, the total of their
+    refunds and whether they require a payment.
+    """
+    paid = Q(payment_events__event_type_id=paid_event_type_id)
+    refunded = Q(payment_events__event_type_id=refunded_event_type_id)
+    # We only expect immediate payments for Seats and Entitlements.
+    # The product class of child products is the one of their parent.
+    lines_requiring_payment = Line.objects.filter(order=OuterRef('pk')).filter(
+        Q(product__product_class__name__in=VALID_PRODUCT_CLASS_NAMES) |
+        Q(product__parent__product_class__name__in=VALID_PRODUCT_CLASS_NAMES)
+    )
+    return use_read_replica_if_available(
+        Order.objects.filter(id__in=order_ids).order_by('id').annotate(
+            payment_count=Count('payment_events', filter=paid),
+            payment_total=Sum('payment_events__amount', filter=paid),
+            refund_total=Sum('payment_events__amount', filter=refunded),
+            requires_payment=Exists(lines_requiring_payment),
+        )
+    )
+
+
+def create_error_dict(order, payments=None):
+    d = {}
+    d["order"] = {
+        "order_id": order.id,
+        "order_number": order.number,
+        "amount": float(order.total_incl_tax),
+    }
+    if payments:
+        d["payments"] = [
+            {
+                "payment_id": p.id,
+                "processor": p.processor_name,
+                "amount": float(p.amount),
+                "type": p.event_type.name,
+            }
+            for p in payments
+        ]
+    return d
+
+
+def validate_order(order):
+    """
+    Returns the tags of the errors of given annotated order, with the type name of the payment events to report with
+    each of them, if any.
+    """
+    errors = []
+
+    # If a coupon is used to purchase a product for the full price, there will be no PaymentEvent
+    # so we must also verify that order had a price > 0.
+    if order.payment_count == 0:
+        if order.requires_payment and order.total_incl_tax > 0:
+            errors.append(('orders_no_payment', None))
+
+    # We do not support multi-payment today, so flag this for review.
+    elif order.payment_count > 1:
+        errors.append(('orders_multi_payment', PaymentEventTypeName.PAID))
+
+    # If the payment total and the order total do not match, flag for review.
+    elif order.payment_total != order.total_incl_tax:
+        # FIXME: validate_order should be changed to log _all_ errors related to an order
+        errors.append(('orders_mismatched_totals', PaymentEventTypeName.PAID))
+
+    if order.refund_total is not None and order.refund_total > (order.payment_total or 0):
+        errors.append(('orders_refund_exceeded', PaymentEventTypeName.REFUNDED))
+
+    return errors
+
+
+def validate_order_support(order):
+    """
+    Returns the tags of the errors of given annotated order which require a refund from Support.
+    """
+    # If the payment total and the order total do not match, flag for review.
+    # FIXME: validate_order should be changed to log _all_ errors related to an order
+    # If payment amount > order amount, a refund is required from Support
+    if order.payment_count == 1 and order.payment_total > order.total_incl_tax:
+        return [('orders_mismatched_totals_support', PaymentEventTypeName.PAID)]
+    return []
+
+
+def verify_chunk(order_ids, paid_event_type_id, refunded_event_type_id, support=False):
+    """
+    Verifies the orders with given ids.
+
+    Returns:
+        list: (tag, error dict) of each error of the orders.
+    """
+    orders = get_chunk_orders(order_ids, paid_event_type_id, refunded_event_type_id)
+    validate = validate_order_support if support else validate_order
+    order_errors = [(order, validate(order)) for order in orders]
+    order_errors = [(order, errors) for order, errors in order_errors if errors]
+
+    # Only the payment events of the orders with errors are reported.
+    payment_events = defaultdict(lambda: defaultdict(list))
+    if order_errors:
+        events = use_read_replica_if_available(PaymentEvent.objects.filter(
+            order_id__in=[order.id for order, __ in order_errors],
+            event_type_id__in=[paid_event_type_id, refunded_event_type_id],
+        ).select_related('event_type').order_by('id'))
+        for event in events:
+            payment_events[event.order_id][event.event_type.name].append(event)
+
+    chunk_errors = []
+    for order, errors in order_errors:
+        for tag, event_type_name in errors:
+            payments = payment_events[order.id][event_type_name] if event_type_name else None
+            if tag == 'orders_mismatched_totals_support':
+                payment = payments[0]
+                error_dict = {
+                    "order_number": order.number,
+                    "order_id": order.id,
+                    "order_amount": float(order.total_incl_tax),
+                    # Assuming just one payment since we do not support multi-payment
+                    "payment_id": payment.id,
+                    "payment_amount": float(payment.amount),
+                    "user_email": order.guest_email,
+                    "refund_amount": float(payment.amount - order.total_incl_tax)
+                }
+            else:
+                error_dict = create_error_dict(order, payments)
+            chunk_errors.append((tag, error_dict))
+    return chunk_errors
 
 
 class Command(BaseCommand):
@@ -84,6 +233,25 @@ class Command(BaseCommand):
             action='store_true',
             help='Mismatched orders to go to Support'
         )
+        parser.add_argument(
+            '--chunk-size',
+            action='store',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of orders verified together.'
+        )
+        parser.add_argument(
+            '--workers',
+            action='store',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help='Number of worker processes verifying chunks of orders in parallel.'
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Write errors to stdout, one JSON object per line, as they are found.'
+        )
 
     def handle(self, *args, **options):
         logger.info("Verify transactions with options: %r", options)
@@ -96,40 +264,75 @@ class Command(BaseCommand):
         start_delta = options['start_delta']
         end_delta = options['end_delta']
         threshold = max(options['threshold'], 0)
+        stream = options['stream']
 
         start = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=start_delta)
         end = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=end_delta)
         logger.info("Start time: %s  --  End time: %s", start, end)
 
-        orders = use_read_replica_if_available(Order.objects.all()
-                                               .filter(date_placed__gte=start, date_placed__lt=end)
-                                               .prefetch_related('payment_events__event_type'))
-        logger.info("Number of orders to verify: %s", orders.count())
-        if orders.count() == 0:
+        order_ids = list(
+            use_read_replica_if_available(Order.objects.filter(date_placed__gte=start, date_placed__lt=end))
+            .order_by('id').values_list('id', flat=True)
+        )
+        num_orders = len(order_ids)
+        logger.info("Number of orders to verify: %s", num_orders)
+        if num_orders == 0:
             logger.info("No orders, DONE")
             return
 
+        error_counts = Counter()
+        for tag, error_dict in self.verify_orders(order_ids, options['chunk_size'], options['workers'], support):
+            error_counts[tag] += 1
+            if stream:
+                self.stdout.write(json.dumps(dict(error_dict, error=tag)))
+            else:
+                self.add_error(tag, ERROR_MESSAGES[tag], error_dict=error_dict)
+
+        if stream:
+            # The errors have already been written, only their numbers are reported.
+            self.ERRORS_DICT = {
+                tag: {"message": ERROR_MESSAGES[tag], "count": count} for tag, count in error_counts.items()
+            }
+
+        error_count = sum(error_counts.values())
         if support:
-            self.handle_support(orders)
+            self.handle_support(num_orders, error_count)
         else:
-            self.handle_alert(orders, threshold)
+            self.handle_alert(num_orders, error_count, threshold)
+
+    def verify_orders(self, order_ids, chunk_size, workers, support):
+        """
+        Yields the (tag, error dict) of each error of the orders with given ids, verified in chunks of chunk_size
+        orders by up to workers processes.
+        """
+        chunks = [order_ids[start:start + chunk_size] for start in range(0, len(order_ids), chunk_size)]
+        chunk_args = [self.PAID_EVENT_TYPE.id, self.REFUNDED_EVENT_TYPE.id, support]
+
+        if workers > 1 and len(chunks) > 1:
+            # Forked workers must not share the connections of this process.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                futures = [executor.submit(verify_chunk, chunk, *chunk_args) for chunk in chunks]
+                for future in futures:
+                    for error in future.result():
+                        yield error
+        else:
+            for chunk in chunks:
+                for error in verify_chunk(chunk, *chunk_args):
+                    yield error
 
-    def process_errors(self, orders):
+    def process_errors(self, num_orders, error_count):
         # FIXME: it is possible for an order to have more than one error, so this really should
         # count "unique orders with errors", not number of errors
-        error_count = sum([len(v["errors"]) for v in self.ERRORS_DICT.values()])
         exit_errors = json.dumps(self.ERRORS_DICT)
-        error_rate = float(error_count) / orders.count()
+        error_rate = float(error_count) / num_orders
 
         logger.info("Summary: %d errors, %.1f %%", error_count, error_rate * 100.0)
 
-        return error_count, exit_errors, error_rate
-
-    def handle_alert(self, orders, threshold):
-        for order in orders:
-            self.validate_order(order)
+        return exit_errors, error_rate
 
-        error_count, exit_errors, error_rate = self.process_errors(orders)
+    def handle_alert(self, num_orders, error_count, threshold):
+        exit_errors, error_rate = self.process_errors(num_orders, error_count)
 
         if threshold == 0 or threshold >= 1:
             threshold = int(threshold)
@@ -142,114 +345,15 @@ class Command(BaseCommand):
         if self.ERRORS_DICT:
             logger.warning("Errors in transactions within threshold (%r): %s", threshold, exit_errors)
 
-    def handle_support(self, orders):
-        for order in orders:
-            all_payment_events = order.payment_events
-            payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
-
-            # If the payment total and the order total do not match, flag for review.
-            if payments.count() == 1 and payments[0].amount != order.total_incl_tax:
-                mismatch_total = float(payments[0].amount - order.total_incl_tax)
-                # FIXME: validate_order should be changed to log _all_ errors related to an order
-                # If payment amount > order amount, a refund is required from Support
-                if mismatch_total > 0:
-                    error_dict = {
-                        "order_number": order.number,
-                        "order_id": order.id,
-                        "order_amount": float(order.total_incl_tax),
-                        # Assuming just one payment since we do not support multi-payment
-                        "payment_id": payments[0].id,
-                        "payment_amount": float(payments[0].amount),
-                        "user_email": order.guest_email,
-                        "refund_amount": mismatch_total
-                    }
-                    self.add_error(
-                        "orders_mismatched_totals_support",
-                        "There was a mismatch in the totals in the following order that require a refund",
-                        error_dict=error_dict,
-                    )
-
-        error_count, exit_errors, error_rate = self.process_errors(orders)
+    def handle_support(self, num_orders, error_count):
+        exit_errors, error_rate = self.process_errors(num_orders, error_count)
         if error_count and error_rate > 0:
             raise CommandError("Errors in transactions: {errors}".format(errors=exit_errors))
 
-    def validate_order(self, order):
-        all_payment_events = order.payment_events
-        refunds = all_payment_events.filter(event_type=self.REFUNDED_EVENT_TYPE)
-        payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
-
-        # If a coupon is used to purchase a product for the full price, there will be no PaymentEvent
-        # so we must also verify that order had a price > 0.
-        if payments.count() == 0:
-            if self.order_requires_payment(order) and order.total_incl_tax > 0:
-                self.add_error(
-                    "orders_no_payment",
-                    "The following orders are without payments",
-                    order
-                )
-
-        # We do not support multi-payment today, so flag this for review.
-        elif payments.count() > 1:
-            self.add_error(
-                "orders_multi_payment",
-                "The following orders had multiple payments",
-                order,
-                payments
-            )
-
-        # If the payment total and the order total do not match, flag for review.
-        elif payments.aggregate(total=Sum('amount')).get('total') != order.total_incl_tax:
-            # FIXME: validate_order should be changed to log _all_ errors related to an order
-            self.add_error(
-                "orders_mismatched_totals",
-                "The following order totals mismatch payments received",
-                order,
-                payments
-            )
-
-        refund_total = refunds.aggregate(total=Sum('amount')).get('total')
-        payment_total = payments.aggregate(total=Sum('amount')).get('total')
-        if refund_total is not None and refund_total > payment_total:
-            self.add_error(
-                "orders_refund_exceeded",
-                "The following orders had excessive refunds",
-                order,
-                refunds
-            )
-
     def add_error(self, tag, msg, order=None, payments=None, error_dict=None):
         if tag not in self.ERRORS_DICT:
             self.ERRORS_DICT[tag] = {"message": msg, "errors": []}
         if error_dict:
             self.ERRORS_DICT[tag]["errors"].append(error_dict)
         else:
-            self.ERRORS_DICT[tag]["errors"].append(self.create_error_dict(order, payments))
-
-    def create_error_dict(self, order, payments=None):
-        d = {}
-        d["order"] = {
-            "order_id": order.id,
-            "order_number": order.number,
-            "amount": float(order.total_incl_tax),
-        }
-        if payments:
-            d["payments"] = [
-                {
-                    "payment_id": p.id,
-                    "processor": p.processor_name,
-                    "amount": float(p.amount),
-                    "type": p.event_type.name,
-                }
-                for p in payments
-            ]
-        return d
-
-    def order_requires_payment(self, order):
-        # We only expect immediate payments for Seats and Entitlements.
-        # Filter out orders that were flagged as being without payment for other product types
-        # FIXME: there are better ways to do this
-        for line in order.lines.all():
-            name = line.product.get_product_class().name
-            if name in VALID_PRODUCT_CLASS_NAMES:
-                return True
-        return False
+            self.ERRORS_DICT[tag]["errors"].append(create_error_dict(order, payments))
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-18 23:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0061_auto_20200407_1725'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HubspotSyncState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('synced_until', models.DateTimeField(blank=True, null=True)),
+                ('window_end', models.DateTimeField(blank=True, null=True)),
+                ('last_synced_basket_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('site_configuration', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='hubspot_sync_state', to='core.SiteConfiguration')),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
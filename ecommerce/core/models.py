@@ -16,6 +16,7 @@ from django.db import models
 from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
+from django_extensions.db.models import TimeStampedModel
 from edx_django_utils import monitoring as monitoring_utils
 from edx_django_utils.cache import TieredCache
 from edx_rbac.models import UserRole, UserRoleAssignment
@@ -26,8 +27,15 @@ from requests.exceptions import Timeout
 from simple_history.models import HistoricalRecords
 from slumber.exceptions import HttpNotFoundError, SlumberBaseException
 
-from ecommerce.core.constants import ALL_ACCESS_CONTEXT, ALLOW_MISSING_LMS_USER_ID
+from ecommerce.core.api_clients import clear_site_api_clients, get_site_api_client
+from ecommerce.core.constants import (
+    ALL_ACCESS_CONTEXT,
+    ALLOW_MISSING_LMS_USER_ID,
+    SHARED_API_CLIENTS_SWITCH,
+    SHARED_SEGMENT_CLIENTS_SWITCH
+)
 from ecommerce.core.exceptions import MissingLmsUserIdException
+from ecommerce.core.segment_clients import get_segment_client
 from ecommerce.core.utils import log_message_and_raise_validation_error
 from ecommerce.extensions.payment.exceptions import ProcessorNotFoundError
 from ecommerce.extensions.payment.helpers import get_processor_class, get_processor_class_by_name
@@ -314,12 +322,21 @@ class SiteConfiguration(models.Model):
 
     @cached_property
     def segment_client(self):
+        """
+        Returns the Segment client of this site.
+
+        If the shared Segment clients switch is active, the client is shared, per Segment key, by all requests of
+        the process. Otherwise, a new client is built.
+        """
+        if waffle.switch_is_active(SHARED_SEGMENT_CLIENTS_SWITCH):
+            return get_segment_client(self.segment_key)
         return SegmentClient(self.segment_key, debug=settings.DEBUG, send=settings.SEND_SEGMENT_EVENTS)
 
     def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
         # Clear Site cache upon SiteConfiguration changed
         Site.objects.clear_cache()
         super(SiteConfiguration, self).save(*args, **kwargs)
+        clear_site_api_clients(self.id)
 
     def build_ecommerce_url(self, path=''):
         """
@@ -395,7 +412,8 @@ class SiteConfiguration(models.Model):
         """ Returns an access token for this site's service user.
 
         The access token is retrieved using the current site's OAuth credentials and the client credentials grant.
-        The token is cached for the lifetime of the token, as specified by the OAuth provider's response. The token
+        The token is cached for the lifetime of the token, as specified by the OAuth provider's response, less
+        OAUTH2_ACCESS_TOKEN_REFRESH_MARGIN, so that a new token is retrieved before the cached one expires. The token
         type is JWT.
 
         Returns:
@@ -415,9 +433,24 @@ class SiteConfiguration(models.Model):
         )
 
         expires = (expiration_datetime - datetime.datetime.utcnow()).seconds
+        expires = max(expires - settings.OAUTH2_ACCESS_TOKEN_REFRESH_MARGIN, 0)
         TieredCache.set_all_tiers(key, access_token, expires)
         return access_token
 
+    def _get_api_client(self, service, url, **client_kwargs):
+        """
+        Returns an API client to access the given service on behalf of this site.
+
+        If the shared API clients switch is active, the client is shared, per site and service, by all requests of
+        the process. Otherwise, a new client is built.
+
+        Returns:
+            EdxRestApiClient
+        """
+        if waffle.switch_is_active(SHARED_API_CLIENTS_SWITCH):
+            return get_site_api_client(self, service, url, **client_kwargs)
+        return EdxRestApiClient(url, jwt=self.access_token, **client_kwargs)
+
     @cached_property
     def discovery_api_client(self):
         """
@@ -427,12 +460,12 @@ class SiteConfiguration(models.Model):
             EdxRestApiClient: The client to access the Discovery service.
         """
 
-        return EdxRestApiClient(self.discovery_api_url, jwt=self.access_token)
+        return self._get_api_client('discovery', self.discovery_api_url)
 
     @cached_property
     def embargo_api_client(self):
         """ Returns the URL for the embargo API """
-        return EdxRestApiClient(self.build_lms_url('/api/embargo/v1'), jwt=self.access_token)
+        return self._get_api_client('embargo', self.build_lms_url('/api/embargo/v1'))
 
     @cached_property
     def enterprise_api_client(self):
@@ -446,7 +479,7 @@ class SiteConfiguration(models.Model):
             EdxRestApiClient: The client to access the Enterprise service.
 
         """
-        return EdxRestApiClient(self.enterprise_api_url, jwt=self.access_token)
+        return self._get_api_client('enterprise', self.enterprise_api_url)
 
     @cached_property
     def enterprise_catalog_api_client(self):
@@ -460,11 +493,11 @@ class SiteConfiguration(models.Model):
             EdxRestApiClient: The client to access the Enterprise Catalog service.
 
         """
-        return EdxRestApiClient(self.enterprise_catalog_api_url, jwt=self.access_token)
+        return self._get_api_client('enterprise_catalog', self.enterprise_catalog_api_url)
 
     @cached_property
     def consent_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/consent/api/v1/'), jwt=self.access_token, append_slash=False)
+        return self._get_api_client('consent', self.build_lms_url('/consent/api/v1/'), append_slash=False)
 
     @cached_property
     def user_api_client(self):
@@ -474,23 +507,23 @@ class SiteConfiguration(models.Model):
         Returns:
             EdxRestApiClient: The client to access the LMS user API service.
         """
-        return EdxRestApiClient(self.build_lms_url('/api/user/v1/'), jwt=self.access_token)
+        return self._get_api_client('user', self.build_lms_url('/api/user/v1/'))
 
     @cached_property
     def commerce_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/commerce/v1/'), jwt=self.access_token)
+        return self._get_api_client('commerce', self.build_lms_url('/api/commerce/v1/'))
 
     @cached_property
     def credit_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/credit/v1/'), jwt=self.access_token)
+        return self._get_api_client('credit', self.build_lms_url('/api/credit/v1/'))
 
     @cached_property
     def enrollment_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/enrollment/v1/'), jwt=self.access_token, append_slash=False)
+        return self._get_api_client('enrollment', self.build_lms_url('/api/enrollment/v1/'), append_slash=False)
 
     @cached_property
     def entitlement_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/entitlements/v1/'), jwt=self.access_token)
+        return self._get_api_client('entitlement', self.build_lms_url('/api/entitlements/v1/'))
 
 
 class User(AbstractUser):
@@ -773,6 +806,22 @@ class BusinessClient(models.Model):
         super(BusinessClient, self).save(*args, **kwargs)
 
 
+class HubspotSyncState(TimeStampedModel):
+    """
+    Progress of the sync of the carts of a site to Hubspot, maintained by the sync_hubspot management command.
+
+    Carts created or submitted until synced_until have been synced. While a sync is in progress, window_end is the end
+    of the carts it syncs, and last_synced_basket_id the last cart acknowledged by Hubspot, from which an interrupted
+    sync is resumed.
+    """
+    site_configuration = models.OneToOneField(
+        'core.SiteConfiguration', related_name='hubspot_sync_state', on_delete=models.CASCADE
+    )
+    synced_until = models.DateTimeField(null=True, blank=True)
+    window_end = models.DateTimeField(null=True, blank=True)
+    last_synced_basket_id = models.PositiveIntegerField(null=True, blank=True)
+
+
 class EcommerceFeatureRole(UserRole):
     """
     User role definitions specific to Ecommerce.
@@ -0,0 +1,212 @@
+"""
+Process-wide registry of the Segment clients used to track the events of sites.
+
+Each Segment client owns a queue and a consumer thread uploading its events. Clients are shared by all requests
+served by the process, per Segment key, so that the queue and thread are created once instead of for every loaded
+site configuration. The consumer uploads events in batches, once a batch is full or its first event has waited for
+the flush interval, so that delivering events does not compete with the request threads.
+
+Threads do not survive a fork, so the registry is emptied in forked children, which create their own clients. The
+registry is emptied after the fork where os.register_at_fork is available (Python 3.7+), and otherwise when a client
+is first requested by a process other than the one which created the registered clients.
+"""
+
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from queue import Empty
+
+from analytics import Client
+from analytics.consumer import Consumer
+from django.conf import settings
+from edx_django_utils import monitoring as monitoring_utils
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_clients_lock = threading.Lock()
+_clients_pid = os.getpid()
+
+
+class SegmentClientMetrics:
+    """ Thread-safe counters of the events of a Segment client. """
+
+    def __init__(self):
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+class BatchingConsumer(Consumer):
+    """ Consumer uploading the events of its queue in batches, to Segment or to a local file. """
+
+    def __init__(self, queue, write_key, metrics, flush_interval, file_path=None, **kwargs):
+        super(BatchingConsumer, self).__init__(queue, write_key, **kwargs)
+        self.metrics = metrics
+        self.flush_interval = flush_interval
+        self.file_path = file_path
+
+    def next(self):
+        """ Returns the next batch of events, once it is full or its first event has waited for the interval. """
+        items = []
+        deadline = None
+
+        while len(items) < self.upload_size:
+            # The first event is awaited for a short time only, so that a paused consumer exits.
+            timeout = 0.5 if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                items.append(self.queue.get(block=True, timeout=timeout))
+            except Empty:
+                break
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+
+        return items
+
+    def upload(self):
+        """ Uploads the next batch of events, and returns whether it was successful. """
+        batch = self.next()
+        if not batch:
+            return False
+
+        try:
+            self.request(batch)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error('Failed to upload a batch of %d Segment events: %s', len(batch), exc)
+            self.metrics.increment('failed_flushes')
+            if self.on_error:
+                self.on_error(exc, batch)
+            return False
+        else:
+            self.metrics.increment('flushes')
+            self.metrics.increment('uploaded_events', len(batch))
+            return True
+        finally:
+            for __ in batch:
+                self.queue.task_done()
+
+    def request(self, batch, attempt=0):
+        if self.file_path:
+            with open(self.file_path, 'a') as events_file:
+                for item in batch:
+                    events_file.write(json.dumps(item) + '\n')
+        else:
+            super(BatchingConsumer, self).request(batch, attempt)
+
+
+class SegmentClient(Client):
+    """ Segment client with a bounded queue consumed in batches, which counts the events it drops and uploads. """
+
+    def __init__(self, write_key, max_queue_size, upload_size, flush_interval, file_path=None, **kwargs):
+        self.metrics = SegmentClientMetrics()
+        send = kwargs.pop('send', True) or bool(file_path)
+        # The consumer of the base client is replaced before it is started.
+        super(SegmentClient, self).__init__(write_key, max_queue_size=max_queue_size, send=False, **kwargs)
+        self.consumer = BatchingConsumer(
+            self.queue, write_key, self.metrics, flush_interval, file_path=file_path,
+            upload_size=upload_size, host=kwargs.get('host'), on_error=kwargs.get('on_error'),
+        )
+        self.send = send
+        if send:
+            atexit.register(self.join)
+            self.consumer.start()
+
+    def _enqueue(self, msg):
+        success, msg = super(SegmentClient, self)._enqueue(msg)
+        if not success:
+            self.metrics.increment('dropped_events')
+            monitoring_utils.set_custom_metric('segment_event_dropped', True)
+        return success, msg
+
+
+def _create_client(segment_key):
+    return SegmentClient(
+        segment_key,
+        max_queue_size=settings.SEGMENT_MAX_QUEUE_SIZE,
+        upload_size=settings.SEGMENT_UPLOAD_SIZE,
+        flush_interval=settings.SEGMENT_FLUSH_INTERVAL,
+        file_path=settings.SEGMENT_EVENTS_FILE_PATH,
+        debug=settings.DEBUG,
+        send=settings.SEND_SEGMENT_EVENTS,
+    )
+
+
+def get_segment_client(segment_key):
+    """
+    Returns the shared Segment client of the given key.
+
+    Args:
+        segment_key (str): Segment write key of the site.
+
+    Returns:
+        SegmentClient
+    """
+    if _clients_pid != os.getpid():
+        _reset_after_fork()
+
+    client = _clients.get(segment_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(segment_key)
+            if client is None:
+                client = _create_client(segment_key)
+                _clients[segment_key] = client
+    return client
+
+
+def get_segment_client_metrics():
+    """
+    Returns the number of events dropped because the queue was full, of uploaded events and of successful and failed
+    flushes, of the shared clients of the process.
+
+    Returns:
+        dict: Counters keyed by metric name.
+    """
+    metrics = Counter()
+    for client in list(_clients.values()):
+        metrics.update(client.metrics.as_dict())
+    return dict(metrics)
+
+
+def flush_segment_clients():
+    """ Blocks until the events queued by the shared clients have been uploaded. """
+    for client in list(_clients.values()):
+        if client.consumer.is_alive():
+            client.flush()
+
+
+def clear_segment_clients():
+    """ Stops and discards the shared Segment clients, once their queued events have been uploaded. """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+
+    for client in clients:
+        if client.consumer.is_alive():
+            client.flush()
+            client.join()
+
+
+def _reset_after_fork():
+    global _clients_lock, _clients_pid  # pylint: disable=global-statement
+    _clients.clear()
+    _clients_lock = threading.Lock()
+    _clients_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,105 @@
+
+
+import httpretty
+import mock
+from django.test import override_settings
+from edx_django_utils.cache import TieredCache
+from requests.adapters import HTTPAdapter
+from waffle.testutils import override_switch
+
+from ecommerce.core.api_clients import (
+    SiteAccessTokenAuth,
+    TimeoutHTTPAdapter,
+    clear_site_api_clients,
+    get_site_api_client
+)
+from ecommerce.core.constants import SHARED_API_CLIENTS_SWITCH
+from ecommerce.core.models import SiteConfiguration
+from ecommerce.tests.factories import SiteConfigurationFactory
+from ecommerce.tests.testcases import TestCase
+
+
+class SiteApiClientTests(TestCase):
+    """ Tests for the shared, per site, API clients. """
+
+    def setUp(self):
+        super(SiteApiClientTests, self).setUp()
+        clear_site_api_clients()
+        self.addCleanup(clear_site_api_clients)
+
+    def get_client(self, site_configuration=None, service='discovery'):
+        site_configuration = site_configuration or self.site_configuration
+        return get_site_api_client(site_configuration, service, site_configuration.discovery_api_url)
+
+    def test_client_shared(self):
+        """ Verify the client of a site and service is shared by all instances of the site's configuration. """
+        client = self.get_client()
+        self.assertIs(self.get_client(SiteConfiguration.objects.get(id=self.site_configuration.id)), client)
+
+        self.assertIsNot(self.get_client(service='enterprise'), client)
+        self.assertIsNot(self.get_client(SiteConfigurationFactory()), client)
+
+    def test_client_rebuilt(self):
+        """ Verify the client is rebuilt if the site's configuration changes. """
+        client = self.get_client()
+        self.site_configuration.oauth_settings['BACKEND_SERVICE_EDX_OAUTH2_KEY'] = 'another-key'
+        self.assertIsNot(self.get_client(), client)
+
+        client = self.get_client()
+        self.site_configuration.save()
+        self.assertIsNot(self.get_client(), client)
+
+    @override_settings(API_CLIENT_TIMEOUT=3, API_CLIENT_TIMEOUTS={'discovery': 10}, API_CLIENT_POOL_MAXSIZE=7)
+    def test_client_session(self):
+        """ Verify the client's session pools connections, applies the service's timeout and authenticates as the
+        site. """
+        session = self.get_client()._store['session']  # pylint: disable=protected-access
+        adapter = session.get_adapter(self.site_configuration.discovery_api_url)
+
+        self.assertIsInstance(adapter, TimeoutHTTPAdapter)
+        self.assertEqual(adapter.timeout, 10)
+        self.assertEqual(adapter._pool_maxsize, 7)  # pylint: disable=protected-access
+        self.assertIsInstance(session.auth, SiteAccessTokenAuth)
+
+        session = self.get_client(service='enterprise')._store['session']  # pylint: disable=protected-access
+        self.assertEqual(session.get_adapter(self.site_configuration.discovery_api_url).timeout, 3)
+
+    @httpretty.activate
+    def test_access_token_refreshed(self):
+        """ Verify each request is sent with the site's current access token. """
+        url = self.site_configuration.discovery_api_url + 'courses/'
+        httpretty.register_uri(httpretty.GET, url, body='{}', content_type='application/json')
+        client = self.get_client()
+
+        token = self.mock_access_token_response()
+        client.courses.get()
+        self.assertEqual(httpretty.last_request().headers['Authorization'], 'JWT {}'.format(token))
+
+        # Simulate the expiration of the cached token.
+        TieredCache.dangerous_clear_all_tiers()
+        token = self.mock_access_token_response(access_token='refreshed')
+        client.courses.get()
+        self.assertEqual(httpretty.last_request().headers['Authorization'], 'JWT refreshed')
+
+    def test_timeout_http_adapter(self):
+        """ Verify the default timeout is only applied to requests which do not set one. """
+        adapter = TimeoutHTTPAdapter(timeout=5)
+        with mock.patch.object(HTTPAdapter, 'send') as mock_send:
+            adapter.send(mock.Mock())
+            self.assertEqual(mock_send.call_args[1]['timeout'], 5)
+
+            adapter.send(mock.Mock(), timeout=1)
+            self.assertEqual(mock_send.call_args[1]['timeout'], 1)
+
+    @httpretty.activate
+    def test_site_configuration_api_clients(self):
+        """ Verify the API clients of SiteConfiguration are shared if the switch is active. """
+        self.mock_access_token_response()
+        with override_switch(SHARED_API_CLIENTS_SWITCH, active=True):
+            client = self.site_configuration.discovery_api_client
+            site_configuration = SiteConfiguration.objects.get(id=self.site_configuration.id)
+            self.assertIs(site_configuration.discovery_api_client, client)
+
+        with override_switch(SHARED_API_CLIENTS_SWITCH, active=False):
+            site_configuration = SiteConfiguration.objects.get(id=self.site_configuration.id)
+            self.assertIsNot(site_configuration.discovery_api_client, client)
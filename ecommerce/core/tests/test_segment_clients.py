@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+
+import mock
+from django.test import override_settings
+from waffle.testutils import override_switch
+
+from ecommerce.core.constants import SHARED_SEGMENT_CLIENTS_SWITCH
+from ecommerce.core.models import SiteConfiguration
+from ecommerce.core.segment_clients import (
+    _reset_after_fork,
+    clear_segment_clients,
+    flush_segment_clients,
+    get_segment_client,
+    get_segment_client_metrics
+)
+from ecommerce.tests.testcases import TestCase
+
+
+class SegmentClientTests(TestCase):
+    """ Tests for the shared, per Segment key, Segment clients. """
+
+    def setUp(self):
+        super(SegmentClientTests, self).setUp()
+        clear_segment_clients()
+        self.addCleanup(clear_segment_clients)
+
+    def get_events_file_path(self):
+        events_file, path = tempfile.mkstemp()
+        os.close(events_file)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_client_shared(self):
+        """ Verify the client of a Segment key is shared by all instances of the site configurations. """
+        client = get_segment_client('fake-key')
+        self.assertIs(get_segment_client('fake-key'), client)
+        self.assertIsNot(get_segment_client('another-key'), client)
+
+        with override_switch(SHARED_SEGMENT_CLIENTS_SWITCH, active=True):
+            self.site_configuration.segment_key = 'fake-key'
+            self.site_configuration.save()
+            self.assertIs(SiteConfiguration.objects.get(id=self.site_configuration.id).segment_client, client)
+
+    def test_client_not_shared_with_forked_children(self):
+        """ Verify the clients, whose consumer threads do not survive a fork, are rebuilt in forked children. """
+        client = get_segment_client('fake-key')
+        _reset_after_fork()
+        self.assertIsNot(get_segment_client('fake-key'), client)
+
+    def test_client_not_shared_with_other_processes(self):
+        """ Verify the clients are rebuilt in forked children, even without os.register_at_fork. """
+        client = get_segment_client('fake-key')
+        with mock.patch('ecommerce.core.segment_clients.os.getpid', return_value=os.getpid() + 1):
+            child_client = get_segment_client('fake-key')
+            self.assertIsNot(child_client, client)
+            self.assertIs(get_segment_client('fake-key'), child_client)
+            clear_segment_clients()
+        _reset_after_fork()
+
+    @override_settings(SEGMENT_UPLOAD_SIZE=2, SEGMENT_FLUSH_INTERVAL=0.5)
+    def test_events_uploaded_in_batches(self):
+        """ Verify the events are uploaded in batches, to the local file if one is set. """
+        path = self.get_events_file_path()
+        with override_settings(SEGMENT_EVENTS_FILE_PATH=path):
+            client = get_segment_client('fake-key')
+
+        for index in range(3):
+            client.track('user-id', 'Event {}'.format(index))
+        flush_segment_clients()
+
+        with open(path) as events_file:
+            events = [json.loads(line)['event'] for line in events_file]
+        self.assertEqual(events, ['Event 0', 'Event 1', 'Event 2'])
+        self.assertEqual(get_segment_client_metrics(), {'flushes': 2, 'uploaded_events': 3})
+
+    @override_settings(SEGMENT_MAX_QUEUE_SIZE=1)
+    def test_dropped_events_counted(self):
+        """ Verify the events dropped because the queue is full are counted. """
+        path = self.get_events_file_path()
+        with override_settings(SEGMENT_EVENTS_FILE_PATH=path):
+            client = get_segment_client('fake-key')
+
+        # Pause the consumer so that the queue fills up.
+        client.join()
+        self.assertTrue(client.track('user-id', 'Event 0')[0])
+        self.assertFalse(client.track('user-id', 'Event 1')[0])
+        self.assertEqual(get_segment_client_metrics(), {'dropped_events': 1})
@@ -147,6 +147,33 @@ def catalog_contains_course_runs(site, course_run_ids, enterprise_customer_uuid,
     return contains_content
 
 
+def get_enterprise_catalogs_containing_course_run(site, course_run_id, enterprise_customer_uuid):
+    """
+    Determine which catalogs of the EnterpriseCustomer contain the course run, with a single request.
+
+    Returns:
+        set: UUIDs of the EnterpriseCustomerCatalogs which contain the course run.
+    """
+    query_params = {'course_run_ids': [course_run_id], 'get_catalog_list': True}
+    cache_key = get_cache_key(
+        site_domain=site.domain,
+        resource='enterprise-customer-{}-contains_content_items-catalog_list'.format(enterprise_customer_uuid),
+        query_params=urlencode(query_params, True)
+    )
+
+    cached_response = TieredCache.get_cached_response(cache_key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    api = site.siteconfiguration.enterprise_catalog_api_client
+    endpoint = getattr(api, 'enterprise-customer')(enterprise_customer_uuid)
+    response = endpoint.contains_content_items.get(**query_params)
+    catalogs = {str(catalog_uuid) for catalog_uuid in response.get('catalog_list') or []}
+    TieredCache.set_all_tiers(cache_key, catalogs, settings.ENTERPRISE_API_CACHE_TIMEOUT)
+
+    return catalogs
+
+
 def get_enterprise_id_for_user(site, user):
     enterprise_from_jwt = get_enterprise_id_for_current_request_user_from_jwt()
     if enterprise_from_jwt:
@@ -5,20 +5,29 @@ from decimal import Decimal
 from uuid import UUID
 
 import crum
+import waffle
 from django.contrib import messages
 from django.db.models import Sum
 from django.utils.translation import ugettext as _
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from oscar.core.loading import get_model
 from requests.exceptions import ConnectionError as ReqConnectionError
 from requests.exceptions import Timeout
 from slumber.exceptions import SlumberHttpBaseException
 
+from ecommerce.core.constants import ENTERPRISE_CATALOG_LIST_SWITCH, ENTERPRISE_DISCOUNT_LEDGER_SWITCH
+from ecommerce.core.utils import get_cache_key
 from ecommerce.courses.utils import get_course_info_from_catalog
-from ecommerce.enterprise.api import catalog_contains_course_runs, get_enterprise_id_for_user
+from ecommerce.enterprise.api import (
+    catalog_contains_course_runs,
+    get_enterprise_catalogs_containing_course_run,
+    get_enterprise_id_for_user
+)
 from ecommerce.enterprise.utils import get_or_create_enterprise_customer_user
 from ecommerce.extensions.basket.utils import ENTERPRISE_CATALOG_ATTRIBUTE_TYPE
 from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.offer.constants import OFFER_ASSIGNMENT_REVOKED, OFFER_REDEEMED
+from ecommerce.extensions.offer.discount_ledger import get_offer_user_discount_total
 from ecommerce.extensions.offer.mixins import ConditionWithoutRangeMixin, SingleItemConsumptionConditionMixin
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_ENTERPRISE
 from ecommerce.extensions.offer.utils import get_benefit_type, get_discount_value
@@ -43,9 +52,12 @@ def is_offer_max_user_discount_available(basket, offer):
         return True
     discount_value = _get_basket_discount_value(basket, offer)
     # check if offer has discount available for user
-    sum_user_discounts_for_this_offer = OrderDiscount.objects.filter(
-        offer_id=offer.id, order__user_id=basket.owner.id, order__status=ORDER.COMPLETE
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal(0.00)
+    if waffle.switch_is_active(ENTERPRISE_DISCOUNT_LEDGER_SWITCH):
+        sum_user_discounts_for_this_offer = get_offer_user_discount_total(offer, basket.owner)
+    else:
+        sum_user_discounts_for_this_offer = OrderDiscount.objects.filter(
+            offer_id=offer.id, order__user_id=basket.owner.id, order__status=ORDER.COMPLETE
+        ).aggregate(Sum('amount'))['amount__sum'] or Decimal(0.00)
     new_total_discount = discount_value + sum_user_discounts_for_this_offer
     if new_total_discount <= offer.max_user_discount:
         return True
@@ -87,6 +99,95 @@ def _get_basket_discount_value(basket, offer):
     return discount_value
 
 
+def _get_enterprise_catalog_attribute_type():
+    """ Returns the basket attribute type of the enterprise catalog, retrieved once per request. """
+    cache_key = 'enterprise_catalog_basket_attribute_type'
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    enterprise_catalog_attribute, __ = BasketAttributeType.objects.get_or_create(
+        name=ENTERPRISE_CATALOG_ATTRIBUTE_TYPE
+    )
+    DEFAULT_REQUEST_CACHE.set(cache_key, enterprise_catalog_attribute)
+    return enterprise_catalog_attribute
+
+
+def _get_basket_course_ids(basket):
+    """
+    Returns the course keys and course run IDs of the products in the basket.
+
+    The course IDs are retrieved once per request, for all enterprise offers evaluated against the basket.
+
+    Returns:
+        tuple: The course IDs, the product whose course could not be determined, if any, and the error raised while
+            retrieving the course of that product, if any.
+    """
+    lines = basket.all_lines()
+    cache_key = get_cache_key(
+        site_domain=basket.site.domain,
+        resource='enterprise_basket_course_ids',
+        product_ids=','.join(str(line.product_id) for line in lines),
+    )
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    # This variable will hold both course keys and course run identifiers.
+    course_ids = []
+    failed_product = error = None
+    for line in lines:
+        if line.product.is_course_entitlement_product:
+            try:
+                response = get_course_info_from_catalog(basket.site, line.product)
+            except (ReqConnectionError, KeyError, SlumberHttpBaseException, Timeout) as exc:
+                failed_product, error = line.product, exc
+                break
+            course_ids.append(response['key'])
+            continue
+
+        course = line.product.course
+        if not course:
+            # Basket contains products not related to a course_run.
+            failed_product = line.product
+            break
+        course_ids.append(course.id)
+
+    value = (course_ids, failed_product, error)
+    DEFAULT_REQUEST_CACHE.set(cache_key, value)
+    return value
+
+
+def _get_user_enterprise(basket):
+    """ Returns the UUID of the EnterpriseCustomer of the basket owner, retrieved once per request. """
+    cache_key = get_cache_key(site_domain=basket.site.domain, resource='enterprise_basket_user', user=basket.owner.id)
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    user_enterprise = get_enterprise_id_for_user(basket.site, basket.owner)
+    DEFAULT_REQUEST_CACHE.set(cache_key, user_enterprise)
+    return user_enterprise
+
+
+def _catalog_contains_course_runs(site, course_ids, enterprise_customer_uuid, enterprise_customer_catalog_uuid):
+    """
+    Determine if the course runs are contained in the EnterpriseCustomer's catalog.
+
+    If the switch is active, and the basket contains a single course, the catalogs of the EnterpriseCustomer
+    containing the course are retrieved with a single request, shared by all of the EnterpriseCustomer's offers.
+    """
+    if len(course_ids) == 1 and waffle.switch_is_active(ENTERPRISE_CATALOG_LIST_SWITCH):
+        catalogs = get_enterprise_catalogs_containing_course_run(site, course_ids[0], enterprise_customer_uuid)
+        if enterprise_customer_catalog_uuid:
+            return enterprise_customer_catalog_uuid in catalogs
+        return bool(catalogs)
+
+    return catalog_contains_course_runs(
+        site, course_ids, enterprise_customer_uuid, enterprise_customer_catalog_uuid=enterprise_customer_catalog_uuid
+    )
+
+
 class EnterpriseCustomerCondition(ConditionWithoutRangeMixin, SingleItemConsumptionConditionMixin, Condition):
     class Meta:
         app_label = 'enterprise'
@@ -125,51 +226,39 @@ class EnterpriseCustomerCondition(ConditionWithoutRangeMixin, SingleItemConsumpt
         enterprise_name_in_condition = str(self.enterprise_customer_name)
         username = basket.owner.username
 
-        # This variable will hold both course keys and course run identifiers.
-        course_ids = []
-        for line in basket.all_lines():
-            if line.product.is_course_entitlement_product:
-                try:
-                    response = get_course_info_from_catalog(basket.site, line.product)
-                except (ReqConnectionError, KeyError, SlumberHttpBaseException, Timeout) as exc:
-                    logger.exception(
-                        '[Code Redemption Failure] Unable to apply enterprise offer because basket '
-                        'contains a course entitlement product but we failed to get course info from  '
-                        'course entitlement product.'
-                        'User: %s, Offer: %s, Message: %s, Enterprise: %s, Catalog: %s, Course UUID: %s',
-                        username,
-                        offer.id,
-                        exc,
-                        enterprise_in_condition,
-                        enterprise_catalog,
-                        line.product.attr.UUID
-                    )
-                    return False
-                else:
-                    course_ids.append(response['key'])
-
-                    # Skip to the next iteration.
-                    continue
-
-            course = line.product.course
-            if not course:
-                # Basket contains products not related to a course_run.
-                # Only log for non-site offers to avoid noise.
-                if offer.offer_type != ConditionalOffer.SITE:
-                    logger.warning('[Code Redemption Failure] Unable to apply enterprise offer because '
-                                   'the Basket contains a product not related to a course_run. '
-                                   'User: %s, Offer: %s, Product: %s, Enterprise: %s, Catalog: %s',
-                                   username,
-                                   offer.id,
-                                   line.product.id,
-                                   enterprise_in_condition,
-                                   enterprise_catalog)
-                return False
+        course_ids, failed_product, error = _get_basket_course_ids(basket)
+        if error:
+            logger.error(
+                '[Code Redemption Failure] Unable to apply enterprise offer because basket '
+                'contains a course entitlement product but we failed to get course info from  '
+                'course entitlement product.'
+                'User: %s, Offer: %s, Message: %s, Enterprise: %s, Catalog: %s, Course UUID: %s',
+                username,
+                offer.id,
+                error,
+                enterprise_in_condition,
+                enterprise_catalog,
+                failed_product.attr.UUID,
+                exc_info=error
+            )
+            return False
 
-            course_ids.append(course.id)
+        if failed_product:
+            # Basket contains products not related to a course_run.
+            # Only log for non-site offers to avoid noise.
+            if offer.offer_type != ConditionalOffer.SITE:
+                logger.warning('[Code Redemption Failure] Unable to apply enterprise offer because '
+                               'the Basket contains a product not related to a course_run. '
+                               'User: %s, Offer: %s, Product: %s, Enterprise: %s, Catalog: %s',
+                               username,
+                               offer.id,
+                               failed_product.id,
+                               enterprise_in_condition,
+                               enterprise_catalog)
+            return False
 
         courses_in_basket = ','.join(course_ids)
-        user_enterprise = get_enterprise_id_for_user(basket.site, basket.owner)
+        user_enterprise = _get_user_enterprise(basket)
         if user_enterprise and enterprise_in_condition != user_enterprise:
             # Learner is not linked to the EnterpriseCustomer associated with this condition.
             if offer.offer_type == ConditionalOffer.VOUCHER:
@@ -217,9 +306,8 @@ class EnterpriseCustomerCondition(ConditionWithoutRangeMixin, SingleItemConsumpt
                 return False
 
         try:
-            catalog_contains_course = catalog_contains_course_runs(
-                basket.site, course_ids, enterprise_in_condition,
-                enterprise_customer_catalog_uuid=enterprise_catalog
+            catalog_contains_course = _catalog_contains_course_runs(
+                basket.site, course_ids, enterprise_in_condition, enterprise_catalog
             )
         except (ReqConnectionError, KeyError, SlumberHttpBaseException, Timeout) as exc:
             logger.exception('[Code Redemption Failure] Unable to apply enterprise offer because '
@@ -289,11 +377,9 @@ class EnterpriseCustomerCondition(ConditionWithoutRangeMixin, SingleItemConsumpt
             'catalog'
         ) if basket.strategy.request else None
 
-        if not catalog:
+        if not catalog and basket.id:
             # For actual baskets get `catalog` from basket attribute
-            enterprise_catalog_attribute, __ = BasketAttributeType.objects.get_or_create(
-                name=ENTERPRISE_CATALOG_ATTRIBUTE_TYPE
-            )
+            enterprise_catalog_attribute = _get_enterprise_catalog_attribute_type()
             enterprise_customer_catalog = BasketAttribute.objects.filter(
                 basket=basket,
                 attribute_type=enterprise_catalog_attribute,
@@ -4,11 +4,14 @@ Send the enterprise offer limits emails.
 import logging
 from datetime import datetime
 
+import waffle
 from django.core.management import BaseCommand
 from django.db.models import Sum
 from ecommerce_worker.sailthru.v1.tasks import send_offer_usage_email
 
+from ecommerce.core.constants import ENTERPRISE_DISCOUNT_LEDGER_SWITCH
 from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.offer.discount_ledger import get_offer_discount_total
 from ecommerce.programs.custom import get_model
 
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
@@ -66,10 +69,13 @@ class Command(BaseCommand):
         """
         Return the total discount limit, percentage usage and current usage of booking limit.
         """
-        total_used_discount_amount = OrderDiscount.objects.filter(
-            offer_id=offer.id,
-            order__status=ORDER.COMPLETE
-        ).aggregate(Sum('amount'))['amount__sum']
+        if waffle.switch_is_active(ENTERPRISE_DISCOUNT_LEDGER_SWITCH):
+            total_used_discount_amount = get_offer_discount_total(offer)
+        else:
+            total_used_discount_amount = OrderDiscount.objects.filter(
+                offer_id=offer.id,
+                order__status=ORDER.COMPLETE
+            ).aggregate(Sum('amount'))['amount__sum']
         total_used_discount_amount = total_used_discount_amount if total_used_discount_amount else 0
 
         percentage_usage = int((total_used_discount_amount / offer.max_discount) * 100)
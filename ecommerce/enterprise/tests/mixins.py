@@ -526,6 +526,20 @@ class EnterpriseServiceMockMixin:
                 content_type='application/json'
             )
 
+    def mock_enterprise_catalog_list(self, course_run_id, enterprise_customer_uuid, catalog_list):
+        self.mock_access_token_response()
+        query_params = urlencode({'course_run_ids': [course_run_id], 'get_catalog_list': True}, True)
+        httpretty.register_uri(
+            method=httpretty.GET,
+            uri='{api_url}{enterprise_customer_uuid}/contains_content_items/?{query_params}'.format(
+                api_url=self.ENTERPRISE_CATALOG_URL_CUSTOMER_RESOURCE,
+                enterprise_customer_uuid=enterprise_customer_uuid,
+                query_params=query_params
+            ),
+            body=json.dumps({'contains_content_items': bool(catalog_list), 'catalog_list': catalog_list}),
+            content_type='application/json'
+        )
+
     def prepare_enterprise_offer(self, percentage_discount_value=100, enterprise_customer_name=None):
         benefit = EnterprisePercentageDiscountBenefitFactory(value=percentage_discount_value)
         if enterprise_customer_name is not None:
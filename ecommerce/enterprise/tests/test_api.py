@@ -162,6 +162,23 @@ class EnterpriseAPITests(EnterpriseServiceMockMixin, DiscoveryTestMixin, TestCas
         with self.assertRaises(ReqConnectionError):
             self._assert_contains_course_runs(False, [self.course_run.id], 'fake-uuid', 'fake-uuid')
 
+    def test_get_enterprise_catalogs_containing_course_run(self):
+        """
+        Verify that method `get_enterprise_catalogs_containing_course_run` returns, and caches, the catalogs
+        containing the course run.
+        """
+        catalog_list = ['fake-catalog-uuid-1', 'fake-catalog-uuid-2']
+        self.mock_enterprise_catalog_list(self.course_run.id, 'fake-uuid', catalog_list)
+
+        for __ in range(2):
+            catalogs = enterprise_api.get_enterprise_catalogs_containing_course_run(
+                self.site, self.course_run.id, 'fake-uuid'
+            )
+            self.assertEqual(catalogs, set(catalog_list))
+
+        self.assertEqual(httpretty.last_request().querystring['get_catalog_list'], ['True'])
+        self._assert_num_requests(2)
+
     @patch('ecommerce.enterprise.api.fetch_enterprise_learner_data')
     @patch('ecommerce.enterprise.api.get_enterprise_id_for_current_request_user_from_jwt')
     def test_get_enterprise_id_for_user_fetch_learner_data_has_uuid(self, mock_get_jwt_uuid, mock_fetch):
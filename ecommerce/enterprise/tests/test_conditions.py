@@ -10,7 +10,9 @@ import mock
 from oscar.core.loading import get_model
 from oscar.test.factories import BasketFactory, OrderDiscountFactory, OrderFactory
 from requests.exceptions import ConnectionError as ReqConnectionError
+from waffle.testutils import override_switch
 
+from ecommerce.core.constants import ENTERPRISE_CATALOG_LIST_SWITCH, ENTERPRISE_DISCOUNT_LEDGER_SWITCH
 from ecommerce.coupons.tests.mixins import CouponMixin, DiscoveryMockMixin
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.enterprise.conditions import EnterpriseCustomerCondition
@@ -82,6 +84,72 @@ class EnterpriseCustomerConditionTests(EnterpriseServiceMockMixin, DiscoveryTest
         )
         self.assertTrue(self.condition.is_satisfied(offer, basket))
 
+    @httpretty.activate
+    def test_is_satisfied_basket_resolved_once(self):
+        """ Ensure the courses of the basket and the learner's enterprise are retrieved once for all offers. """
+        basket = BasketFactory(site=self.site, owner=self.user)
+        basket.add_product(self.entitlement)
+        self.mock_course_detail_endpoint(
+            discovery_api_url=self.site_configuration.discovery_api_url,
+            course=self.entitlement
+        )
+        self.mock_enterprise_learner_api(
+            learner_id=self.user.id,
+            enterprise_customer_uuid=str(self.condition.enterprise_customer_uuid),
+            course_run_id=self.course_run.id,
+        )
+        self.mock_catalog_contains_course_runs(
+            ['edX+DemoX'],
+            self.condition.enterprise_customer_uuid,
+            enterprise_customer_catalog_uuid=self.condition.enterprise_customer_catalog_uuid,
+        )
+
+        offer = factories.EnterpriseOfferFactory(partner=self.partner, condition=self.condition)
+        self.assertTrue(self.condition.is_satisfied(offer, basket))
+        num_requests = len(httpretty.latest_requests())
+
+        condition = factories.EnterpriseCustomerConditionFactory(
+            enterprise_customer_uuid=self.condition.enterprise_customer_uuid,
+            enterprise_customer_catalog_uuid=self.condition.enterprise_customer_catalog_uuid,
+        )
+        offer = factories.EnterpriseOfferFactory(partner=self.partner, condition=condition)
+        with mock.patch('ecommerce.enterprise.conditions.get_course_info_from_catalog') as mock_course_info:
+            with mock.patch('ecommerce.enterprise.conditions.get_enterprise_id_for_user') as mock_enterprise:
+                self.assertTrue(condition.is_satisfied(offer, basket))
+        self.assertFalse(mock_course_info.called)
+        self.assertFalse(mock_enterprise.called)
+        self.assertEqual(len(httpretty.latest_requests()), num_requests)
+
+    @httpretty.activate
+    def test_is_satisfied_with_catalog_list(self):
+        """ Ensure the catalogs of the enterprise are retrieved with a single request, if the switch is active. """
+        basket = BasketFactory(site=self.site, owner=self.user)
+        basket.add_product(self.course_run.seat_products[0])
+        self.mock_enterprise_learner_api(
+            learner_id=self.user.id,
+            enterprise_customer_uuid=str(self.condition.enterprise_customer_uuid),
+            course_run_id=self.course_run.id,
+        )
+        self.mock_enterprise_catalog_list(
+            self.course_run.id,
+            self.condition.enterprise_customer_uuid,
+            [str(self.condition.enterprise_customer_catalog_uuid)],
+        )
+        other_condition = factories.EnterpriseCustomerConditionFactory(
+            enterprise_customer_uuid=self.condition.enterprise_customer_uuid,
+        )
+
+        with override_switch(ENTERPRISE_CATALOG_LIST_SWITCH, active=True):
+            offer = factories.EnterpriseOfferFactory(partner=self.partner, condition=self.condition)
+            self.assertTrue(self.condition.is_satisfied(offer, basket))
+            offer = factories.EnterpriseOfferFactory(partner=self.partner, condition=other_condition)
+            self.assertFalse(other_condition.is_satisfied(offer, basket))
+
+        catalog_requests = [
+            request for request in httpretty.latest_requests() if 'contains_content_items' in request.path
+        ]
+        self.assertEqual(len(catalog_requests), 1)
+
     def _check_condition_is_satisfied(self, offer, basket, is_satisfied):
         """
         Helper method to verify that conditional offer is valid for provided basket.
@@ -545,6 +613,37 @@ class EnterpriseCustomerConditionTests(EnterpriseServiceMockMixin, DiscoveryTest
         )
         self.assertTrue(self.condition.is_satisfied(offer, basket))
 
+    @httpretty.activate
+    def test_offer_availability_with_max_user_discount_ledger(self):
+        """
+        Verify that enterprise offer condition reads the user's discounts from the offer discount ledger,
+        if the switch is active.
+        """
+        offer = factories.EnterpriseOfferFactory(
+            partner=self.partner,
+            benefit=factories.EnterprisePercentageDiscountBenefitFactory(value=100),
+            max_user_discount=150
+        )
+        for _ in range(5):
+            order = OrderFactory(user=self.user, status=ORDER.COMPLETE)
+            OrderDiscountFactory(order=order, offer_id=offer.id, amount=10)
+        basket = BasketFactory(site=self.site, owner=self.user)
+        basket.add_product(self.course_run.seat_products[0])
+        self.mock_catalog_contains_course_runs(
+            [self.course_run.id],
+            self.condition.enterprise_customer_uuid,
+            enterprise_customer_catalog_uuid=self.condition.enterprise_customer_catalog_uuid,
+        )
+
+        with override_switch(ENTERPRISE_DISCOUNT_LEDGER_SWITCH, active=True):
+            self.assertTrue(self.condition.is_satisfied(offer, basket))
+            self.assertEqual(offer.user_discount_ledgers.get(user=self.user).amount, 50)
+
+            order = OrderFactory(user=self.user, status=ORDER.OPEN)
+            OrderDiscountFactory(order=order, offer_id=offer.id, amount=10)
+            order.set_status(ORDER.COMPLETE)
+            self.assertFalse(self.condition.is_satisfied(offer, basket))
+
     @httpretty.activate
     def test_absolute_benefit_offer_availability(self):
         """
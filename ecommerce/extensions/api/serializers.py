@@ -2,7 +2,7 @@
 
 
 import logging
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from decimal import Decimal
 from urllib.parse import urljoin
 
@@ -13,7 +13,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Count, Q, Sum, prefetch_related_objects
+from django.db.models import Count, Prefetch, Q, prefetch_related_objects
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from oscar.core.loading import get_class, get_model
@@ -48,6 +48,7 @@ from ecommerce.extensions.offer.utils import (
     send_assigned_offer_reminder_email,
     send_revoked_offer_email
 )
+from ecommerce.extensions.voucher.usage_summary import ACTIVE_ASSIGNMENT_STATUSES, get_voucher_num_assignments
 from ecommerce.invoice.models import Invoice
 
 logger = logging.getLogger(__name__)
@@ -58,6 +59,7 @@ Benefit = get_model('offer', 'Benefit')
 BillingAddress = get_model('order', 'BillingAddress')
 Catalog = get_model('catalogue', 'Catalog')
 Category = get_model('catalogue', 'Category')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
 Line = get_model('order', 'Line')
 OfferAssignment = get_model('offer', 'OfferAssignment')
 OfferAssignmentEmailTemplates = get_model('offer', 'OfferAssignmentEmailTemplates')
@@ -721,6 +723,18 @@ class VoucherSerializer(serializers.ModelSerializer):
         )
 
 
+class CodeUsageListSerializer(serializers.ListSerializer):  # pylint: disable=abstract-method
+    """
+    Serializes a page of code usages, loading the vouchers, offer assignments and voucher applications of all of
+    its rows with a fixed number of queries.
+    """
+
+    def to_representation(self, data):
+        rows = list(data)
+        self.child.load_usages(rows)
+        return super(CodeUsageListSerializer, self).to_representation(rows)
+
+
 class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-method
     code = serializers.SerializerMethodField()
     assigned_to = serializers.SerializerMethodField()
@@ -730,13 +744,61 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
     last_reminder_date = serializers.SerializerMethodField()
     revocation_date = serializers.SerializerMethodField()
 
+    # Usages loaded by load_usages for the rows serialized by CodeUsageListSerializer.
+    usages = None
+
+    class Meta:
+        list_serializer_class = CodeUsageListSerializer
+
+    def load_usages(self, rows):
+        """
+        Load the vouchers, offer assignments and voucher applications of the rows, keyed by code and by lowercase
+        code and email pairs.
+        """
+        codes = {self.get_code(row) for row in rows}
+        emails = {self.get_assigned_to(row) for row in rows} - {'', None}
+        offers = ConditionalOffer.objects.select_related('condition')
+        vouchers = {
+            voucher.code: voucher
+            for voucher in Voucher.objects.filter(code__in=codes).prefetch_related(Prefetch('offers', queryset=offers))
+        }
+        usages = {
+            'vouchers': vouchers,
+            'assignments': {},
+            'num_assignments': defaultdict(int),
+            'num_applications': {},
+        }
+
+        if emails:
+            for assignment in OfferAssignment.objects.filter(code__in=codes, user_email__in=emails).order_by('id'):
+                key = (assignment.code, assignment.user_email.lower())
+                usages['assignments'].setdefault(key, assignment)
+                if assignment.status in ACTIVE_ASSIGNMENT_STATUSES:
+                    usages['num_assignments'][key] += 1
+
+            applications = VoucherApplication.objects.filter(
+                voucher__code__in=codes, user__email__in=emails
+            ).values('voucher__code', 'user__email').annotate(count=Count('id')).order_by()
+            for application in applications:
+                key = (application['voucher__code'], application['user__email'].lower())
+                usages['num_applications'][key] = usages['num_applications'].get(key, 0) + application['count']
+
+        self.usages = usages
+
     def _get_assignment(self, obj):
         assigned_to = self.get_assigned_to(obj)
         code = self.get_code(obj)
         if assigned_to and code:
+            if self.usages is not None:
+                return self.usages['assignments'].get((code, assigned_to.lower()))
             return OfferAssignment.objects.filter(code=code, user_email=assigned_to).first()
         return None
 
+    def _get_voucher(self, code):
+        if self.usages is not None:
+            return self.usages['vouchers'][code]
+        return Voucher.objects.get(code=code)
+
     def get_assignment_date(self, obj):
         assignment = self._get_assignment(obj)
         if assignment:
@@ -763,7 +825,7 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
         return obj.get('user_email')
 
     def get_redemptions(self, obj):
-        voucher = Voucher.objects.get(code=self.get_code(obj))
+        voucher = self._get_voucher(self.get_code(obj))
         offer = voucher.best_offer
         redemption_count = voucher.num_orders
 
@@ -780,6 +842,15 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
         }
 
     def num_assignments(self, code, user_email=None):
+        if self.usages is not None:
+            if user_email:
+                return self.usages['num_assignments'][(code, user_email.lower())]
+            if 'code_assignments' not in self.usages:
+                self.usages['code_assignments'] = get_voucher_num_assignments(
+                    Voucher.objects.filter(code__in=list(self.usages['vouchers']))
+                )
+            return self.usages['code_assignments'][code]
+
         offer_assignments = OfferAssignment.objects.filter(
             code=code,
             status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING, OFFER_ASSIGNMENT_EMAIL_BOUNCED],
@@ -789,6 +860,12 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
 
         return offer_assignments.count()
 
+    def num_applications(self, code, user_email):
+        if self.usages is not None:
+            return self.usages['num_applications'].get((code, user_email.lower()), 0)
+
+        return VoucherApplication.objects.filter(voucher__code=code, user__email=user_email).count()
+
 
 class NotAssignedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=abstract-method
 
@@ -822,10 +899,7 @@ class PartialRedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disabl
             return super(PartialRedeemedCodeUsageSerializer, self).get_redemptions(obj)
 
         num_assignments = self.num_assignments(code=self.get_code(obj), user_email=self.get_assigned_to(obj))
-        num_applications = VoucherApplication.objects.filter(
-            voucher__code=self.get_code(obj),
-            user__email=self.get_assigned_to(obj)
-        ).count()
+        num_applications = self.num_applications(self.get_code(obj), self.get_assigned_to(obj))
         return {'used': num_applications, 'total': num_assignments + num_applications}
 
 
@@ -838,10 +912,7 @@ class RedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=abstr
         return obj.get('user__email')
 
     def get_redemptions(self, obj):
-        num_applications = VoucherApplication.objects.filter(
-            voucher__code=self.get_code(obj),
-            user__email=self.get_assigned_to(obj)
-        ).count()
+        num_applications = self.num_applications(self.get_code(obj), self.get_assigned_to(obj))
         return {'used': num_applications, 'total': num_applications}
 
 
@@ -967,13 +1038,8 @@ class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
         Return number of available assignments.
         """
         all_slots_available = 0
-        enterprise_offer = vouchers.first().enterprise_offer
-
-        assignments = OfferAssignment.objects.filter(code__in=vouchers.values_list('code', flat=True)).exclude(
-            status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
-        ).values('code').annotate(num_assignments=Count('code')).order_by('code')
-
-        vouchers_num_assignments = {item['code']: item['num_assignments'] for item in assignments}
+        enterprise_offer = vouchers[0].enterprise_offer
+        vouchers_num_assignments = get_voucher_num_assignments(vouchers)
 
         for voucher in vouchers:
             num_assignments = vouchers_num_assignments.get(voucher.code, 0)
@@ -1014,16 +1080,17 @@ class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
     def to_representation(self, coupon):  # pylint: disable=arguments-differ
         representation = super(EnterpriseCouponOverviewListSerializer, self).to_representation(coupon)
 
-        vouchers = coupon.attr.coupon_vouchers.vouchers.all()
-        voucher = vouchers.first()
+        # The vouchers are fetched once, but the queryset is kept so that they can be used as a subquery.
+        vouchers = coupon.attr.coupon_vouchers.vouchers.order_by('id')
+        count = len(vouchers)
+        voucher = vouchers[0]
         usage = voucher.usage
-        count = vouchers.count()
-        num_orders = vouchers.aggregate(Sum('num_orders'))
+        num_orders = sum(voucher.num_orders for voucher in vouchers)
 
         data = {
             'start_date': voucher.start_datetime,
             'end_date': voucher.end_datetime,
-            'num_uses': num_orders['num_orders__sum'],
+            'num_uses': num_orders,
             'usage_limitation': usage,
             'num_codes': count,
             'max_uses': self._get_max_uses(voucher, usage, count),
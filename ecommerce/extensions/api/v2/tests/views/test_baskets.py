@@ -26,7 +26,7 @@ from ecommerce.extensions.api import exceptions as api_exceptions
 from ecommerce.extensions.api.tests.test_authentication import AccessTokenMixin
 from ecommerce.extensions.api.v2.tests.views import JSON_CONTENT_TYPE, OrderDetailViewTestMixin
 from ecommerce.extensions.api.v2.views.baskets import BasketCalculateView, BasketCreateView
-from ecommerce.extensions.basket.constants import EMAIL_OPT_IN_ATTRIBUTE
+from ecommerce.extensions.basket.constants import EMAIL_OPT_IN_ATTRIBUTE, IN_MEMORY_BASKET_CALCULATION_SWITCH
 from ecommerce.extensions.payment import exceptions as payment_exceptions
 from ecommerce.extensions.payment.models import PaymentProcessorResponse
 from ecommerce.extensions.payment.processors.cybersource import Cybersource
@@ -546,6 +546,25 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data, expected)
 
+    @override_switch(IN_MEMORY_BASKET_CALCULATION_SWITCH, active=True)
+    @httpretty.activate
+    def test_basket_calculate_in_memory(self):
+        """ Verify in-memory basket calculation returns the same totals without writing baskets """
+        voucher, _ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        url = self.url + '&code={code}'.format(code=voucher.code)
+
+        with mock.patch.object(Basket, 'save') as mock_save:
+            response = self.client.get(url)
+        mock_save.assert_not_called()
+
+        expected = {
+            'total_incl_tax_excl_discounts': self.product_total,
+            'total_incl_tax': self.product_total - 5,
+            'currency': 'GBP'
+        }
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, expected)
+
     def test_basket_calculate_fixed_coupon(self):
         """ Verify successful basket calculation for a fixed price voucher """
         discount = 5
@@ -1006,3 +1025,146 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.client.logout()
         self.client.login(username=user.username, password=self.password)
         return user
+
+
+@ddt.ddt
+class BasketCalculateBatchViewTests(TestCase):
+    def setUp(self):
+        super(BasketCalculateBatchViewTests, self).setUp()
+        self.products = ProductFactory.create_batch(3, stockrecords__partner=self.partner, categories=[])
+        self.skus = [product.stockrecords.first().partner_sku for product in self.products]
+        self.path = reverse('api:v2:baskets:calculate_batch')
+        self.range = factories.RangeFactory(includes_all_products=True)
+        self.user = self.create_user(is_staff=True)
+        self.client.login(username=self.user.username, password=self.password)
+
+    def _post(self, baskets, **data):
+        data.setdefault('username', self.user.username)
+        data['baskets'] = baskets
+        return self.client.post(self.path, json.dumps(data), JSON_CONTENT_TYPE)
+
+    def _expected_totals(self, products, total_incl_tax=None):
+        product_total = sum(product.stockrecords.first().price_excl_tax for product in products)
+        return {
+            'total_incl_tax_excl_discounts': product_total,
+            'total_incl_tax': product_total if total_incl_tax is None else total_incl_tax,
+            'currency': 'GBP'
+        }
+
+    def test_no_authentication(self):
+        """ Verify that un-authenticated users are rejected """
+        self.client.logout()
+        response = self._post([{'skus': self.skus}])
+        self.assertEqual(response.status_code, 401)
+
+    def test_get_not_allowed(self):
+        """ Verify the batch endpoint only accepts POST requests """
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 405)
+
+    @ddt.data(None, [], {}, [{}], [{'skus': []}], [{'skus': 'foo'}], ['foo'])
+    def test_invalid_baskets(self, baskets):
+        """ Verify bad response when the requested baskets are missing or malformed """
+        response = self._post(baskets)
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BASKET_CALCULATE_BATCH_MAX_SIZE=2)
+    def test_too_many_baskets(self):
+        """ Verify bad response when requesting more baskets than allowed """
+        response = self._post([{'skus': [sku]} for sku in self.skus])
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_calculate(self):
+        """ Verify every requested basket is calculated, in order, with its own voucher """
+        voucher, _ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        baskets = [
+            {'skus': self.skus},
+            {'skus': self.skus[:1], 'code': voucher.code},
+            {'skus': ['foo']},
+            {'skus': self.skus[1:], 'code': 'foo'},
+        ]
+
+        response = self._post(baskets)
+
+        first_price = self.products[0].stockrecords.first().price_excl_tax
+        expected = [
+            dict(self._expected_totals(self.products), skus=sorted(self.skus), code=None),
+            dict(self._expected_totals(self.products[:1], first_price - 5), skus=self.skus[:1], code=voucher.code),
+            {'skus': ['foo'], 'code': None, 'error': 'Products with SKU(s) [foo] do not exist.'},
+            dict(self._expected_totals(self.products[1:]), skus=sorted(self.skus[1:]), code='foo'),
+        ]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'results': expected})
+        self.assertFalse(Basket.objects.exists())
+
+    @httpretty.activate
+    def test_batch_calculate_site_offer(self):
+        """ Verify site offers are applied to every basket of the batch """
+        benefit = factories.BenefitFactory(type=Benefit.PERCENTAGE, range=self.range, value=10.00)
+        condition = factories.ConditionFactory(value=1, range=self.range, type=Condition.COVERAGE)
+        factories.ConditionalOfferFactory(name=u'Test Offer', benefit=benefit, condition=condition,
+                                          offer_type=ConditionalOffer.SITE,
+                                          start_datetime=datetime.datetime.now() - datetime.timedelta(days=1),
+                                          end_datetime=datetime.datetime.now() + datetime.timedelta(days=2))
+
+        response = self._post([{'skus': [sku]} for sku in self.skus])
+
+        self.assertEqual(response.status_code, 200)
+        for sku, result in zip(self.skus, response.data['results']):
+            single_response = self.client.get(
+                reverse('api:v2:baskets:calculate'), {'sku': sku, 'username': self.user.username}
+            )
+            self.assertEqual(dict(single_response.data, skus=[sku], code=None), result)
+            self.assertLess(result['total_incl_tax'], result['total_incl_tax_excl_discounts'])
+
+    @override_switch(IN_MEMORY_BASKET_CALCULATION_SWITCH, active=True)
+    def test_batch_calculate_in_memory(self):
+        """ Verify in-memory calculation of a batch returns the same totals as the atomic calculation """
+        voucher, _ = prepare_voucher(_range=self.range, benefit_type=Benefit.PERCENTAGE, benefit_value=50)
+        baskets = [{'skus': self.skus}, {'skus': self.skus[:2], 'code': voucher.code}]
+
+        with mock.patch.object(Basket, 'save') as mock_save:
+            response = self._post(baskets)
+        mock_save.assert_not_called()
+
+        with override_switch(IN_MEMORY_BASKET_CALCULATION_SWITCH, active=False):
+            expected = self._post(baskets).data
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, expected)
+        self.assertLess(
+            response.data['results'][1]['total_incl_tax'],
+            response.data['results'][1]['total_incl_tax_excl_discounts']
+        )
+
+    def test_batch_calculate_by_nonstaff_user_other_username(self):
+        """ Verify a non-staff user cannot calculate baskets for another user """
+        user = self.create_user(is_staff=False)
+        self.client.login(username=user.username, password=self.password)
+        response = self._post([{'skus': self.skus}], username=self.user.username)
+        self.assertEqual(response.status_code, 403)
+
+    @mock.patch(
+        'ecommerce.extensions.api.v2.views.baskets.BasketCalculateBatchView._calculate_temporary_baskets'
+    )
+    def test_batch_calculate_anonymous_caching(self, mock_calculate_baskets):
+        """ Verify anonymous baskets are cached individually """
+        totals = self._expected_totals(self.products[:1])
+        mock_calculate_baskets.return_value = [totals]
+
+        response = self._post([{'skus': self.skus[:1]}], username=None, is_anonymous=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mock_calculate_baskets.call_args[0][2]), 1)
+        mock_calculate_baskets.reset_mock()
+
+        # Only the basket which was not cached yet is calculated.
+        mock_calculate_baskets.return_value = [totals]
+        response = self._post(
+            [{'skus': self.skus[:1]}, {'skus': self.skus[1:2]}], username=None, is_anonymous=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mock_calculate_baskets.call_args[0][2]), 1)
+        self.assertEqual(mock_calculate_baskets.call_args[0][2][0]['skus'], self.skus[1:2])
+        self.assertEqual(
+            response.data['results'],
+            [dict(totals, skus=self.skus[:1], code=None), dict(totals, skus=self.skus[1:2], code=None)]
+        )
@@ -12,7 +12,9 @@ import httpretty
 import mock
 import rules
 from django.conf import settings
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import urlencode
@@ -936,6 +938,39 @@ class EnterpriseCouponViewSetRbacTests(
             pagination=pagination,
         )
 
+    def get_codes_detail_num_queries(self, coupon_id, code_filter, page_size):
+        """
+        Returns the number of queries made by the code details endpoint for a page of the given size.
+        """
+        endpoint = '/api/v2/enterprise/coupons/{}/codes/?code_filter={}&page_size={}'.format(
+            coupon_id, code_filter, page_size
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_response('GET', endpoint).json()
+        self.assertEqual(len(response['results']), page_size)
+        return len(queries)
+
+    @ddt.data(VOUCHER_NOT_ASSIGNED, VOUCHER_NOT_REDEEMED, VOUCHER_PARTIAL_REDEEMED, VOUCHER_REDEEMED)
+    def test_coupon_codes_detail_queries(self, code_filter):
+        """
+        Verify that the number of queries made by the code details endpoint does not depend on the page size.
+        """
+        coupon_post_data = dict(self.data, voucher_type=Voucher.MULTI_USE, quantity=3, max_uses=10)
+        coupon_id = self.get_response('POST', ENTERPRISE_COUPONS_LINK, coupon_post_data).json()['coupon_id']
+        vouchers = Product.objects.get(id=coupon_id).attr.coupon_vouchers.vouchers.all()
+
+        for index, voucher in enumerate(vouchers):
+            self.assign_user_to_code(coupon_id, ['assigned{}@example.com'.format(index)], [voucher.code])
+            self.assign_user_to_code(coupon_id, ['partial{}@example.com'.format(index)], [voucher.code])
+            self.use_voucher(voucher, self.create_user(email='partial{}@example.com'.format(index)))
+            self.use_voucher(voucher, self.create_user())
+
+        self.get_codes_detail_num_queries(coupon_id, code_filter, 3)
+        self.assertEqual(
+            self.get_codes_detail_num_queries(coupon_id, code_filter, 1),
+            self.get_codes_detail_num_queries(coupon_id, code_filter, 3)
+        )
+
     def test_unredeemed_filter_email_bounced_codes(self):
         """
         Test that codes with `OFFER_ASSIGNMENT_EMAIL_BOUNCED` error status are shown in unredeemed filter.
@@ -7,7 +7,9 @@ import ddt
 import httpretty
 import mock
 import pytz
+from django.db import connection
 from django.http import Http404
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
 from opaque_keys.edx.keys import CourseKey
@@ -211,6 +213,28 @@ class VoucherViewSetTests(DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockMixi
             self.assertTrue(offer['multiple_credit_providers'])
             self.assertIsNone(offer['credit_provider_price'])
 
+    @httpretty.activate
+    @ddt.data('verified', 'credit')
+    def test_offers_queries(self, seat_type):
+        """ Verify the number of queries made to build the offers does not depend on the number of products. """
+        self.mock_access_token_response()
+        products, request, voucher = self.prepare_get_offers_response(quantity=3, seat_type=seat_type)
+        for product in products:
+            self.mock_eligibility_api(request, self.user, product.course_id)
+
+        num_queries = []
+        # The first pass warms up the site's caches.
+        for quantity in (3, 1, 3):
+            response = {
+                'results': [{'key': product.course_id, 'title': product.title} for product in products[:quantity]]
+            }
+            with CaptureQueriesContext(connection) as queries:
+                offers = VoucherViewSet().convert_catalog_response_to_offers(request, voucher, response)
+            self.assertEqual([offer['seat_type'] for offer in offers], [seat_type] * quantity)
+            num_queries.append(len(queries))
+
+        self.assertEqual(num_queries[1], num_queries[2])
+
     def test_omitting_expired_courses(self):
         """Verify professional courses who's enrollment end datetime have passed are omitted."""
         no_enrollment_end_seat = CourseFactory(partner=self.partner).create_or_update_seat('professional', False, 100)
@@ -4,9 +4,11 @@
 import logging
 import warnings
 
+import waffle
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Prefetch
 from django.http import HttpResponseBadRequest, HttpResponseForbidden
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext as _
@@ -26,7 +28,7 @@ from ecommerce.extensions.api import exceptions as api_exceptions
 from ecommerce.extensions.api.permissions import IsStaffOrOwner
 from ecommerce.extensions.api.serializers import BasketSerializer, OrderSerializer
 from ecommerce.extensions.api.throttles import ServiceUserThrottle
-from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
+from ecommerce.extensions.basket.constants import IN_MEMORY_BASKET_CALCULATION_SWITCH, TEMPORARY_BASKET_CACHE_KEY
 from ecommerce.extensions.basket.utils import attribute_cookie_data
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.partner.shortcuts import get_partner_for_site
@@ -35,11 +37,13 @@ from ecommerce.extensions.payment.helpers import get_default_processor_class, ge
 
 Applicator = get_class('offer.applicator', 'Applicator')
 Basket = get_model('basket', 'Basket')
+InMemoryBasket = get_model('basket', 'InMemoryBasket')
 logger = logging.getLogger(__name__)
 Order = get_model('order', 'Order')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 Product = get_model('catalogue', 'Product')
 Selector = get_class('partner.strategy', 'Selector')
+StockRecord = get_model('partner', 'StockRecord')
 User = get_user_model()
 Voucher = get_model('voucher', 'Voucher')
 
@@ -372,6 +376,39 @@ class BasketCalculateView(generics.GenericAPIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @staticmethod
+    def _get_basket_totals(basket):
+        return {
+            'total_incl_tax_excl_discounts': round(basket.total_incl_tax_excl_discounts, 2),
+            'total_incl_tax': round(basket.total_incl_tax, 2),
+            'currency': basket.currency
+        }
+
+    def _calculate_temporary_basket(self, user, request, products, voucher, skus, code):
+        """
+        Calculate the basket totals using an in-memory basket, which never touches the database.
+        """
+        try:
+            basket = InMemoryBasket(owner=user, site=request.site)
+            basket.strategy = Selector().strategy(user=user, request=request)
+
+            for product in products:
+                basket.add_product(product, 1)
+
+            if voucher:
+                basket.vouchers.add(voucher)
+
+            # Calculate any discounts on the basket.
+            Applicator().apply(basket, user=user, request=request, bundle_id=request.GET.get('bundle'))
+
+            return self._get_basket_totals(basket)
+        except:  # pylint: disable=bare-except
+            logger.exception(
+                'Failed to calculate basket discount for SKUs [%s] and voucher [%s].',
+                skus, code
+            )
+            raise
+
     def _calculate_temporary_basket_atomic(self, user, request, products, voucher, skus, code):
         response = None
         try:
@@ -397,11 +434,7 @@ class BasketCalculateView(generics.GenericAPIView):
                 if basket.voucher_discounts:
                     discounts.extend(basket.voucher_discounts)
 
-                response = {
-                    'total_incl_tax_excl_discounts': round(basket.total_incl_tax_excl_discounts, 2),
-                    'total_incl_tax': round(basket.total_incl_tax, 2),
-                    'currency': basket.currency
-                }
+                response = self._get_basket_totals(basket)
                 raise api_exceptions.TemporaryBasketException
         except api_exceptions.TemporaryBasketException:
             pass
@@ -413,58 +446,27 @@ class BasketCalculateView(generics.GenericAPIView):
             raise
         return response
 
-    def get(self, request):  # pylint: disable=too-many-statements
-        """ Calculate basket totals given a list of sku's
-
-        Create a temporary basket add the sku's and apply an optional voucher code.
-        Then calculate the total price less discounts. If a voucher code is not
-        provided apply a voucher in the Enterprise entitlements available
-        to the user.
+    def _get_basket_owner(self, request, requested_username, is_anonymous):
+        """
+        Determine the user for whom baskets should be calculated.
 
-        Query Params:
-            sku (string): A list of sku(s) to calculate
-            code (string): Optional voucher code to apply to the basket.
-            username (string): Optional username of a user for which to calculate the basket.
+        Arguments:
+            request (Request): The current request.
+            requested_username (str): Optional username of a user for which to calculate baskets.
+            is_anonymous (bool): Whether baskets should be calculated for an anonymous user.
 
         Returns:
-            JSON: {
-                    'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
-                    'total_incl_tax': basket.total_incl_tax,
-                    'currency': basket.currency
-                }
-
-         Side effects:
-            If the basket owner does not have an LMS user id, tries to find it. If found, adds the id to the user and
-            saves the user. If the id cannot be found, writes custom metrics to record this fact.
-       """
-        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
-
-        partner = get_partner_for_site(request)
-        skus = request.GET.getlist('sku')
-        if not skus:
-            return HttpResponseBadRequest(_('No SKUs provided.'))
-        skus.sort()
-
-        code = request.GET.get('code', None)
-        try:
-            voucher = Voucher.objects.get(code=code) if code else None
-        except Voucher.DoesNotExist:
-            voucher = None
-
-        products = Product.objects.filter(stockrecords__partner=partner, stockrecords__partner_sku__in=skus)
-        if not products:
-            return HttpResponseBadRequest(_('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus)))
-
+            tuple: The basket owner (None for anonymous baskets), whether the default (anonymous) basket
+                should be used, and an error response if the request is invalid (None otherwise).
+        """
         basket_owner = request.user
-
-        requested_username = request.GET.get('username', default='')
-        is_anonymous = request.GET.get('is_anonymous', 'false').lower() == 'true'
-
         use_default_basket = is_anonymous
 
         # validate query parameters
         if requested_username and is_anonymous:
-            return HttpResponseBadRequest(_('Provide username or is_anonymous query param, but not both'))
+            return None, False, HttpResponseBadRequest(
+                _('Provide username or is_anonymous query param, but not both')
+            )
         if not requested_username and not is_anonymous:
             logger.warning("Request to Basket Calculate must supply either username or is_anonymous query"
                            " param. Requesting user=%s. Future versions of this API will treat this "
@@ -484,7 +486,7 @@ class BasketCalculateView(generics.GenericAPIView):
                     # never purchased before.
                     use_default_basket = True
             else:
-                return HttpResponseForbidden('Unauthorized user credentials')
+                return None, False, HttpResponseForbidden('Unauthorized user credentials')
 
         if basket_owner.username == self.MARKETING_USER and not use_default_basket:
             # For legacy requests that predate is_anonymous parameter, we will calculate
@@ -502,11 +504,63 @@ class BasketCalculateView(generics.GenericAPIView):
                 called_from = u'calculation of basket total'
                 basket_owner.add_lms_user_id('ecommerce_missing_lms_user_id_calculate_basket_total', called_from)
         except MissingLmsUserIdException:
-            return self._report_bad_request(
+            return None, False, self._report_bad_request(
                 api_exceptions.LMS_USER_ID_NOT_FOUND_DEVELOPER_MESSAGE.format(user_id=basket_owner.id),
                 api_exceptions.LMS_USER_ID_NOT_FOUND_USER_MESSAGE
             )
 
+        return basket_owner, use_default_basket, None
+
+    def get(self, request):
+        """ Calculate basket totals given a list of sku's
+
+        Create a temporary basket add the sku's and apply an optional voucher code.
+        Then calculate the total price less discounts. If a voucher code is not
+        provided apply a voucher in the Enterprise entitlements available
+        to the user.
+
+        Query Params:
+            sku (string): A list of sku(s) to calculate
+            code (string): Optional voucher code to apply to the basket.
+            username (string): Optional username of a user for which to calculate the basket.
+
+        Returns:
+            JSON: {
+                    'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+                    'total_incl_tax': basket.total_incl_tax,
+                    'currency': basket.currency
+                }
+
+         Side effects:
+            If the basket owner does not have an LMS user id, tries to find it. If found, adds the id to the user and
+            saves the user. If the id cannot be found, writes custom metrics to record this fact.
+       """
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+
+        partner = get_partner_for_site(request)
+        skus = request.GET.getlist('sku')
+        if not skus:
+            return HttpResponseBadRequest(_('No SKUs provided.'))
+        skus.sort()
+
+        code = request.GET.get('code', None)
+        try:
+            voucher = Voucher.objects.get(code=code) if code else None
+        except Voucher.DoesNotExist:
+            voucher = None
+
+        products = Product.objects.filter(stockrecords__partner=partner, stockrecords__partner_sku__in=skus)
+        if not products:
+            return HttpResponseBadRequest(_('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus)))
+
+        basket_owner, use_default_basket, error_response = self._get_basket_owner(
+            request,
+            request.GET.get('username', default=''),
+            request.GET.get('is_anonymous', 'false').lower() == 'true'
+        )
+        if error_response:
+            return error_response
+
         cache_key = None
         bundle_id = request.GET.get('bundle')
         if use_default_basket:
@@ -523,8 +577,188 @@ class BasketCalculateView(generics.GenericAPIView):
             if cached_response.is_found:
                 return Response(cached_response.value)
 
-        response = self._calculate_temporary_basket_atomic(basket_owner, request, products, voucher, skus, code)
+        if waffle.switch_is_active(IN_MEMORY_BASKET_CALCULATION_SWITCH):
+            response = self._calculate_temporary_basket(basket_owner, request, products, voucher, skus, code)
+        else:
+            response = self._calculate_temporary_basket_atomic(basket_owner, request, products, voucher, skus, code)
         if response and use_default_basket:
             TieredCache.set_all_tiers(cache_key, response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT)
 
         return Response(response)
+
+
+class BasketCalculateBatchView(BasketCalculateView):
+    """
+    Calculate the totals of many temporary baskets in a single request.
+
+    Products, vouchers and the offers which do not depend on basket contents are loaded once for the
+    whole batch, and catalog membership results cached while pricing one basket are reused by the others.
+    """
+    http_method_names = ['post', 'options']
+
+    def _calculate_temporary_baskets(self, user, request, entries, bundle_id):
+        """
+        Calculate the totals of the given baskets without committing anything to the database.
+
+        Arguments:
+            user (User): The basket owner, None for anonymous baskets.
+            request (Request): The current request.
+            entries (list of dict): Baskets to calculate, each with its products and optional voucher.
+            bundle_id (str): Optional bundle (program) UUID shared by all baskets.
+
+        Returns:
+            list of dict: The totals of each basket, in the order of the given entries.
+        """
+        applicator = Applicator()
+        strategy = Selector().strategy(user=user, request=request)
+        shared_offers = applicator.get_shared_offers(request.site, user, bundle_id)
+
+        def calculate(basket, entry):
+            basket.strategy = strategy
+
+            for product in entry['products']:
+                basket.add_product(product, 1)
+
+            if entry['voucher']:
+                basket.vouchers.add(entry['voucher'])
+
+            # Calculate any discounts on the basket.
+            applicator.apply_shared_offers(basket, shared_offers, user=user, request=request)
+            return self._get_basket_totals(basket)
+
+        responses = []
+        try:
+            if waffle.switch_is_active(IN_MEMORY_BASKET_CALCULATION_SWITCH):
+                responses = [calculate(InMemoryBasket(owner=user, site=request.site), entry) for entry in entries]
+            else:
+                # We wrap this in an atomic operation so we never commit these baskets to the db.
+                # This is to avoid merging a temporary basket with a real user basket.
+                with transaction.atomic():
+                    responses = [calculate(Basket(owner=user, site=request.site), entry) for entry in entries]
+                    raise api_exceptions.TemporaryBasketException
+        except api_exceptions.TemporaryBasketException:
+            pass
+        except:  # pylint: disable=bare-except
+            logger.exception(
+                'Failed to calculate basket discounts for batch [%s].',
+                [(entry['skus'], entry['code']) for entry in entries]
+            )
+            raise
+        return responses
+
+    def post(self, request):
+        """ Calculate the totals of several baskets given lists of sku's
+
+        For each requested basket, create a temporary basket, add the sku's and apply the optional
+        voucher code. Then calculate the total price less discounts. All baskets are calculated for
+        the same user, following the same rules as the single basket calculation endpoint.
+
+        Request Body:
+            baskets (list): Baskets to calculate, each a dict with a list of 'skus' and an optional
+                voucher 'code'.
+            username (string): Optional username of a user for which to calculate the baskets.
+            is_anonymous (bool): Optional, calculate the baskets for an anonymous user.
+            bundle (string): Optional bundle (program) UUID.
+
+        Returns:
+            JSON: {
+                    'results': [
+                        {
+                            'skus': skus,
+                            'code': code,
+                            'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+                            'total_incl_tax': basket.total_incl_tax,
+                            'currency': basket.currency
+                        },
+                        ...
+                    ]
+                }
+
+            Baskets whose SKUs do not match any product contain an 'error' message instead of totals.
+        """
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+
+        requested_baskets = request.data.get('baskets')
+        if not requested_baskets or not isinstance(requested_baskets, list):
+            return HttpResponseBadRequest(_('No baskets provided.'))
+        if len(requested_baskets) > settings.BASKET_CALCULATE_BATCH_MAX_SIZE:
+            return HttpResponseBadRequest(
+                _('No more than {max_size} baskets can be calculated at once.').format(
+                    max_size=settings.BASKET_CALCULATE_BATCH_MAX_SIZE
+                )
+            )
+
+        entries = []
+        for requested_basket in requested_baskets:
+            skus = requested_basket.get('skus') if isinstance(requested_basket, dict) else None
+            if not skus or not isinstance(skus, list):
+                return HttpResponseBadRequest(_('No SKUs provided.'))
+            entries.append({'skus': sorted(skus), 'code': requested_basket.get('code') or None})
+
+        basket_owner, use_default_basket, error_response = self._get_basket_owner(
+            request,
+            request.data.get('username') or '',
+            str(request.data.get('is_anonymous', 'false')).lower() == 'true'
+        )
+        if error_response:
+            return error_response
+
+        # Load the products and vouchers of every basket at once.
+        partner = get_partner_for_site(request)
+        all_skus = {sku for entry in entries for sku in entry['skus']}
+        products = Product.objects.filter(
+            stockrecords__partner=partner, stockrecords__partner_sku__in=all_skus
+        ).prefetch_related(
+            Prefetch('stockrecords', queryset=StockRecord.objects.filter(partner=partner))
+        ).distinct()
+        products_with_skus = [
+            (product, {stockrecord.partner_sku for stockrecord in product.stockrecords.all()})
+            for product in products
+        ]
+        codes = {entry['code'] for entry in entries if entry['code']}
+        vouchers = {voucher.code: voucher for voucher in Voucher.objects.filter(code__in=codes)} if codes else {}
+
+        bundle_id = request.data.get('bundle')
+        results = [None] * len(entries)
+        uncached = []
+        for index, entry in enumerate(entries):
+            skus = set(entry['skus'])
+            entry['products'] = [product for product, product_skus in products_with_skus if product_skus & skus]
+            entry['voucher'] = vouchers.get(entry['code'])
+            result = {'skus': entry['skus'], 'code': entry['code']}
+            results[index] = result
+
+            if not entry['products']:
+                result['error'] = _('Products with SKU(s) [{skus}] do not exist.').format(
+                    skus=', '.join(entry['skus'])
+                )
+                continue
+
+            if use_default_basket:
+                # Anonymous baskets share the cache of the single basket calculation endpoint.
+                cache_key_kwargs = {'code': entry['code']} if entry['code'] else {}
+                entry['cache_key'] = get_cache_key(
+                    site_domain=request.site,
+                    resource_name='calculate',
+                    skus=entry['skus'],
+                    bundle_id=bundle_id,
+                    **cache_key_kwargs
+                )
+                cached_response = TieredCache.get_cached_response(entry['cache_key'])
+                if cached_response.is_found:
+                    result.update(cached_response.value)
+                    continue
+
+            entry['index'] = index
+            uncached.append(entry)
+
+        if uncached:
+            responses = self._calculate_temporary_baskets(basket_owner, request, uncached, bundle_id)
+            for entry, response in zip(uncached, responses):
+                results[entry['index']].update(response)
+                if use_default_basket:
+                    TieredCache.set_all_tiers(
+                        entry['cache_key'], response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT
+                    )
+
+        return Response({'results': results})
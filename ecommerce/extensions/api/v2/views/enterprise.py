@@ -6,16 +6,7 @@ from urllib.parse import urlparse
 import django_filters
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import (
-    Count,
-    ExpressionWrapper,
-    F,
-    OuterRef,
-    PositiveIntegerField,
-    Q,
-    Subquery,
-    prefetch_related_objects
-)
+from django.db.models import ExpressionWrapper, F, PositiveIntegerField, Q, prefetch_related_objects
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from edx_rbac.decorators import permission_required
@@ -68,13 +59,13 @@ from ecommerce.extensions.offer.constants import (
     OFFER_ASSIGNMENT_EMAIL_TEMPLATE_FIELD_LIMIT,
     OFFER_ASSIGNMENT_REVOKED,
     OFFER_MAX_USES_DEFAULT,
-    OFFER_REDEEMED,
     VOUCHER_NOT_ASSIGNED,
     VOUCHER_NOT_REDEEMED,
     VOUCHER_PARTIAL_REDEEMED,
     VOUCHER_REDEEMED
 )
 from ecommerce.extensions.offer.utils import update_assignments_for_multi_use_per_customer
+from ecommerce.extensions.voucher.usage_summary import get_voucher_num_assignments
 from ecommerce.extensions.voucher.utils import (
     create_enterprise_vouchers,
     update_voucher_offer,
@@ -418,24 +409,15 @@ class EnterpriseCouponViewSet(CouponViewSet):
 
         # Now filter out vouchers that can be assign to multiple customers but not fully assigned
         offer_max_uses = vouchers.first().enterprise_offer.max_global_applications or OFFER_MAX_USES_DEFAULT
-        offer_assignments_subquery = OfferAssignment.objects.filter(
-            code=OuterRef('code')
-        ).exclude(
-            status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
-        ).order_by().values('code').annotate(
-            count=Count('*')
-        ).values('count')
+        multi_customer_vouchers = vouchers.filter(usage__in=[Voucher.MULTI_USE, Voucher.ONCE_PER_CUSTOMER])
+        # Initializes the usage summaries of the vouchers, which hold their number of active assignments.
+        get_voucher_num_assignments(multi_customer_vouchers)
 
-        partially_assigned_multi_customer_vouchers = vouchers.filter(
-            usage__in=[Voucher.MULTI_USE, Voucher.ONCE_PER_CUSTOMER]
-        ).annotate(
-            num_assignments=Subquery(
-                queryset=offer_assignments_subquery,
-                output_field=PositiveIntegerField()
-            )
+        partially_assigned_multi_customer_vouchers = multi_customer_vouchers.filter(
+            usage_summary__num_assignments__gt=0
         ).annotate(
             usage_count=ExpressionWrapper(
-                F('num_orders') + F('num_assignments'),
+                F('num_orders') + F('usage_summary__num_assignments'),
                 output_field=PositiveIntegerField()
             )
         ).filter(usage_count__lt=offer_max_uses)
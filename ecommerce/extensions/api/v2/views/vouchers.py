@@ -8,6 +8,7 @@ import django_filters
 import pytz
 from dateutil.parser import parse
 from dateutil.utils import default_tzinfo
+from django.db.models import Count, OuterRef, Subquery
 from django.shortcuts import get_object_or_404
 from django.utils.timezone import now
 from opaque_keys.edx.keys import CourseKey
@@ -29,8 +30,9 @@ from ecommerce.extensions.api.permissions import IsOffersOrIsAuthenticatedAndSta
 from ecommerce.extensions.api.v2.views import NonDestroyableModelViewSet
 
 logger = logging.getLogger(__name__)
-Order = get_model('order', 'Order')
+Line = get_model('order', 'Line')
 Product = get_model('catalogue', 'Product')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
 StockRecord = get_model('partner', 'StockRecord')
 Voucher = get_model('voucher', 'Voucher')
 
@@ -105,14 +107,19 @@ class VoucherViewSet(NonDestroyableModelViewSet):
         from course IDs in course catalog response results. Professional courses
         which have a set enrollment end date and which has passed are omitted.
 
+        The products of all seat types are retrieved together with their courses, so that
+        offers can be built from them and their stock records without further queries.
+
         Args:
             results(dict): Course catalog response results.
             course_seat_types(str): Comma-separated list of accepted seat types.
 
         Returns:
-            Querysets of products and stock records retrieved from results.
+            The products, ordered by seat type, their stock records keyed by product ID, and
+            the metadata of the enrollable course runs keyed by course run key.
         """
         course_run_metadata = {}
+        current_time = now()
 
         def is_course_run_enrollable(course_run):
             # Checks if a course run is available for enrollment by checking the following conditions:
@@ -124,7 +131,6 @@ class VoucherViewSet(NonDestroyableModelViewSet):
                                 default_tzinfo(parse(course_run['enrollment_start']), pytz.UTC))
             enrollment_end = (course_run.get('enrollment_end') and
                               default_tzinfo(parse(course_run['enrollment_end']), pytz.UTC))
-            current_time = now()
 
             return (
                 (not end or end > current_time) and
@@ -144,14 +150,23 @@ class VoucherViewSet(NonDestroyableModelViewSet):
             elif is_course_run_enrollable(result):
                 course_run_metadata[result['key']] = result
 
-        products = []
-        for seat_type in course_seat_types.split(','):
-            products.extend(Product.objects.filter(
-                course_id__in=list(course_run_metadata.keys()),
-                attributes__name='certificate_type',
-                attribute_values__value_text=seat_type
-            ))
-        stock_records = StockRecord.objects.filter(product__in=products)
+        seat_types = course_seat_types.split(',')
+        certificate_types = ProductAttributeValue.objects.filter(
+            product=OuterRef('pk'), attribute__name='certificate_type'
+        ).values('value_text')[:1]
+        products = Product.objects.filter(
+            course_id__in=list(course_run_metadata.keys())
+        ).annotate(
+            certificate_type=Subquery(certificate_types)
+        ).filter(
+            certificate_type__in=seat_types
+        ).select_related('course', 'parent__product_class')
+        products = sorted(products, key=lambda product: seat_types.index(product.certificate_type))
+
+        stock_records = {
+            stock_record.product_id: stock_record
+            for stock_record in StockRecord.objects.filter(product__in=products)
+        }
         return products, stock_records, course_run_metadata
 
     def convert_catalog_response_to_offers(self, request, voucher, response):
@@ -168,10 +183,22 @@ class VoucherViewSet(NonDestroyableModelViewSet):
             response['results'], course_seat_types
         )
         contains_verified_course = ('verified' in course_seat_types)
+
+        if course_seat_types == 'credit':
+            purchased_product_ids = set(Line.objects.filter(
+                order__user=request.user, product__in=products
+            ).values_list('product_id', flat=True))
+            credit_seat_counts = dict(Product.objects.filter(
+                parent_id__in={product.parent_id for product in products}, attributes__name='credit_provider'
+            ).order_by().values_list('parent_id').annotate(count=Count('id', distinct=True)))
+            credit_eligibility = {}
+
         for product in products:
             # Omit unavailable seats from the offer results so that one seat does not cause an
             # error message for every seat in the query result.
-            if not request.strategy.fetch_for_product(product).availability.is_available_to_buy:
+            stock_record = stock_records.get(product.id)
+            purchase_info = request.strategy.fetch_for_product(product, stockrecord=stock_record)
+            if not purchase_info.availability.is_available_to_buy:
                 logger.info('%s is unavailable to buy. Omitting it from the results.', product)
                 continue
 
@@ -179,29 +206,27 @@ class VoucherViewSet(NonDestroyableModelViewSet):
             course_catalog_data = course_run_metadata[course_id]
             if course_seat_types == 'credit':
                 # Omit credit seats for which the user is not eligible or which the user already bought.
-                if not request.user.is_eligible_for_credit(product.course_id, request.site.siteconfiguration):
+                if course_id not in credit_eligibility:
+                    credit_eligibility[course_id] = request.user.is_eligible_for_credit(
+                        course_id, request.site.siteconfiguration
+                    )
+                if not credit_eligibility[course_id]:
                     continue
-                if Order.objects.filter(user=request.user, lines__product=product).exists():
+                if product.id in purchased_product_ids:
                     continue
-                credit_seats = Product.objects.filter(parent=product.parent, attributes__name='credit_provider')
 
-                if credit_seats.count() > 1:
+                if credit_seat_counts.get(product.parent_id, 0) > 1:
                     multiple_credit_providers = True
                     credit_provider_price = None
                 else:
                     multiple_credit_providers = False
-                    credit_provider_price = StockRecord.objects.get(product=product).price_excl_tax
+                    credit_provider_price = stock_record.price_excl_tax if stock_record else None
 
-            try:
-                stock_record = stock_records.get(product__id=product.id)
-            except StockRecord.DoesNotExist:
-                stock_record = None
+            if stock_record is None:
                 logger.error('Stock Record for product %s not found.', product.id)
 
-            try:
-                course = Course.objects.get(id=course_id)
-            except Course.DoesNotExist:  # pragma: no cover
-                course = None
+            course = product.course
+            if course is None:  # pragma: no cover
                 logger.error('Course %s not found.', course_id)
 
             if course_catalog_data and course and stock_record:
@@ -214,7 +239,8 @@ class VoucherViewSet(NonDestroyableModelViewSet):
                     is_verified=contains_verified_course,
                     product=product,
                     stock_record=stock_record,
-                    voucher=voucher
+                    voucher=voucher,
+                    seat_type=product.certificate_type,
                 ))
 
         return offers
@@ -316,7 +342,7 @@ class VoucherViewSet(NonDestroyableModelViewSet):
 
     def get_course_offer_data(
             self, benefit, course, course_info, credit_provider_price, is_verified,
-            multiple_credit_providers, product, stock_record, voucher
+            multiple_credit_providers, product, stock_record, voucher, seat_type=None
     ):
         """
         Gets course offer data.
@@ -327,6 +353,7 @@ class VoucherViewSet(NonDestroyableModelViewSet):
             is_verified (bool): Indicated whether or not the voucher's range of products contains a verified course seat
             stock_record (StockRecord): Stock record associated with the course seat
             voucher (Voucher): Voucher for which the course offer data is being fetched
+            seat_type (str): Certificate type of the course seat, if already known
         Returns:
             dict: Course offer data
         """
@@ -345,7 +372,7 @@ class VoucherViewSet(NonDestroyableModelViewSet):
             'multiple_credit_providers': multiple_credit_providers,
             'organization': CourseKey.from_string(course.id).org,
             'credit_provider_price': credit_provider_price,
-            'seat_type': product.attr.certificate_type,
+            'seat_type': seat_type or product.attr.certificate_type,
             'stockrecords': serializers.StockRecordSerializer(stock_record).data,
             'title': course_info.get('title', course.name),
             'voucher_end_date': voucher.end_datetime
@@ -1,3 +1,6 @@
 TEMPORARY_BASKET_CACHE_KEY = "ecommerce.is_calculate_temporary_basket"
 EMAIL_OPT_IN_ATTRIBUTE = "email_opt_in"
 PURCHASER_BEHALF_ATTRIBUTE = "purchased_for_organization"
+
+# Waffle switch used to calculate temporary baskets in memory, rather than in a rolled back transaction.
+IN_MEMORY_BASKET_CALCULATION_SWITCH = 'enable_in_memory_basket_calculation'
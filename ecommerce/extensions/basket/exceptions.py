@@ -13,3 +13,7 @@ class RedirectException(Exception):
 
 class VoucherException(Exception):
     """ Voucher Exception. """
+
+
+class InMemoryBasketError(Exception):
+    """ Raised when an in-memory basket is written to the database. """
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basket', '0013_auto_20200305_1448'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InMemoryBasket',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('basket.basket',),
+        ),
+    ]
@@ -5,10 +5,11 @@ from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from oscar.apps.basket.abstract_models import AbstractBasket
-from oscar.core.loading import get_class
+from oscar.core.loading import get_class, get_model
 
 from ecommerce.extensions.analytics.utils import track_segment_event, translate_basket_line_for_segment
 from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
+from ecommerce.extensions.basket.exceptions import InMemoryBasketError
 
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 Selector = get_class('partner.strategy', 'Selector')
@@ -128,5 +129,156 @@ class BasketAttribute(models.Model):
         unique_together = ('basket', 'attribute_type')
 
 
+class InMemoryRelatedObjects(list):
+    """
+    List of related objects standing in for a related manager of an InMemoryBasket.
+
+    Only the subset of the manager and queryset API used while pricing a basket is supported.
+    """
+
+    def all(self):
+        return InMemoryRelatedObjects(self)
+
+    def count(self):  # pylint: disable=arguments-differ
+        return len(self)
+
+    def exists(self):
+        return bool(self)
+
+    def first(self):
+        return self[0] if self else None
+
+    def filter(self, **kwargs):
+        return InMemoryRelatedObjects(
+            obj for obj in self if all(getattr(obj, key) == value for key, value in kwargs.items())
+        )
+
+    def add(self, *objs):
+        for obj in objs:
+            if obj not in self:
+                self.append(obj)
+
+    def remove(self, *objs):  # pylint: disable=arguments-differ
+        for obj in objs:
+            super(InMemoryRelatedObjects, self).remove(obj)
+
+
+class InMemoryRelation:
+    """
+    Descriptor replacing a related manager of an InMemoryBasket with an InMemoryRelatedObjects list.
+    """
+
+    def __init__(self, name):
+        self.attname = '_in_memory_{}'.format(name)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.__dict__.setdefault(self.attname, InMemoryRelatedObjects())
+
+
+class InMemoryBasket(Basket):
+    """
+    A basket which is never written to the database.
+
+    Lines and vouchers are kept in memory, which allows the totals of a temporary basket to be calculated
+    using the regular strategy, offers and benefits without any INSERTs, savepoints or rollbacks.
+    In-memory baskets cannot be saved, frozen or submitted.
+    """
+    lines = InMemoryRelation('lines')
+    vouchers = InMemoryRelation('vouchers')
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        raise InMemoryBasketError('In-memory baskets cannot be saved.')
+
+    def all_lines(self):
+        return self.lines.all()
+
+    def add_product(self, product, quantity=1, options=None):
+        """
+        Add the indicated product to the basket, without saving the basket or its lines.
+
+        Product options are not supported, since line attributes can only be stored in the database.
+        """
+        if options:
+            raise ValueError('In-memory baskets do not support product options.')
+
+        price_currency = self.currency
+        stock_info = self.get_stock_info(product, options)
+
+        if not stock_info.price.exists:
+            raise ValueError("Strategy hasn't found a price for product %s" % product)
+
+        if price_currency and stock_info.price.currency != price_currency:
+            raise ValueError(
+                "Basket lines must all have the same currency. Proposed line has currency %s, "
+                "while basket has currency %s" % (stock_info.price.currency, price_currency)
+            )
+
+        if stock_info.stockrecord is None:
+            raise ValueError(
+                "Basket lines must all have stock records. Strategy hasn't found any stock record "
+                "for product %s" % product
+            )
+
+        line_reference = self._create_line_reference(product, stock_info.stockrecord, options)
+        line = self.lines.filter(line_reference=line_reference).first()
+        created = line is None
+        if created:
+            line = get_model('basket', 'Line')(
+                basket=self,
+                line_reference=line_reference,
+                product=product,
+                stockrecord=stock_info.stockrecord,
+                quantity=quantity,
+                price_excl_tax=stock_info.price.excl_tax,
+                price_currency=stock_info.price.currency,
+            )
+            if stock_info.price.is_tax_known:
+                line.price_incl_tax = stock_info.price.incl_tax
+            self.lines.add(line)
+        else:
+            line.quantity = max(0, line.quantity + quantity)
+
+        self.reset_offer_applications()
+        return line, created
+
+    add = add_product
+
+    def reset_offer_applications(self):
+        # Lines are not reloaded from the database, so their discounts have to be cleared explicitly.
+        super(InMemoryBasket, self).reset_offer_applications()  # pylint: disable=bad-super-call
+        for line in self.lines:
+            line.clear_discount()
+
+    def flush(self):
+        del self.lines[:]
+        self.reset_offer_applications()
+
+    def clear_vouchers(self):
+        del self.vouchers[:]
+
+    @property
+    def is_empty(self):
+        return self.num_lines == 0
+
+    @property
+    def contains_a_voucher(self):
+        return self.vouchers.exists()
+
+    def contains_voucher(self, code):
+        return self.vouchers.filter(code=code).exists()
+
+    def product_quantity(self, product):
+        return sum(line.quantity for line in self.lines.filter(product=product))
+
+    def line_quantity(self, product, stockrecord, options=None):
+        line = self.lines.filter(line_reference=self._create_line_reference(product, stockrecord, options)).first()
+        return line.quantity if line else 0
+
+
 # noinspection PyUnresolvedReferences
 from oscar.apps.basket.models import *  # noqa isort:skip pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-position,wrong-import-order,ungrouped-imports
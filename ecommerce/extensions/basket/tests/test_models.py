@@ -5,6 +5,8 @@ import itertools
 import mock
 import six
 from analytics import Client
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from oscar.core.loading import get_class, get_model
 
@@ -12,14 +14,17 @@ from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.analytics.utils import parse_tracking_context, translate_basket_line_for_segment
 from ecommerce.extensions.api.v2.tests.views.mixins import CatalogMixin
 from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
-from ecommerce.extensions.basket.models import Basket
+from ecommerce.extensions.basket.exceptions import InMemoryBasketError
+from ecommerce.extensions.basket.models import Basket, InMemoryBasket
 from ecommerce.extensions.basket.tests.mixins import BasketMixin
-from ecommerce.extensions.test.factories import create_basket
+from ecommerce.extensions.test.factories import create_basket, prepare_voucher
 from ecommerce.tests.factories import SiteConfigurationFactory, UserFactory
-from ecommerce.tests.testcases import TransactionTestCase
+from ecommerce.tests.testcases import TestCase, TransactionTestCase
 
+Applicator = get_class('offer.applicator', 'Applicator')
 Basket = get_model('basket', 'Basket')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
+Selector = get_class('partner.strategy', 'Selector')
 
 
 class BasketTests(CatalogMixin, BasketMixin, TransactionTestCase):
@@ -200,3 +205,62 @@ class BasketTests(CatalogMixin, BasketMixin, TransactionTestCase):
         seat = course.create_or_update_seat('verified', True, 100)
         basket.add_product(seat)
         return basket
+
+
+class InMemoryBasketTests(TestCase):
+    def setUp(self):
+        super(InMemoryBasketTests, self).setUp()
+        self.user = self.create_user()
+        self.basket = InMemoryBasket(owner=self.user, site=self.site)
+        self.basket.strategy = Selector().strategy(user=self.user)
+        course = CourseFactory(partner=self.partner)
+        self.seat = course.create_or_update_seat('verified', True, 100)
+
+    def test_add_product(self):
+        """ Verify products are added to the basket lines without writing to the database. """
+        with CaptureQueriesContext(connection) as context, \
+                mock.patch('ecommerce.extensions.basket.models.track_segment_event') as mock_track:
+            line, created = self.basket.add_product(self.seat)
+            self.assertTrue(created)
+            line, created = self.basket.add_product(self.seat)
+            self.assertFalse(created)
+
+        mock_track.assert_not_called()
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in context.captured_queries))
+        self.assertIsNone(self.basket.id)
+        self.assertEqual(list(self.basket.all_lines()), [line])
+        self.assertEqual(line.quantity, 2)
+        self.assertEqual(self.basket.num_lines, 1)
+        self.assertEqual(self.basket.product_quantity(self.seat), 2)
+        self.assertEqual(self.basket.line_quantity(self.seat, line.stockrecord), 2)
+        self.assertEqual(self.basket.total_incl_tax, 200)
+        self.assertFalse(self.basket.is_empty)
+        self.assertFalse(Basket.objects.exists())
+
+    def test_save(self):
+        """ Verify in-memory baskets cannot be saved. """
+        with self.assertRaises(InMemoryBasketError):
+            self.basket.save()
+
+    def test_flush(self):
+        """ Verify flushing the basket removes its lines. """
+        self.basket.add_product(self.seat)
+        self.basket.flush()
+        self.assertTrue(self.basket.is_empty)
+
+    def test_vouchers(self):
+        """ Verify vouchers are held in memory and their offers are applied. """
+        voucher, product = prepare_voucher(benefit_value=10)
+        self.basket.add_product(product)
+        self.basket.vouchers.add(voucher)
+
+        self.assertTrue(self.basket.contains_a_voucher)
+        self.assertTrue(self.basket.contains_voucher(voucher.code))
+        self.assertFalse(voucher.basket_set.exists())
+
+        Applicator().apply(self.basket, self.user)
+        self.assertEqual(len(self.basket.voucher_discounts), 1)
+        self.assertLess(self.basket.total_incl_tax, self.basket.total_incl_tax_excl_discounts)
+
+        self.basket.clear_vouchers()
+        self.assertFalse(self.basket.contains_a_voucher)
@@ -27,12 +27,14 @@ from slumber.exceptions import SlumberBaseException
 from testfixtures import LogCapture
 from waffle.testutils import override_flag
 
+from ecommerce.core.constants import BASKET_LINE_DISPLAY_CACHE_SWITCH
 from ecommerce.core.exceptions import SiteConfigurationError
 from ecommerce.core.tests import toggle_switch
 from ecommerce.core.url_utils import absolute_url, get_lms_url
 from ecommerce.core.utils import get_cache_key
 from ecommerce.coupons.tests.mixins import CouponMixin, DiscoveryMockMixin
 from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.courses.utils import get_course_info_from_catalog
 from ecommerce.enterprise.tests.mixins import EnterpriseServiceMockMixin
 from ecommerce.enterprise.utils import construct_enterprise_course_consent_url
 from ecommerce.extensions.analytics.utils import translate_basket_line_for_segment
@@ -553,6 +555,42 @@ class PaymentApiViewTests(PaymentApiResponseTestMixin, BasketMixin, DiscoveryMoc
             voucher=voucher,
         )
 
+    def test_line_display_data_cached(self):
+        """ Verify the display data of basket lines is cached until the product is updated. """
+        toggle_switch(BASKET_LINE_DISPLAY_CACHE_SWITCH, True)
+        seat = self.create_seat(self.course)
+        basket = self.create_basket_and_add_product(seat)
+        self.mock_access_token_response()
+        self.mock_course_run_detail_endpoint(
+            self.course, discovery_api_url=self.site_configuration.discovery_api_url
+        )
+
+        with mock.patch(
+                'ecommerce.extensions.basket.views.get_course_info_from_catalog', wraps=get_course_info_from_catalog
+        ) as mock_get_course_info:
+            self.assert_expected_response(basket, image_url=u'/path/to/image.jpg', title=u'PaymentApiViewTests')
+            self.assert_expected_response(basket, image_url=u'/path/to/image.jpg', title=u'PaymentApiViewTests')
+            self.assertEqual(mock_get_course_info.call_count, 1)
+
+            seat.save()
+            self.assert_expected_response(basket, image_url=u'/path/to/image.jpg', title=u'PaymentApiViewTests')
+            self.assertEqual(mock_get_course_info.call_count, 2)
+
+    def test_line_display_data_not_cached_without_course(self):
+        """ Verify the display data of basket lines is not cached when the course information is unavailable. """
+        toggle_switch(BASKET_LINE_DISPLAY_CACHE_SWITCH, True)
+        seat = self.create_seat(self.course)
+        basket = self.create_basket_and_add_product(seat)
+
+        with mock.patch('ecommerce.extensions.basket.views.get_course_info_from_catalog', side_effect=Timeout):
+            self.assert_expected_response(basket)
+
+        self.mock_access_token_response()
+        self.mock_course_run_detail_endpoint(
+            self.course, discovery_api_url=self.site_configuration.discovery_api_url
+        )
+        self.assert_expected_response(basket, image_url=u'/path/to/image.jpg', title=u'PaymentApiViewTests')
+
     @httpretty.activate
     def test_enterprise_free_basket_redirect(self):
         """
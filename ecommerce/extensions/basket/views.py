@@ -11,11 +11,14 @@ import dateutil.parser
 import newrelic.agent
 import six
 import waffle
+from django.conf import settings
 from django.http import HttpResponseBadRequest, HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
 from django.utils.html import escape
+from django.utils.translation import get_language
 from django.utils.translation import ugettext as _
+from edx_django_utils.cache import TieredCache
 from edx_rest_framework_extensions.permissions import LoginRedirectIfUnauthenticated
 from opaque_keys.edx.keys import CourseKey
 from oscar.apps.basket.signals import voucher_removal
@@ -29,8 +32,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from slumber.exceptions import SlumberBaseException
 
+from ecommerce.core.constants import BASKET_LINE_DISPLAY_CACHE_SWITCH
 from ecommerce.core.exceptions import SiteConfigurationError
 from ecommerce.core.url_utils import absolute_redirect, get_lms_course_about_url, get_lms_url
+from ecommerce.core.utils import get_cache_key
 from ecommerce.courses.utils import get_certificate_type_display_value, get_course_info_from_catalog
 from ecommerce.enterprise.utils import (
     CONSENT_FAILED_PARAM,
@@ -118,35 +123,29 @@ class BasketLogicMixin:
         lines_data = []
         for line in lines:
             product = line.product
-            if product.is_seat_product or product.is_course_entitlement_product:
-                line_data, _ = self._get_course_data(product)
-
-                # TODO this is only used by hosted_checkout_basket template, which may no longer be
-                # used. Consider removing both.
-                if self._is_id_verification_required(product):
-                    context_updates['display_verification_message'] = True
-            elif product.is_enrollment_code_product:
-                line_data, course = self._get_course_data(product)
-                self._set_single_enrollment_code_warning_if_needed(product, course)
+            display_data = self._get_line_display_data(product)
+
+            # TODO this is only used by hosted_checkout_basket template, which may no longer be
+            # used. Consider removing both.
+            if display_data['id_verification_required']:
+                context_updates['display_verification_message'] = True
+
+            if product.is_enrollment_code_product:
+                self._set_single_enrollment_code_warning_if_needed(product, display_data['course'])
                 context_updates['is_enrollment_code_purchase'] = True
                 context_updates['show_voucher_form'] = False
+                # The message of enrollment codes includes the email of the user.
+                context_updates['order_details_msg'] = self._get_order_details_message(product)
             else:
-                line_data = {
-                    'product_title': product.title,
-                    'image_url': None,
-                    'course_key': None,
-                    'product_description': product.description
-                }
+                context_updates['order_details_msg'] = display_data['order_details_msg']
 
-            context_updates['order_details_msg'] = self._get_order_details_message(product)
-            context_updates['switch_link_text'], context_updates['partner_sku'] = get_basket_switch_data(product)
+            context_updates['switch_link_text'] = display_data['switch_link_text']
+            context_updates['partner_sku'] = display_data['partner_sku']
 
+            line_data = dict(display_data['line_data'])
             line_data.update({
-                'sku': product.stockrecords.first().partner_sku,
                 'benefit_value': self._get_benefit_value(line),
-                'enrollment_code': product.is_enrollment_code_product,
                 'line': line,
-                'seat_type': self._get_certificate_type_display_value(product),
             })
             lines_data.append(line_data)
 
@@ -240,6 +239,71 @@ class BasketLogicMixin:
                     response=HttpResponseRedirect(redirect_url)
                 )
 
+    @newrelic.agent.function_trace()
+    def _get_line_display_data(self, product):
+        """
+        Return the data displayed for a basket line of the product which does not depend on the basket or user.
+
+        When the BASKET_LINE_DISPLAY_CACHE_SWITCH is active, the data is cached per site, language and version of the
+        product, so that it is rebuilt whenever the product is updated. Data built without the course information of
+        the Discovery Service is not cached.
+
+        Args:
+            product (Product): Product of the basket line.
+        Returns:
+            A dictionary containing the line data, the course information of enrollment codes, whether ID
+            verification is required, the order details message and the switch link text and SKU.
+        """
+        use_cache = waffle.switch_is_active(BASKET_LINE_DISPLAY_CACHE_SWITCH)
+        if use_cache:
+            cache_key = get_cache_key(
+                site_domain=self.request.site.domain,
+                resource='basket-line-display-data',
+                product_id=product.id,
+                product_updated=product.date_updated.isoformat() if product.date_updated else None,
+                language=get_language(),
+            )
+            cached_response = TieredCache.get_cached_response(cache_key)
+            if cached_response.is_found:
+                return cached_response.value
+
+        course = None
+        is_seat_or_entitlement = product.is_seat_product or product.is_course_entitlement_product
+        has_course = is_seat_or_entitlement or product.is_enrollment_code_product
+        if has_course:
+            line_data, course = self._get_course_data(product)
+        else:
+            line_data = {
+                'product_title': product.title,
+                'image_url': None,
+                'course_key': None,
+                'product_description': product.description
+            }
+
+        switch_link_text, partner_sku = get_basket_switch_data(product)
+        line_data.update({
+            'sku': product.stockrecords.first().partner_sku,
+            'enrollment_code': product.is_enrollment_code_product,
+            'seat_type': self._get_certificate_type_display_value(product),
+        })
+        display_data = {
+            'line_data': line_data,
+            'course': course if product.is_enrollment_code_product else None,
+            'id_verification_required': bool(
+                is_seat_or_entitlement and self._is_id_verification_required(product)
+            ),
+            'order_details_msg': (
+                None if product.is_enrollment_code_product else self._get_order_details_message(product)
+            ),
+            'switch_link_text': switch_link_text,
+            'partner_sku': partner_sku,
+        }
+
+        if use_cache and (course is not None or not has_course):
+            TieredCache.set_all_tiers(cache_key, display_data, settings.BASKET_LINE_DISPLAY_CACHE_TIMEOUT)
+
+        return display_data
+
     @newrelic.agent.function_trace()
     def _get_course_data(self, product):
         """
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-18 23:03
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_course_key(apps, schema_editor):
+    """Copy the course_key attribute values of the products to their course_key column."""
+    Product = apps.get_model('catalogue', 'Product')
+    ProductAttributeValue = apps.get_model('catalogue', 'ProductAttributeValue')
+
+    course_keys = ProductAttributeValue.objects.filter(attribute__code='course_key')
+    Product.objects.filter(id__in=course_keys.values('product_id')).update(
+        course_key=Subquery(course_keys.filter(product_id=OuterRef('id')).values('value_text')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0050_add_b2b_affiliate_promotion_coupon_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalproduct',
+            name='course_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Indexed copy of the course_key attribute, used to look products up by course.', max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='course_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Indexed copy of the course_key attribute, used to look products up by course.', max_length=255, null=True),
+        ),
+        migrations.RunPython(populate_course_key, migrations.RunPython.noop),
+    ]
@@ -67,6 +67,10 @@ class Product(AbstractProduct):
     )
     expires = models.DateTimeField(null=True, blank=True,
                                    help_text=_('Last date/time on which this product can be purchased.'))
+    course_key = models.CharField(
+        max_length=255, null=True, blank=True, db_index=True, editable=False,
+        help_text=_('Indexed copy of the course_key attribute, used to look products up by course.')
+    )
     original_expires = None
 
     history = HistoricalRecords()
@@ -106,6 +110,8 @@ class Product(AbstractProduct):
         except AttributeError:
             pass
 
+        self.course_key = getattr(self.attr, 'course_key', None) or None
+
         super(Product, self).save(*args, **kwargs)  # pylint: disable=bad-super-call
 
 
@@ -183,5 +189,13 @@ class ProductCategory(AbstractProductCategory):
 class ProductAttribute(AbstractProductAttribute):
     history = CreateSafeHistoricalRecords()
 
+    def save_value(self, product, value):
+        super(ProductAttribute, self).save_value(product, value)
+
+        # Keep the indexed course_key column of the product in sync with its attribute.
+        if self.code == 'course_key' and product.course_key != (value or None):
+            product.course_key = value or None
+            Product.objects.filter(pk=product.pk).update(course_key=product.course_key)
+
 
 from oscar.apps.catalogue.models import *  # noqa isort:skip pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-position,wrong-import-order,ungrouped-imports
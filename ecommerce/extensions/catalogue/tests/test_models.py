@@ -76,6 +76,23 @@ class ProductTests(CouponMixin, DiscoveryTestMixin, TestCase):
         enrollment_code.refresh_from_db()
         self.assertNotEqual(enrollment_code.expires, expiration_datetime)
 
+    def test_course_key_synced(self):
+        """Verify the course_key column of products is kept in sync with their course_key attribute."""
+        course, seat, enrollment_code = self.create_course_seat_and_enrollment_code()
+        self.assertEqual(
+            set(Product.objects.filter(course_key=course.id)),
+            {course.parent_seat_product, seat, enrollment_code}
+        )
+
+        seat.attr.course_key = 'course-v1:edX+Other+Course'
+        seat.save()
+        self.assertEqual(Product.objects.get(course_key='course-v1:edX+Other+Course'), seat)
+
+        attribute = seat.get_product_class().attributes.get(code='course_key')
+        attribute.save_value(seat, None)
+        seat.refresh_from_db()
+        self.assertIsNone(seat.course_key)
+
     def test_create_product_with_note(self):
         """Verify creating a product with valid note value creates product."""
         note = 'Some test note.'
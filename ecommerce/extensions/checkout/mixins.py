@@ -14,6 +14,7 @@ from oscar.core.loading import get_class, get_model
 # is released
 from six.moves import range  # pylint: disable=ungrouped-imports
 
+from ecommerce.core.constants import POST_CHECKOUT_SIDE_EFFECTS_SWITCH
 from ecommerce.core.models import BusinessClient
 from ecommerce.extensions.analytics.utils import audit_log, track_segment_event
 from ecommerce.extensions.api import data as data_api
@@ -23,6 +24,7 @@ from ecommerce.extensions.checkout.exceptions import BasketNotFreeError
 from ecommerce.extensions.customer.utils import Dispatcher
 from ecommerce.extensions.offer.constants import OFFER_ASSIGNED, OFFER_ASSIGNMENT_REVOKED, OFFER_REDEEMED
 from ecommerce.extensions.order.constants import PaymentEventTypeName
+from ecommerce.extensions.voucher.usage_summary import refresh_voucher_usage_summaries
 from ecommerce.invoice.models import Invoice
 
 CommunicationEventType = get_model('customer', 'CommunicationEventType')
@@ -226,7 +228,11 @@ class EdxOrderPlacementMixin(six.with_metaclass(abc.ABCMeta, OrderPlacementMixin
                 email_opt_in=email_opt_in
             )
         else:
-            post_checkout.send(sender=self, order=order, request=request, email_opt_in=email_opt_in)
+            signal_kwargs = {}
+            if waffle.switch_is_active(POST_CHECKOUT_SIDE_EFFECTS_SWITCH):
+                # Receivers which are not needed to complete the order are run once it is committed.
+                signal_kwargs['defer_side_effects'] = True
+            post_checkout.send(sender=self, order=order, request=request, email_opt_in=email_opt_in, **signal_kwargs)
 
         return order
 
@@ -382,3 +388,4 @@ class EdxOrderPlacementMixin(six.with_metaclass(abc.ABCMeta, OrderPlacementMixin
                     for __ in range(offer_assignments_available)
                 ]
                 OfferAssignment.objects.bulk_create(assignments)
+                refresh_voucher_usage_summaries([voucher.code])
@@ -0,0 +1,138 @@
+"""
+Side effects of placed orders, run in the background once their orders are committed.
+
+Receivers of the post_checkout signal whose work is not needed to complete the order, e.g. tracking and notification
+emails, are decorated with post_checkout_side_effect. When the signal is sent with defer_side_effects, these receivers
+are not run by the request placing the order. Instead, an OrderSideEffect is saved with the order, and the receiver is
+queued once the order's transaction commits, to be run by a single background thread of the process. Each side effect
+of an order is saved once only, and marked Complete once it has run successfully, so that it is run once only, even if
+it is queued again, e.g. because the payment processor notified us twice of the payment.
+
+Side effects which are still pending, because they failed, did not fit in the queue of the process or their process
+was stopped, are run by the run_order_side_effects management command, up to POST_CHECKOUT_SIDE_EFFECT_MAX_ATTEMPTS
+times. The command runs them without the request which placed their order.
+"""
+
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.timezone import now
+from oscar.core.loading import get_class, get_model
+
+logger = logging.getLogger(__name__)
+OrderSideEffect = get_model('order', 'OrderSideEffect')
+Selector = get_class('partner.strategy', 'Selector')
+
+# Receivers decorated with post_checkout_side_effect, keyed by side effect name.
+_side_effects = {}
+_executor = None
+_queue_slots = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _queue_slots  # pylint: disable=global-statement
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _queue_slots = threading.BoundedSemaphore(settings.POST_CHECKOUT_SIDE_EFFECT_MAX_QUEUE_SIZE)
+                # A single thread runs the side effects in the order in which they were queued.
+                _executor = ThreadPoolExecutor(max_workers=1)
+    return _executor
+
+
+def run_side_effect(side_effect_id, sender=None, request=None):
+    """
+    Runs the pending side effect with the given id, unless another process is running it.
+
+    Returns:
+        bool: True if the side effect has been run successfully.
+    """
+    claimed = OrderSideEffect.objects.filter(id=side_effect_id, status=OrderSideEffect.PENDING).update(
+        status=OrderSideEffect.RUNNING, attempts=F('attempts') + 1, modified=now()
+    )
+    if not claimed:
+        logger.info('Side effect [%d] is not pending.', side_effect_id)
+        return False
+
+    side_effect = OrderSideEffect.objects.select_related('order__basket', 'order__user').get(id=side_effect_id)
+    order = side_effect.order
+    if order.basket:
+        # The basket is priced, e.g. by the purchase email, outside of the request which placed the order.
+        order.basket.strategy = Selector().strategy(user=order.user)
+    kwargs = dict(side_effect.kwargs)
+    if request is not None:
+        kwargs['request'] = request
+
+    try:
+        _side_effects[side_effect.name](sender, order=order, **kwargs)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Failed to run side effect [%s] of order [%s].', side_effect.name, order.number)
+        if side_effect.attempts >= settings.POST_CHECKOUT_SIDE_EFFECT_MAX_ATTEMPTS:
+            status = OrderSideEffect.FAILED
+        else:
+            status = OrderSideEffect.PENDING
+        OrderSideEffect.objects.filter(id=side_effect_id).update(status=status, modified=now())
+        return False
+
+    OrderSideEffect.objects.filter(id=side_effect_id).update(status=OrderSideEffect.COMPLETE, modified=now())
+    return True
+
+
+def _run_side_effect_in_background(side_effect_id, sender, request):
+    try:
+        run_side_effect(side_effect_id, sender, request)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Failed to run side effect [%d].', side_effect_id)
+    finally:
+        _queue_slots.release()
+        connection.close()
+
+
+def _queue_side_effect(side_effect_id, sender, request):
+    executor = _get_executor()
+    if not _queue_slots.acquire(blocking=False):
+        logger.warning('Side effect queue is full, side effect [%d] is left to run_order_side_effects.', side_effect_id)
+        return
+    executor.submit(_run_side_effect_in_background, side_effect_id, sender, request)
+
+
+def schedule_side_effect(name, sender, order, **kwargs):
+    """ Saves the side effect of the order, and queues it to be run in the background once the order is committed. """
+    # The signal, added to the arguments of receivers by Django, is not saved.
+    kwargs.pop('signal', None)
+    request = kwargs.pop('request', None)
+    if request is not None:
+        # The body of the request can no longer be read once the response has been sent.
+        request.POST  # pylint: disable=pointless-statement
+
+    side_effect, created = OrderSideEffect.objects.get_or_create(order=order, name=name, defaults={'kwargs': kwargs})
+    if not created:
+        logger.info('Side effect [%s] of order [%s] has already been scheduled.', name, order.number)
+        return
+
+    transaction.on_commit(lambda: _queue_side_effect(side_effect.id, sender, request))
+
+
+def post_checkout_side_effect(func):
+    """
+    Decorates a post_checkout receiver which is deferred to the background if the signal is sent with
+    defer_side_effects.
+    """
+    name = '{}.{}'.format(func.__module__, func.__name__)
+    _side_effects[name] = func
+
+    @wraps(func)
+    def wrapper(sender, order=None, defer_side_effects=False, **kwargs):
+        if defer_side_effects:
+            schedule_side_effect(name, sender, order, **kwargs)
+            return None
+        return func(sender, order=order, **kwargs)
+
+    return wrapper
@@ -8,6 +8,7 @@ from oscar.core.loading import get_class, get_model
 
 from ecommerce.courses.utils import mode_for_product
 from ecommerce.extensions.analytics.utils import silence_exceptions, track_segment_event
+from ecommerce.extensions.checkout.side_effects import post_checkout_side_effect
 from ecommerce.extensions.checkout.utils import get_credit_provider_details, get_receipt_page_url
 from ecommerce.notifications.notifications import send_notification
 from ecommerce.programs.utils import get_program
@@ -24,6 +25,7 @@ ORDER_LINE_COUNT = 1
 
 @receiver(post_checkout, dispatch_uid='tracking.post_checkout_callback')
 @silence_exceptions('Failed to emit tracking event upon order completion.')
+@post_checkout_side_effect
 def track_completed_order(sender, order=None, **kwargs):  # pylint: disable=unused-argument
     """
     Emit a tracking event when
@@ -96,6 +98,7 @@ def track_completed_order(sender, order=None, **kwargs):  # pylint: disable=unus
 
 @receiver(post_checkout, dispatch_uid='send_completed_order_email')
 @silence_exceptions("Failed to send order completion email.")
+@post_checkout_side_effect
 def send_course_purchase_email(sender, order=None, request=None, **kwargs):  # pylint: disable=unused-argument
     """
     Send seat purchase notification email
@@ -0,0 +1,145 @@
+import threading
+
+import mock
+from django.core import mail
+from django.core.management import call_command
+from django.test import override_settings
+from oscar.core.loading import get_class, get_model
+from oscar.test import factories
+
+from ecommerce.core.constants import POST_CHECKOUT_SIDE_EFFECTS_SWITCH
+from ecommerce.core.tests import toggle_switch
+from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.extensions.checkout import side_effects
+from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
+from ecommerce.extensions.checkout.side_effects import (
+    _queue_side_effect,
+    post_checkout_side_effect,
+    run_side_effect,
+    schedule_side_effect
+)
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.testcases import TestCase
+
+EventHandler = get_class('order.processing', 'EventHandler')
+OrderSideEffect = get_model('order', 'OrderSideEffect')
+
+RECEIVER_NAME = '{}.receiver'.format(__name__)
+
+
+@override_settings(POST_CHECKOUT_SIDE_EFFECT_MAX_ATTEMPTS=2)
+class PostCheckoutSideEffectTests(TestCase):
+    """ Tests for the side effects of placed orders run in the background. """
+
+    def setUp(self):
+        super(PostCheckoutSideEffectTests, self).setUp()
+        self.user = self.create_user()
+        seat = CourseFactory(partner=self.partner).create_or_update_seat('verified', False, 50)
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        basket.add_product(seat, 1)
+        self.order = create_order(basket=basket, user=self.user)
+
+    def register_receiver(self, **kwargs):
+        """ Registers a mock receiver as side effect, and returns it. """
+        receiver = mock.Mock(__name__='receiver', __module__=__name__, **kwargs)
+        patcher = mock.patch.dict(side_effects._side_effects)  # pylint: disable=protected-access
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return receiver, post_checkout_side_effect(receiver)
+
+    def schedule(self):
+        with mock.patch('ecommerce.extensions.checkout.side_effects.transaction.on_commit'):
+            schedule_side_effect(RECEIVER_NAME, self, self.order, email_opt_in=True)
+        return OrderSideEffect.objects.get(order=self.order, name=RECEIVER_NAME)
+
+    def test_side_effect_deferred(self):
+        """ Verify the decorated receiver is only scheduled if the side effects are deferred. """
+        receiver, side_effect = self.register_receiver()
+
+        with mock.patch('ecommerce.extensions.checkout.side_effects.schedule_side_effect') as mock_schedule:
+            side_effect(self, order=self.order, email_opt_in=True)
+            receiver.assert_called_once_with(self, order=self.order, email_opt_in=True)
+
+            side_effect(self, order=self.order, email_opt_in=True, defer_side_effects=True)
+            mock_schedule.assert_called_once_with(RECEIVER_NAME, self, self.order, email_opt_in=True)
+            self.assertEqual(receiver.call_count, 1)
+
+    def test_side_effect_run_once(self):
+        """ Verify a side effect of an order is saved and run once only, even if it is scheduled again. """
+        receiver, __ = self.register_receiver()
+        side_effect = self.schedule()
+        self.assertEqual(self.schedule(), side_effect)
+        self.assertEqual(side_effect.kwargs, {'email_opt_in': True})
+
+        self.assertTrue(run_side_effect(side_effect.id, self))
+        self.assertFalse(run_side_effect(side_effect.id, self))
+        receiver.assert_called_once_with(self, order=self.order, email_opt_in=True)
+        side_effect.refresh_from_db()
+        self.assertEqual(side_effect.status, OrderSideEffect.COMPLETE)
+
+    def test_failed_side_effect_left_pending(self):
+        """ Verify a failing side effect is left pending, until it has been attempted the maximum number of times. """
+        receiver, __ = self.register_receiver(side_effect=Exception)
+        side_effect = self.schedule()
+
+        with mock.patch('ecommerce.extensions.checkout.side_effects.logger') as mock_logger:
+            self.assertFalse(run_side_effect(side_effect.id))
+            mock_logger.exception.assert_called_once_with(
+                'Failed to run side effect [%s] of order [%s].', RECEIVER_NAME, self.order.number
+            )
+        side_effect.refresh_from_db()
+        self.assertEqual((side_effect.status, side_effect.attempts), (OrderSideEffect.PENDING, 1))
+
+        self.assertFalse(run_side_effect(side_effect.id))
+        side_effect.refresh_from_db()
+        self.assertEqual((side_effect.status, side_effect.attempts), (OrderSideEffect.FAILED, 2))
+        self.assertFalse(run_side_effect(side_effect.id))
+        self.assertEqual(receiver.call_count, 2)
+
+    def test_queue_bounded(self):
+        """ Verify side effects which do not fit in the queue of the process are not queued. """
+        with mock.patch('ecommerce.extensions.checkout.side_effects._get_executor') as mock_get_executor, \
+                mock.patch('ecommerce.extensions.checkout.side_effects._queue_slots', threading.BoundedSemaphore(1)):
+            _queue_side_effect(1, self, None)
+            _queue_side_effect(2, self, None)
+        self.assertEqual(mock_get_executor.return_value.submit.call_count, 1)
+
+    def test_pending_side_effects_run_by_command(self):
+        """ Verify the command runs the side effects which are still pending, or were left running, after the retry
+        delay. """
+        receiver, __ = self.register_receiver()
+        side_effect = self.schedule()
+
+        call_command('run_order_side_effects')
+        self.assertFalse(receiver.called)
+
+        OrderSideEffect.objects.filter(id=side_effect.id).update(status=OrderSideEffect.RUNNING)
+        with override_settings(POST_CHECKOUT_SIDE_EFFECT_RETRY_DELAY=-1):
+            call_command('run_order_side_effects')
+        receiver.assert_called_once_with(None, order=self.order, email_opt_in=True)
+        side_effect.refresh_from_db()
+        self.assertEqual(side_effect.status, OrderSideEffect.COMPLETE)
+
+    def test_handle_successful_order_defers_side_effects(self):
+        """ Verify the tracking and email receivers are deferred, and run successfully without the request which
+        placed the order, but the order is fulfilled, if the switch is active. """
+        toggle_switch(POST_CHECKOUT_SIDE_EFFECTS_SWITCH, True)
+        toggle_switch('ENABLE_NOTIFICATIONS', True)
+        toggle_switch('sailthru_enable', True)
+        with mock.patch('ecommerce.extensions.checkout.side_effects.transaction.on_commit'), \
+                mock.patch.object(EventHandler, 'handle_shipping_event') as mock_handle_shipping_event:
+            EdxOrderPlacementMixin().handle_successful_order(self.order)
+        self.assertTrue(mock_handle_shipping_event.called)
+
+        scheduled = OrderSideEffect.objects.filter(order=self.order)
+        self.assertEqual(set(scheduled.values_list('name', flat=True)), {
+            'ecommerce.extensions.checkout.signals.track_completed_order',
+            'ecommerce.extensions.checkout.signals.send_course_purchase_email',
+        })
+
+        with mock.patch('ecommerce.extensions.checkout.signals.track_segment_event') as mock_track:
+            for side_effect in scheduled:
+                self.assertTrue(run_side_effect(side_effect.id))
+        self.assertTrue(mock_track.called)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(set(scheduled.values_list('status', flat=True)), {OrderSideEffect.COMPLETE})
@@ -16,6 +16,7 @@ from django.utils.timezone import now
 from ecommerce.extensions.fulfillment import exceptions
 from ecommerce.extensions.fulfillment.status import LINE, ORDER
 from ecommerce.extensions.refund.status import REFUND_LINE
+from ecommerce.programs.ownership import invalidate_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -46,50 +47,122 @@ def fulfill_order(order, lines, email_opt_in=False):
         logger.error(error_msg)
         raise exceptions.IncorrectOrderStatusError(error_msg)
 
-    # Construct a dict of lines by their product type.
-    line_items = list(lines.all())
+    _fulfill_orders([(order, lines)], email_opt_in=email_opt_in)
+    return order
+
+
+def fulfill_orders(orders_and_lines, email_opt_in=False):
+    """ Fulfills line items of many Orders
+
+    Behaves like fulfill_order, for each of the given orders, except that the lines of all orders supported by a
+    fulfillment module are handed to that module at once, so that modules can fulfill them together. Orders which
+    cannot be fulfilled, because of their current status, are logged and skipped.
+
+    Args:
+        orders_and_lines (List of tuples): (Order, Lines) tuples of the Orders, and their Line items, that should be
+            fulfilled.
+        email_opt_in (bool): Whether the users should be opted in to emails as
+            part of the fulfillment. Defaults to False.
+
+    Returns:
+        The list of Orders for which fulfillment was attempted.
+
+    """
+    fulfillable_orders_and_lines = []
+    for order, lines in orders_and_lines:
+        logger.info("Attempting to fulfill products for order [%s]", order.number)
+        if ORDER.COMPLETE not in order.available_statuses():
+            logger.error("Order [%s] has a current status of [%s] which cannot be fulfilled.", order.number,
+                         order.status)
+            continue
+        fulfillable_orders_and_lines.append((order, lines))
+
+    _fulfill_orders(fulfillable_orders_and_lines, email_opt_in=email_opt_in)
+    return [order for order, __ in fulfillable_orders_and_lines]
+
+
+def _fulfill_orders(orders_and_lines, email_opt_in=False):
+    """ Fulfills the line items of the given Orders, and sets the status of each Order. """
+    # Construct a list of the line items of each order.
+    orders_and_line_items = [(order, list(lines.all())) for order, lines in orders_and_lines]
 
     try:
         # Iterate over the Fulfillment Modules defined in our configuration and determine if they support
-        # any of the lines in the order. Fulfill line items in the order they are designated by the configuration.
+        # any of the lines in the orders. Fulfill line items in the order they are designated by the configuration.
         # Remaining line items should be marked with a fulfillment error since we have no configuration that
         # allows them to be fulfilled.
         for module_class in get_fulfillment_modules():
             module = module_class()
-            supported_lines = module.get_supported_lines(line_items)
-            if supported_lines:
-                line_items = list(set(line_items) - set(supported_lines))
-                module.fulfill_product(order, supported_lines, email_opt_in=email_opt_in)
-
-        # Check to see if any line items in the order have not been accounted for by a FulfillmentModule
+            supported_orders_and_lines = []
+            for index, (order, line_items) in enumerate(orders_and_line_items):
+                supported_lines = module.get_supported_lines(line_items)
+                if supported_lines:
+                    orders_and_line_items[index] = (order, list(set(line_items) - set(supported_lines)))
+                    supported_orders_and_lines.append((order, supported_lines))
+            if supported_orders_and_lines:
+                _fulfill_supported_lines(module, supported_orders_and_lines, email_opt_in=email_opt_in)
+
+        # Check to see if any line items in the orders have not been accounted for by a FulfillmentModule
         # Any product does not line up with a module, we have to mark a fulfillment error.
-        for line in line_items:
-            product_type = line.product.get_product_class().name
-            logger.error("Product Type [%s] does not have an associated Fulfillment Module. It cannot be fulfilled.",
-                         product_type)
-            line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
+        for __, line_items in orders_and_line_items:
+            for line in line_items:
+                product_type = line.product.get_product_class().name
+                logger.error("Product Type [%s] does not have an associated Fulfillment Module. It cannot be "
+                             "fulfilled.", product_type)
+                line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
     except Exception:  # pylint: disable=broad-except
-        logger.exception('An unexpected error occurred while fulfilling order [%s].', order.number)
+        logger.exception(
+            'An unexpected error occurred while fulfilling orders [%s].',
+            ', '.join(order.number for order, __ in orders_and_lines)
+        )
     finally:
-        # Check if all lines are successful, or there were errors, and set the status of the Order.
-        order_status = ORDER.COMPLETE
-        for line in lines.all():
-            if line.status != LINE.COMPLETE:
-                logger.error('There was an error while fulfilling order [%s]', order.number)
-                order_status = ORDER.FULFILLMENT_ERROR
-                break
-
-        order.set_status(order_status)
-
-        elapsed = now() - order.date_placed
-        logger.info(
-            "Finished fulfilling order [%s] with status [%s]. [%s] seconds elapsed since placement.",
-            order.number,
-            order.status,
-            elapsed.total_seconds()
+        for order, lines in orders_and_lines:
+            # Check if all lines are successful, or there were errors, and set the status of the Order.
+            order_status = ORDER.COMPLETE
+            for line in lines.all():
+                if line.status != LINE.COMPLETE:
+                    logger.error('There was an error while fulfilling order [%s]', order.number)
+                    order_status = ORDER.FULFILLMENT_ERROR
+                    break
+
+            order.set_status(order_status)
+
+            elapsed = now() - order.date_placed
+            logger.info(
+                "Finished fulfilling order [%s] with status [%s]. [%s] seconds elapsed since placement.",
+                order.number,
+                order.status,
+                elapsed.total_seconds()
+            )
+
+
+def _fulfill_supported_lines(module, orders_and_lines, email_opt_in=False):
+    """ Fulfills the lines of the given Orders supported by the module.
+
+    The lines of all Orders are handed to the module at once. If the module fails to fulfill them together, the lines
+    it did not get to, i.e. whose status it has not set, are handed to it again one Order at a time, so that the
+    failure of one Order does not prevent the fulfillment of the others.
+    """
+    initial_statuses = {line.id: line.status for __, lines in orders_and_lines for line in lines}
+    try:
+        module.fulfill_products(orders_and_lines, email_opt_in=email_opt_in)
+        return
+    except Exception:  # pylint: disable=broad-except
+        logger.exception(
+            'An unexpected error occurred while fulfilling orders [%s].',
+            ', '.join(order.number for order, __ in orders_and_lines)
         )
+        if len(orders_and_lines) == 1:
+            return
 
-        return order  # pylint: disable=lost-exception
+    for order, lines in orders_and_lines:
+        remaining_lines = [line for line in lines if line.status == initial_statuses[line.id]]
+        if not remaining_lines:
+            continue
+        try:
+            module.fulfill_products([(order, remaining_lines)], email_opt_in=email_opt_in)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('An unexpected error occurred while fulfilling order [%s].', order.number)
 
 
 def get_fulfillment_modules():
@@ -147,4 +220,7 @@ def revoke_fulfillment_for_refund(refund):
                     succeeded = False
                     refund_line.set_status(REFUND_LINE.REVOCATION_ERROR)
 
+        # The user's enrollments and entitlements have changed.
+        invalidate_snapshot(refund.order.site, refund.user.username)
+
     return succeeded
@@ -7,8 +7,11 @@ in an Order.
 
 import abc
 import datetime
+import functools
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 import six
@@ -23,6 +26,7 @@ from rest_framework import status
 from six.moves.urllib.parse import urlencode
 
 from ecommerce.core.constants import (
+    CONCURRENT_FULFILLMENT_SWITCH,
     DONATIONS_FROM_CHECKOUT_TESTS_PRODUCT_TYPE_NAME,
     ENROLLMENT_CODE_PRODUCT_CLASS_NAME,
     HUBSPOT_FORMS_INTEGRATION_ENABLE,
@@ -46,6 +50,7 @@ from ecommerce.extensions.fulfillment.status import LINE
 from ecommerce.extensions.voucher.models import OrderLineVouchers
 from ecommerce.extensions.voucher.utils import create_vouchers
 from ecommerce.notifications.notifications import send_notification
+from ecommerce.programs.ownership import add_enrollment_to_snapshot, add_entitlement_to_snapshot
 
 BasketAttributeType = get_model('basket', 'BasketAttributeType')
 Benefit = get_model('offer', 'Benefit')
@@ -57,6 +62,57 @@ StockRecord = get_model('partner', 'StockRecord')
 logger = logging.getLogger(__name__)
 
 
+_enrollment_api_session = None
+_enrollment_api_session_lock = threading.Lock()
+
+
+def get_enrollment_api_session():
+    """ Returns the process-wide session used to call the LMS Enrollment API.
+
+    The session keeps connections to the LMS alive, and pools as many of them as there can be concurrent
+    fulfillment requests, so that enrolling many lines does not open a new connection for each line.
+    """
+    global _enrollment_api_session  # pylint: disable=global-statement
+    if _enrollment_api_session is None:
+        with _enrollment_api_session_lock:
+            if _enrollment_api_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=settings.FULFILLMENT_MAX_WORKERS)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _enrollment_api_session = session
+    return _enrollment_api_session
+
+
+def dispatch_fulfillment_requests(requests_to_send):
+    """ Sends the given fulfillment requests.
+
+    The requests are sent concurrently, over a thread pool of at most settings.FULFILLMENT_MAX_WORKERS threads,
+    if the CONCURRENT_FULFILLMENT_SWITCH is active; otherwise they are sent one after another. Requests must not
+    use the database or the current request, so that line statuses and order notes can be updated from the
+    calling thread, in the order of the lines.
+
+    Args:
+        requests_to_send (List of callables): Callables, taking no arguments, which send a request.
+
+    Returns:
+        A list of (response, exception) tuples, in the same order as the given requests. The exception is None
+        if the request succeeded; otherwise, the response is None.
+    """
+    def send(request):
+        try:
+            return request(), None
+        except Exception as exc:  # pylint: disable=broad-except
+            return None, exc
+
+    max_workers = min(settings.FULFILLMENT_MAX_WORKERS, len(requests_to_send))
+    if max_workers <= 1 or not waffle.switch_is_active(CONCURRENT_FULFILLMENT_SWITCH):
+        return [send(request) for request in requests_to_send]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(send, requests_to_send))
+
+
 class BaseFulfillmentModule(six.with_metaclass(abc.ABCMeta, object)):  # pragma: no cover
     """
     Base FulfillmentModule class for containing Product specific fulfillment logic.
@@ -113,6 +169,20 @@ class BaseFulfillmentModule(six.with_metaclass(abc.ABCMeta, object)):  # pragma:
         """
         raise NotImplementedError("Fulfillment method not implemented!")
 
+    def fulfill_products(self, orders_and_lines, email_opt_in=False):
+        """ Fulfills the specified lines of many orders.
+
+        Modules which can fulfill the lines of many orders together, e.g. with fewer requests to other services,
+        should override this method. By default, the lines of each order are fulfilled one order after another.
+
+        Args:
+            orders_and_lines (List of tuples): (Order, List of Lines) tuples of the lines to be fulfilled.
+            email_opt_in (bool): Whether to opt the users in to emails as part
+                of fulfillment. Defaults to false.
+        """
+        for order, lines in orders_and_lines:
+            self.fulfill_product(order, lines, email_opt_in=email_opt_in)
+
     @abc.abstractmethod
     def revoke_line(self, line):
         """ Revokes the specified line.
@@ -190,9 +260,7 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
             messages if the LMS user id cannot be found.
     """
 
-    def _post_to_enrollment_api(self, data, user, usage):
-        enrollment_api_url = get_lms_enrollment_api_url()
-        timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
+    def _get_enrollment_api_headers(self, user, usage):
         headers = {
             'Content-Type': 'application/json',
             'X-Edx-Api-Key': settings.EDX_API_KEY
@@ -206,7 +274,63 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
         if ip:
             headers['X-Forwarded-For'] = ip
 
-        return requests.post(enrollment_api_url, data=json.dumps(data), headers=headers, timeout=timeout)
+        return headers
+
+    def _send_to_enrollment_api(self, enrollment_api_url, data, headers):
+        timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
+        return get_enrollment_api_session().post(
+            enrollment_api_url, data=json.dumps(data), headers=headers, timeout=timeout
+        )
+
+    def _post_to_enrollment_api(self, data, user, usage):
+        return self._send_to_enrollment_api(
+            get_lms_enrollment_api_url(), data, self._get_enrollment_api_headers(user, usage)
+        )
+
+    def _set_request_error_status(self, order, line, exc):
+        """ Records the network error, or time out, raised while fulfilling the line. """
+        if isinstance(exc, ReqConnectionError):
+            logger.error(
+                "Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number
+            )
+            order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
+            line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
+        else:
+            logger.error(
+                "Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number
+            )
+            order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
+            line.set_status(LINE.FULFILLMENT_TIMEOUT_ERROR)
+
+    def _set_enrollment_api_response_status(self, order, line, response, mode, course_key, provider):
+        """ Records the outcome of the Enrollment API response for the line. """
+        if response.status_code == status.HTTP_200_OK:
+            line.set_status(LINE.COMPLETE)
+            add_enrollment_to_snapshot(order.site, order.user.username, course_key, mode)
+
+            audit_log(
+                'line_fulfilled',
+                order_line_id=line.id,
+                order_number=order.number,
+                product_class=line.product.get_product_class().name,
+                course_id=course_key,
+                mode=mode,
+                user_id=order.user.id,
+                credit_provider=provider,
+            )
+        else:
+            try:
+                data = response.json()
+                reason = data.get('message')
+            except Exception:  # pylint: disable=broad-except
+                reason = '(No detail provided.)'
+
+            logger.error(
+                "Fulfillment of line [%d] on order [%s] failed with status code [%d]: %s",
+                line.id, order.number, response.status_code, reason
+            )
+            order.notes.create(message=reason, note_type='Error')
+            line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
 
     def _add_enterprise_data_to_enrollment_api_post(self, data, order):
         """ Augment enrollment api POST data with enterprise specific data.
@@ -256,6 +380,50 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
         """
         return [line for line in lines if self.supports_line(line)]
 
+    def _get_enrollment_api_post_data(self, order, line):
+        """ Returns the Enrollment API POST data for the line, along with its mode, course key and credit provider.
+
+        Raises:
+            AttributeError: If the seat does not have the required attributes.
+        """
+        mode = mode_for_product(line.product)
+        course_key = line.product.attr.course_key
+        try:
+            provider = line.product.attr.credit_provider
+        except AttributeError:
+            logger.debug("Seat [%d] has no credit_provider attribute. Defaulted to None.", line.product.id)
+            provider = None
+
+        data = {
+            'user': order.user.username,
+            'is_active': True,
+            'mode': mode,
+            'course_details': {
+                'course_id': course_key
+            },
+            'enrollment_attributes': [
+                {
+                    'namespace': 'order',
+                    'name': 'order_number',
+                    'value': order.number
+                },
+                {
+                    'namespace': 'order',
+                    'name': 'date_placed',
+                    'value': order.date_placed.strftime(ISO_8601_FORMAT)
+                }
+            ]
+        }
+        if provider:
+            data['enrollment_attributes'].append(
+                {
+                    'namespace': 'credit',
+                    'name': 'provider_id',
+                    'value': provider
+                }
+            )
+        return data, mode, course_key, provider
+
     def fulfill_product(self, order, lines, email_opt_in=False):
         """ Fulfills the purchase of a 'seat' by enrolling the associated student.
 
@@ -275,108 +443,89 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
             The original set of lines, with new statuses set based on the success or failure of fulfillment.
 
         """
-        logger.info("Attempting to fulfill 'Seat' product types for order [%s]", order.number)
+        self.fulfill_products([(order, lines)], email_opt_in=email_opt_in)
+        return order, lines
+
+    def fulfill_products(self, orders_and_lines, email_opt_in=False):
+        """ Fulfills the purchase of the seats of many orders by enrolling the associated students.
+
+        The Enrollment API requests of the seat lines of all the given orders are sent together, over the
+        pooled Enrollment API session, so that enrolling the learners of many orders at once, e.g. when
+        creating manual enrollment orders, does not pay a connection and a round trip per order. The
+        response of each request is mapped back to the status of its line.
+
+        Args:
+            orders_and_lines (List of tuples): (Order, List of Lines) tuples. The lines should only be "Seat"
+                products.
+            email_opt_in (bool): Whether the users should be opted in to emails
+                as part of the fulfillment. Defaults to False.
+        """
+        for order, __ in orders_and_lines:
+            logger.info("Attempting to fulfill 'Seat' product types for order [%s]", order.number)
 
         api_key = getattr(settings, 'EDX_API_KEY', None)
         if not api_key:
             logger.error(
                 'EDX_API_KEY must be set to use the EnrollmentFulfillmentModule'
             )
+            for __, lines in orders_and_lines:
+                for line in lines:
+                    line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
+            return
+
+        enrollment_api_url = None
+        pending_lines = []
+        requests_to_send = []
+        for order, lines in orders_and_lines:
+            headers = None
             for line in lines:
-                line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
-
-            return order, lines
-
-        for line in lines:
-            try:
-                mode = mode_for_product(line.product)
-                course_key = line.product.attr.course_key
-            except AttributeError:
-                logger.error("Supported Seat Product does not have required attributes, [certificate_type, course_key]")
-                line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
-                continue
-            try:
-                provider = line.product.attr.credit_provider
-            except AttributeError:
-                logger.debug("Seat [%d] has no credit_provider attribute. Defaulted to None.", line.product.id)
-                provider = None
+                try:
+                    data, mode, course_key, provider = self._get_enrollment_api_post_data(order, line)
+                except AttributeError:
+                    logger.error(
+                        "Supported Seat Product does not have required attributes, [certificate_type, course_key]"
+                    )
+                    line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
+                    continue
 
-            data = {
-                'user': order.user.username,
-                'is_active': True,
-                'mode': mode,
-                'course_details': {
-                    'course_id': course_key
-                },
-                'enrollment_attributes': [
-                    {
-                        'namespace': 'order',
-                        'name': 'order_number',
-                        'value': order.number
-                    },
-                    {
-                        'namespace': 'order',
-                        'name': 'date_placed',
-                        'value': order.date_placed.strftime(ISO_8601_FORMAT)
-                    }
-                ]
-            }
-            if provider:
-                data['enrollment_attributes'].append(
-                    {
-                        'namespace': 'credit',
-                        'name': 'provider_id',
-                        'value': provider
-                    }
-                )
-            try:
-                self._add_enterprise_data_to_enrollment_api_post(data, order)
-                self.update_orderline_with_enterprise_discount_metadata(order, line)
+                try:
+                    self._add_enterprise_data_to_enrollment_api_post(data, order)
+                    self.update_orderline_with_enterprise_discount_metadata(order, line)
+                except (ReqConnectionError, Timeout) as exc:
+                    self._set_request_error_status(order, line, exc)
+                    continue
 
                 # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment to
                 # the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
-                response = self._post_to_enrollment_api(data, user=order.user, usage='fulfill enrollment')
-
-                if response.status_code == status.HTTP_200_OK:
-                    line.set_status(LINE.COMPLETE)
-
-                    audit_log(
-                        'line_fulfilled',
-                        order_line_id=line.id,
-                        order_number=order.number,
-                        product_class=line.product.get_product_class().name,
-                        course_id=course_key,
-                        mode=mode,
-                        user_id=order.user.id,
-                        credit_provider=provider,
-                    )
-                else:
-                    try:
-                        data = response.json()
-                        reason = data.get('message')
-                    except Exception:  # pylint: disable=broad-except
-                        reason = '(No detail provided.)'
-
-                    logger.error(
-                        "Fulfillment of line [%d] on order [%s] failed with status code [%d]: %s",
-                        line.id, order.number, response.status_code, reason
-                    )
-                    order.notes.create(message=reason, note_type='Error')
-                    line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
-            except ReqConnectionError:
-                logger.error(
-                    "Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number
-                )
-                order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
-            except Timeout:
-                logger.error(
-                    "Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number
+                if enrollment_api_url is None:
+                    enrollment_api_url = get_lms_enrollment_api_url()
+                if headers is None:
+                    headers = self._get_enrollment_api_headers(order.user, usage='fulfill enrollment')
+                requests_to_send.append(
+                    functools.partial(self._send_to_enrollment_api, enrollment_api_url, data, headers)
                 )
-                order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_TIMEOUT_ERROR)
-        logger.info("Finished fulfilling 'Seat' product types for order [%s]", order.number)
-        return order, lines
+                pending_lines.append((order, line, mode, course_key, provider))
+
+        results = dispatch_fulfillment_requests(requests_to_send)
+
+        # The status of every line is set before an unexpected error is raised, so that the error of one line does
+        # not leave the lines of other orders unfulfilled.
+        unexpected_exc = None
+        for (order, line, mode, course_key, provider), (response, exc) in zip(pending_lines, results):
+            if exc is None:
+                self._set_enrollment_api_response_status(order, line, response, mode, course_key, provider)
+            elif isinstance(exc, (ReqConnectionError, Timeout)):
+                self._set_request_error_status(order, line, exc)
+            else:
+                order.notes.create(message='Fulfillment of order failed due to an Exception.', note_type='Error')
+                line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
+                unexpected_exc = unexpected_exc or exc
+
+        if unexpected_exc is not None:
+            raise unexpected_exc
+
+        for order, __ in orders_and_lines:
+            logger.info("Finished fulfilling 'Seat' product types for order [%s]", order.number)
 
     def revoke_line(self, line):
         try:
@@ -528,8 +677,7 @@ class EnrollmentCodeFulfillmentModule(BaseFulfillmentModule):
         for line in lines:
             name = 'Enrollment Code Range for {}'.format(line.product.attr.course_key)
             seat = Product.objects.filter(
-                attributes__name='course_key',
-                attribute_values__value_text=line.product.attr.course_key
+                course_key=line.product.attr.course_key
             ).get(
                 attributes__name='certificate_type',
                 attribute_values__value_text=line.product.attr.seat_type
@@ -771,6 +919,20 @@ class CourseEntitlementFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmen
                 )
                 break
 
+    def _set_error_status(self, order, line, exc):
+        """ Records the error raised while fulfilling the line. """
+        if isinstance(exc, (Timeout, ReqConnectionError)):
+            logger.error(
+                'Unable to fulfill line [%d] of order [%s] due to a network problem', line.id, order.number,
+                exc_info=exc
+            )
+            order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
+            line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
+        else:
+            logger.error('Unable to fulfill line [%d] of order [%s]', line.id, order.number, exc_info=exc)
+            order.notes.create(message='Fulfillment of order failed due to an Exception.', note_type='Error')
+            line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
+
     def fulfill_product(self, order, lines, email_opt_in=False):
         """ Fulfills the purchase of a 'Course Entitlement'.
         Uses the order and the lines to determine which courses to grant an entitlement for, and with certain
@@ -792,6 +954,7 @@ class CourseEntitlementFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmen
         """
         logger.info('Attempting to fulfill "Course Entitlement" product types for order [%s]', order.number)
 
+        pending_lines = []
         for line in lines:
             try:
                 mode = mode_for_product(line.product)
@@ -818,11 +981,25 @@ class CourseEntitlementFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmen
                     get_lms_entitlement_api_url(),
                     jwt=order.site.siteconfiguration.access_token
                 )
+            except Exception as exc:  # pylint: disable=broad-except
+                self._set_error_status(order, line, exc)
+                continue
+
+            # POST to the Entitlement API.
+            request = functools.partial(entitlement_api_client.entitlements.post, data)
+            pending_lines.append((line, mode, UUID, entitlement_option, request))
+
+        results = dispatch_fulfillment_requests([request for __, __, __, __, request in pending_lines])
+
+        for (line, mode, UUID, entitlement_option, __), (response, exc) in zip(pending_lines, results):
+            if exc is not None:
+                self._set_error_status(order, line, exc)
+                continue
 
-                # POST to the Entitlement API.
-                response = entitlement_api_client.entitlements.post(data)
+            try:
                 line.attributes.create(option=entitlement_option, value=response['uuid'])
                 line.set_status(LINE.COMPLETE)
+                add_entitlement_to_snapshot(order.site, order.user.username, UUID, mode)
 
                 audit_log(
                     'line_fulfilled',
@@ -833,18 +1010,8 @@ class CourseEntitlementFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmen
                     mode=mode,
                     user_id=order.user.id,
                 )
-            except (Timeout, ReqConnectionError):
-                logger.exception(
-                    'Unable to fulfill line [%d] of order [%s] due to a network problem', line.id, order.number
-                )
-                order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
-            except Exception:  # pylint: disable=broad-except
-                logger.exception(
-                    'Unable to fulfill line [%d] of order [%s]', line.id, order.number
-                )
-                order.notes.create(message='Fulfillment of order failed due to an Exception.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
+            except Exception as exc:  # pylint: disable=broad-except
+                self._set_error_status(order, line, exc)
 
         logger.info('Finished fulfilling "Course Entitlement" product types for order [%s]', order.number)
         return order, lines
@@ -72,6 +72,70 @@ class FulfillmentApiTests(FulfillmentTestMixin, TestCase):
             self.assertEqual(ORDER.FULFILLMENT_ERROR, self.order.status)
             self.assertTrue(mock_logger.called)
 
+    @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule', ])
+    def test_fulfill_orders(self):
+        """ Verify the supported lines of all orders are passed to a fulfillment module at once. """
+        orders = [self.order, self.generate_open_order()]
+
+        with patch.object(FakeFulfillmentModule, 'fulfill_products', autospec=True,
+                          side_effect=FakeFulfillmentModule.fulfill_products) as mock_fulfill_products:
+            fulfilled_orders = api.fulfill_orders([(order, order.lines) for order in orders])
+
+        self.assertEqual(mock_fulfill_products.call_count, 1)
+        self.assertEqual([order for order, __ in mock_fulfill_products.call_args[0][1]], orders)
+        self.assertEqual(fulfilled_orders, orders)
+        for order in orders:
+            self.assert_order_fulfilled(order)
+
+    @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule', ])
+    def test_fulfill_orders_failure_isolated(self):
+        """ Verify the failure of one order, while its lines are fulfilled with those of other orders, does not
+        prevent the fulfillment of the other orders. """
+        failing_order = self.generate_open_order()
+        orders = [failing_order, self.order]
+        fulfill_products = FakeFulfillmentModule.fulfill_products
+
+        def fail_order(module, orders_and_lines, email_opt_in=False):
+            if failing_order in [order for order, __ in orders_and_lines]:
+                raise Exception
+            fulfill_products(module, orders_and_lines, email_opt_in=email_opt_in)
+
+        with patch.object(FakeFulfillmentModule, 'fulfill_products', autospec=True,
+                          side_effect=fail_order) as mock_fulfill_products, \
+                patch('ecommerce.extensions.fulfillment.api.logger.exception') as mock_logger:
+            api.fulfill_orders([(order, order.lines) for order in orders])
+
+        self.assertEqual(mock_fulfill_products.call_count, 3)
+        self.assertEqual(mock_logger.call_count, 2)
+        mock_logger.assert_called_with('An unexpected error occurred while fulfilling order [%s].',
+                                       failing_order.number)
+        self.assertEqual(failing_order.status, ORDER.FULFILLMENT_ERROR)
+        self.assert_order_fulfilled(self.order)
+
+    @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule', ])
+    def test_fulfill_orders_bad_fulfillment_state(self):
+        """ Verify orders which cannot be fulfilled are skipped, without preventing the fulfillment of others. """
+        completed_order = self.generate_open_order()
+        completed_order.set_status(ORDER.COMPLETE)
+        logger_name = 'ecommerce.extensions.fulfillment.api'
+
+        with LogCapture(logger_name) as logger:
+            fulfilled_orders = api.fulfill_orders(
+                [(order, order.lines) for order in (completed_order, self.order)]
+            )
+            logger.check_present(
+                (
+                    logger_name,
+                    'ERROR',
+                    'Order [{}] has a current status of [{}] which cannot be fulfilled.'.format(
+                        completed_order.number, ORDER.COMPLETE
+                    )
+                )
+            )
+
+        self.assertEqual(fulfilled_orders, [self.order])
+        self.assert_order_fulfilled(self.order)
+
     @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule',
                                             'ecommerce.extensions.fulfillment.tests.modules.NotARealModule'])
     def test_get_fulfillment_modules(self):
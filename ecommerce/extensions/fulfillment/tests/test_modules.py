@@ -21,6 +21,7 @@ from testfixtures import LogCapture
 from waffle.testutils import override_switch
 
 from ecommerce.core.constants import (
+    CONCURRENT_FULFILLMENT_SWITCH,
     COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME,
     DONATIONS_FROM_CHECKOUT_TESTS_PRODUCT_TYPE_NAME,
     ENROLLMENT_CODE_PRODUCT_CLASS_NAME,
@@ -44,7 +45,8 @@ from ecommerce.extensions.fulfillment.modules import (
     CourseEntitlementFulfillmentModule,
     DonationsFromCheckoutTestFulfillmentModule,
     EnrollmentCodeFulfillmentModule,
-    EnrollmentFulfillmentModule
+    EnrollmentFulfillmentModule,
+    dispatch_fulfillment_requests
 )
 from ecommerce.extensions.fulfillment.status import LINE
 from ecommerce.extensions.fulfillment.tests.mixins import FulfillmentTestMixin
@@ -307,13 +309,13 @@ class EnrollmentFulfillmentModuleTests(
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_CONFIGURATION_ERROR, self.order.lines.all()[0].status)
 
-    @mock.patch('requests.post', mock.Mock(side_effect=ReqConnectionError))
+    @mock.patch('requests.Session.post', mock.Mock(side_effect=ReqConnectionError))
     def test_enrollment_module_network_error(self):
         """Test that lines receive a network error status if a fulfillment request experiences a network error."""
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_NETWORK_ERROR, self.order.lines.all()[0].status)
 
-    @mock.patch('requests.post', mock.Mock(side_effect=Timeout))
+    @mock.patch('requests.Session.post', mock.Mock(side_effect=Timeout))
     def test_enrollment_module_request_timeout(self):
         """Test that lines receive a timeout error status if a fulfillment request times out."""
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
@@ -329,6 +331,82 @@ class EnrollmentFulfillmentModuleTests(
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_SERVER_ERROR, self.order.lines.all()[0].status)
 
+    @ddt.data(True, False)
+    def test_enrollment_module_fulfill_multiple_lines(self, concurrent):
+        """Verify line statuses and order notes do not depend on whether lines are fulfilled concurrently."""
+        failing_course = CourseFactory(id='edX/DemoX/Failing_Course', partner=self.partner)
+        courses = [CourseFactory(id='edX/DemoX/Course_{}'.format(index), partner=self.partner) for index in range(3)]
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        for course in courses[:1] + [failing_course] + courses[1:]:
+            basket.add_product(course.create_or_update_seat(self.certificate_type, False, 100), 1)
+        order = create_order(number=3, basket=basket, user=self.user)
+
+        def post(url, data, **kwargs):  # pylint: disable=unused-argument
+            if json.loads(data)['course_details']['course_id'] == failing_course.id:
+                return mock.Mock(status_code=500, json=mock.Mock(return_value={'message': 'Oops!'}))
+            return mock.Mock(status_code=200)
+
+        with override_switch(CONCURRENT_FULFILLMENT_SWITCH, active=concurrent):
+            with mock.patch('requests.Session.post', side_effect=post) as mock_post:
+                EnrollmentFulfillmentModule().fulfill_product(order, list(order.lines.all()))
+
+        self.assertEqual(
+            [(line.product.attr.course_key, line.status) for line in order.lines.order_by('id')],
+            [
+                (courses[0].id, LINE.COMPLETE),
+                (failing_course.id, LINE.FULFILLMENT_SERVER_ERROR),
+                (courses[1].id, LINE.COMPLETE),
+                (courses[2].id, LINE.COMPLETE),
+            ]
+        )
+        self.assertEqual(list(order.notes.values_list('message', flat=True)), ['Oops!'])
+        self.assertEqual(mock_post.call_count, 4)
+
+    def test_enrollment_module_fulfill_products(self):
+        """Verify the seat lines of many orders are fulfilled with a single batch of Enrollment API requests."""
+        other_user = UserFactory()
+        basket = factories.BasketFactory(owner=other_user, site=self.site)
+        basket.add_product(self.seat, 1)
+        other_order = create_order(number=3, basket=basket, user=other_user)
+
+        dispatch_path = 'ecommerce.extensions.fulfillment.modules.dispatch_fulfillment_requests'
+        with mock.patch('requests.Session.post', return_value=mock.Mock(status_code=200)) as mock_post:
+            with mock.patch(dispatch_path, wraps=dispatch_fulfillment_requests) as mock_dispatch:
+                EnrollmentFulfillmentModule().fulfill_products([
+                    (self.order, list(self.order.lines.all())),
+                    (other_order, list(other_order.lines.all())),
+                ])
+
+        mock_dispatch.assert_called_once()
+        self.assertEqual(
+            [json.loads(call[1]['data'])['user'] for call in mock_post.call_args_list],
+            [self.user.username, other_user.username]
+        )
+        self.assertEqual(LINE.COMPLETE, self.order.lines.get().status)
+        self.assertEqual(LINE.COMPLETE, other_order.lines.get().status)
+
+    def test_enrollment_module_fulfill_products_unexpected_error(self):
+        """Verify the lines of all orders receive a status before an unexpected error is raised."""
+        other_user = UserFactory()
+        basket = factories.BasketFactory(owner=other_user, site=self.site)
+        basket.add_product(self.seat, 1)
+        other_order = create_order(number=3, basket=basket, user=other_user)
+
+        def post(url, data, **kwargs):  # pylint: disable=unused-argument
+            if json.loads(data)['user'] == self.user.username:
+                raise ValueError
+            return mock.Mock(status_code=200)
+
+        with mock.patch('requests.Session.post', side_effect=post):
+            with self.assertRaises(ValueError):
+                EnrollmentFulfillmentModule().fulfill_products([
+                    (self.order, list(self.order.lines.all())),
+                    (other_order, list(other_order.lines.all())),
+                ])
+
+        self.assertEqual(LINE.FULFILLMENT_SERVER_ERROR, self.order.lines.get().status)
+        self.assertEqual(LINE.COMPLETE, other_order.lines.get().status)
+
     @httpretty.activate
     def test_revoke_product(self):
         """ The method should call the Enrollment API to un-enroll the student, and return True. """
@@ -1039,6 +1117,27 @@ class EntitlementFulfillmentModuleTests(FulfillmentTestMixin, EnterpriseDiscount
                     expected_effective_contract_discounted_price
                 )
 
+    @httpretty.activate
+    @override_switch(CONCURRENT_FULFILLMENT_SWITCH, active=True)
+    def test_entitlement_module_fulfill_concurrently(self):
+        """ Test that course entitlements of all lines are granted when lines are fulfilled concurrently. """
+        self.mock_access_token_response()
+        other_entitlement = create_or_update_course_entitlement(
+            'verified', 100, self.partner, '555-666-777-888', 'Other Course Entitlement')
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        basket.add_product(self.course_entitlement, 1)
+        basket.add_product(other_entitlement, 1)
+        order = create_order(number=2, basket=basket, user=self.user)
+
+        with mock.patch('ecommerce.extensions.fulfillment.modules.EdxRestApiClient') as mock_client:
+            mock_client.return_value.entitlements.post.return_value = self.return_data
+            CourseEntitlementFulfillmentModule().fulfill_product(order, list(order.lines.all()))
+
+        self.assertEqual(mock_client.return_value.entitlements.post.call_count, 2)
+        for line in order.lines.all():
+            self.assertEqual(LINE.COMPLETE, line.status)
+            self.assertEqual(line.attributes.get(option=self.entitlement_option).value, self.return_data['uuid'])
+
     @httpretty.activate
     def test_entitlement_module_revoke(self):
         """ Test to revoke a Course Entitlement. """
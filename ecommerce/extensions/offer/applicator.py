@@ -1,15 +1,158 @@
 
 
+import copy
 import logging
+import threading
+import time
+from collections import defaultdict
 from itertools import chain
+from uuid import UUID, uuid4
 
+import waffle
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+from edx_django_utils.cache import TieredCache
 from oscar.apps.offer.applicator import Applicator as OscarApplicator
 from oscar.core.loading import get_model
 
+from ecommerce.core.constants import ACTIVE_OFFER_INDEX_SWITCH, CATALOG_QUERY_MEMBERSHIP_PREFETCH_SWITCH
 from ecommerce.enterprise.api import get_enterprise_id_for_user
+from ecommerce.extensions.offer.catalog_membership import resolve_catalog_query_membership
 
 logger = logging.getLogger(__name__)
 BUNDLE = 'bundle_identifier'
+ACTIVE_OFFER_INDEX_VERSION_CACHE_KEY = 'ecommerce.offer.active_offer_index.version'
+
+
+def _normalize_uuid(value):
+    """ Return the given UUID (or UUID string) as a canonical string, or None if it is not a valid UUID. """
+    try:
+        return str(value if isinstance(value, UUID) else UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def invalidate_active_offer_index():
+    """
+    Invalidate the active offer index of every process.
+
+    The index version is shared through the cache, so each process rebuilds its index on its next lookup.
+    """
+    TieredCache.set_all_tiers(ACTIVE_OFFER_INDEX_VERSION_CACHE_KEY, uuid4().hex, None)
+
+
+class ActiveOfferIndex:
+    """
+    Process-local index of the site offers which are active, or will become active.
+
+    Offers are grouped into site-wide offers and offers keyed by enterprise customer UUID and by program
+    UUID, so that the Applicator can look them up without querying the database. The index is versioned:
+    the version is shared through the cache and changed by signal handlers whenever an offer, condition,
+    benefit or range is saved or deleted, at which point every process rebuilds its index. As a safety net,
+    the index is also rebuilt after settings.ACTIVE_OFFER_INDEX_TIMEOUT seconds.
+
+    Saving only the usage counters of an offer, as placing an order does, does not change the version. Lookups
+    return copies of the indexed offers, with their usage counters read again, so that each basket is priced with
+    its own offers, conditions, benefits and ranges rather than with instances shared by every request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._expires_at = 0
+        self._site_offers = []
+        self._enterprise_offers = {}
+        self._program_offers = {}
+
+    def _get_version(self):
+        cached_response = TieredCache.get_cached_response(ACTIVE_OFFER_INDEX_VERSION_CACHE_KEY)
+        if cached_response.is_found:
+            return cached_response.value
+
+        version = uuid4().hex
+        TieredCache.set_all_tiers(ACTIVE_OFFER_INDEX_VERSION_CACHE_KEY, version, None)
+        return version
+
+    def _build(self, version):
+        ConditionalOffer = get_model('offer', 'ConditionalOffer')
+        offers = ConditionalOffer.objects.filter(
+            Q(end_datetime__gte=now()) | Q(end_datetime=None),
+            offer_type=ConditionalOffer.SITE,
+            status=ConditionalOffer.OPEN,
+        ).select_related('condition', 'benefit', 'benefit__range').order_by('-priority', 'pk')
+
+        site_offers = []
+        enterprise_offers = defaultdict(list)
+        program_offers = defaultdict(list)
+        for offer in offers:
+            enterprise_customer_uuid = offer.condition.enterprise_customer_uuid
+            program_uuid = offer.condition.program_uuid
+            if enterprise_customer_uuid:
+                enterprise_offers[str(enterprise_customer_uuid)].append(offer)
+            if program_uuid:
+                program_offers[str(program_uuid)].append(offer)
+            if not enterprise_customer_uuid and not program_uuid:
+                site_offers.append(offer)
+
+        self._site_offers = site_offers
+        self._enterprise_offers = dict(enterprise_offers)
+        self._program_offers = dict(program_offers)
+        self._version = version
+        self._expires_at = time.time() + settings.ACTIVE_OFFER_INDEX_TIMEOUT
+        logger.info('Built active offer index [%s] with [%d] offers.', version, len(offers))
+
+    def _refresh(self):
+        version = self._get_version()
+        if version != self._version or time.time() >= self._expires_at:
+            with self._lock:
+                if version != self._version or time.time() >= self._expires_at:
+                    self._build(version)
+
+    def _active(self, offers):
+        """
+        Return copies of the offers, filtering out offers which have not started yet, or have ended since the
+        index was built.
+        """
+        current_datetime = now()
+        offers = [
+            copy.deepcopy(offer) for offer in offers
+            if (offer.start_datetime is None or offer.start_datetime <= current_datetime) and
+            (offer.end_datetime is None or offer.end_datetime >= current_datetime)
+        ]
+
+        # The usage counters of offers are updated by orders without rebuilding the index, so they are read again
+        # for the offers whose availability depends on them.
+        ConditionalOffer = get_model('offer', 'ConditionalOffer')
+        limited_offers = {
+            offer.id: offer for offer in offers
+            if offer.max_global_applications is not None or offer.max_discount is not None
+        }
+        if limited_offers:
+            usages = ConditionalOffer.objects.filter(id__in=limited_offers).values('id', *ConditionalOffer.USAGE_FIELDS)
+            for usage in usages:
+                offer = limited_offers[usage.pop('id')]
+                for field, value in usage.items():
+                    setattr(offer, field, value)
+        return offers
+
+    def get_site_offers(self):
+        """ Return the active site offers which are not associated with an enterprise customer or a program. """
+        self._refresh()
+        return self._active(self._site_offers)
+
+    def get_enterprise_offers(self, enterprise_customer_uuid):
+        """ Return the active site offers associated with the given enterprise customer. """
+        self._refresh()
+        return self._active(self._enterprise_offers.get(_normalize_uuid(enterprise_customer_uuid), []))
+
+    def get_program_offers(self, program_uuid):
+        """ Return the active site offers associated with the given program. """
+        self._refresh()
+        return self._active(self._program_offers.get(_normalize_uuid(program_uuid), []))
+
+
+active_offer_index = ActiveOfferIndex()
 
 
 class Applicator(OscarApplicator):
@@ -53,10 +196,7 @@ class Applicator(OscarApplicator):
         Returns:
             list of Offer: A sorted list of all the offers that apply to the basket.
         """
-        program_offers = self._get_program_offers(basket, bundle_id)
-        enterprise_offers = self._get_enterprise_offers(basket.site, user)
-        site_offers = [] if program_offers or enterprise_offers else self.get_site_offers()
-
+        shared_offers = self.get_shared_offers(basket.site, user, self._get_program_uuid(basket, bundle_id))
         basket_offers = self.get_basket_offers(basket, user)
 
         # edX currently does not use user offers or session offers.
@@ -66,12 +206,123 @@ class Applicator(OscarApplicator):
 
         return list(
             sorted(
-                chain(session_offers, basket_offers, user_offers, program_offers, enterprise_offers, site_offers),
+                chain(session_offers, basket_offers, user_offers, shared_offers),
                 key=lambda o: o.priority,
                 reverse=True,
             )
         )
 
+    def get_shared_offers(self, site, user=None, bundle_id=None):
+        """
+        Returns the offers that do not depend on the contents of a basket.
+
+        Temporary baskets never carry a bundle attribute, so program offers are looked up using the
+        given bundle_id only. Callers pricing many temporary baskets for the same user (e.g. the batch
+        basket calculation endpoint) can fetch these offers once and pass them to apply_shared_offers.
+
+        If the ACTIVE_OFFER_INDEX_SWITCH is active, offers are looked up in the process-local active offer
+        index rather than queried.
+
+        Returns:
+            list of Offer: The program, enterprise and site offers available to the user.
+        """
+        program_offers = self._get_program_offers(bundle_id) if bundle_id else []
+        enterprise_offers = self._get_enterprise_offers(site, user)
+        site_offers = [] if program_offers or enterprise_offers else self.get_site_offers()
+        return list(chain(program_offers, enterprise_offers, site_offers))
+
+    def apply_shared_offers(self, basket, shared_offers, user=None, request=None):
+        """
+        Apply the given shared offers, along with the offers of the basket vouchers, to the basket.
+
+        Args:
+            basket (Basket): The basket to check for eligible vouchers/offers.
+            shared_offers (list of Offer): Offers previously returned by get_shared_offers.
+            user (User): The user whose basket we are checking.
+            request (Request): The request, used to look up session offers.
+        """
+        offers = sorted(
+            chain(
+                self.get_session_offers(request),
+                self.get_basket_offers(basket, user),
+                self.get_user_offers(user),
+                shared_offers
+            ),
+            key=lambda o: o.priority,
+            reverse=True,
+        )
+        self.apply_offers(basket, offers)
+
+    def apply_offers(self, basket, offers):
+        """
+        Apply the given offers to the basket.
+
+        If the CATALOG_QUERY_MEMBERSHIP_PREFETCH_SWITCH is active, the catalog query membership of the basket
+        lines is resolved for all offers up front, so that each benefit only reads it from the request cache.
+        """
+        if waffle.switch_is_active(CATALOG_QUERY_MEMBERSHIP_PREFETCH_SWITCH):
+            self._prefetch_catalog_query_membership(basket, offers)
+        super(Applicator, self).apply_offers(basket, offers)
+
+    def _prefetch_catalog_query_membership(self, basket, offers):
+        """
+        Resolve the catalog query membership of the basket lines for the ranges of all offers at once.
+        """
+        lines = basket.all_lines()
+        products_by_query = {}
+        for offer in offers:
+            benefit = offer.benefit
+            benefit_range = benefit.range
+            if benefit_range and benefit_range.catalog_query is not None:
+                # pylint: disable=protected-access
+                products = products_by_query.setdefault(benefit_range.catalog_query, {})
+                for line in benefit._filter_for_paid_course_products(lines, benefit_range):
+                    products[line.product.id] = line.product
+
+        products_by_query = {
+            query: list(products.values()) for query, products in products_by_query.items() if products
+        }
+        if not products_by_query:
+            return
+
+        try:
+            resolve_catalog_query_membership(basket.site, products_by_query)
+        except Exception:  # pylint: disable=broad-except
+            # Each benefit resolves its own membership, and reports the failure, when it is applied.
+            logger.warning('Failed to prefetch catalog query membership for basket [%s].', basket.id, exc_info=True)
+
+    def get_basket_offers(self, basket, user):
+        """
+        Return basket-linked offers such as those associated with a voucher code.
+
+        Unlike Oscar's implementation, this also supports in-memory baskets, which hold
+        their vouchers without ever being saved.
+        """
+        InMemoryBasket = get_model('basket', 'InMemoryBasket')
+        if not isinstance(basket, InMemoryBasket):
+            return super(Applicator, self).get_basket_offers(basket, user)
+
+        offers = []
+        if not user:
+            return offers
+
+        for voucher in basket.vouchers.all():
+            available_to_user, __ = voucher.is_available_to_user(user=user)
+            if voucher.is_active() and available_to_user:
+                basket_offers = voucher.offers.select_related('condition', 'benefit__range')
+                for offer in basket_offers:
+                    offer.set_voucher(voucher)
+                offers = list(chain(offers, basket_offers))
+        return offers
+
+    def _query_site_offers(self, **filters):
+        """
+        Return the active site offers matching the given condition filters.
+        """
+        ConditionalOffer = get_model('offer', 'ConditionalOffer')
+        offers = ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE, **filters)
+        return list(offers.select_related('condition', 'benefit__range'))
+
     def get_site_offers(self):
         """
         Return other site offers that are available to baskets without bundle ids or
@@ -79,52 +330,49 @@ class Applicator(OscarApplicator):
 
         Excludes: Bundle and Enterprise offers.
         """
-        ConditionalOffer = get_model('offer', 'ConditionalOffer')
-        qs = ConditionalOffer.active.filter(
-            offer_type=ConditionalOffer.SITE,
+        if waffle.switch_is_active(ACTIVE_OFFER_INDEX_SWITCH):
+            return active_offer_index.get_site_offers()
+
+        return self._query_site_offers(
             condition__program_uuid__isnull=True,
             condition__enterprise_customer_uuid__isnull=True,
         )
-        return qs.select_related('condition', 'benefit')
 
     def _get_enterprise_offers(self, site, user):
         """
         Return enterprise offers filtered by the user's enterprise, if it exists.
         """
         enterprise_id = get_enterprise_id_for_user(site, user)
-        if enterprise_id:
-            ConditionalOffer = get_model('offer', 'ConditionalOffer')
-            offers = ConditionalOffer.active.filter(
-                offer_type=ConditionalOffer.SITE,
-                condition__enterprise_customer_uuid=enterprise_id
-            )
-            return offers.select_related('condition', 'benefit')
+        if not enterprise_id:
+            return []
+
+        if waffle.switch_is_active(ACTIVE_OFFER_INDEX_SWITCH):
+            return active_offer_index.get_enterprise_offers(enterprise_id)
 
-        return []
+        return self._query_site_offers(condition__enterprise_customer_uuid=enterprise_id)
 
-    def _get_program_offers(self, basket, bundle_id):
+    def _get_program_offers(self, program_uuid):
         """
         Returns offers that apply to the program by matching the bundle id.
+        """
+        if waffle.switch_is_active(ACTIVE_OFFER_INDEX_SWITCH):
+            return active_offer_index.get_program_offers(program_uuid)
 
-        Args:
-            bundle_id: Bundle ID to get program bundling for this basket.
+        return self._query_site_offers(condition__program_uuid=program_uuid)
 
-        Returns:
-            list of Offer: List of all the offers applicable to the program.
+    def _get_program_uuid(self, basket, bundle_id):
+        """
+        Returns the program UUID of the basket bundle attribute, falling back to the given bundle id.
         """
         BasketAttribute = get_model('basket', 'BasketAttribute')
         BasketAttributeType = get_model('basket', 'BasketAttributeType')
-        ConditionalOffer = get_model('offer', 'ConditionalOffer')
 
-        bundle_attributes = BasketAttribute.objects.filter(
-            basket=basket,
-            attribute_type=BasketAttributeType.objects.get(name=BUNDLE)
-        )
-        program_uuid = bundle_id if bundle_attributes.count() == 0 else bundle_attributes.first().value_text
-        if program_uuid:
-            offers = ConditionalOffer.active.filter(
-                offer_type=ConditionalOffer.SITE, condition__program_uuid=program_uuid
+        if basket.id:
+            # Unsaved (temporary) baskets cannot have a bundle attribute.
+            bundle_attributes = BasketAttribute.objects.filter(
+                basket=basket,
+                attribute_type=BasketAttributeType.objects.get(name=BUNDLE)
             )
-            return offers.select_related('condition', 'benefit')
-
-        return []
+            if bundle_attributes.count() != 0:
+                return bundle_attributes.first().value_text
+        return bundle_id
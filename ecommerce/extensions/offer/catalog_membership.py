@@ -0,0 +1,114 @@
+"""
+Resolution of catalog query membership for seat and entitlement products.
+
+Membership is cached per (site, partner, product identifier, catalog query) in the request cache and the
+Django cache. Cache lookups for all products and queries are done with a single multi-get, and every
+remaining miss of a catalog query is resolved with a single call to the Discovery Service. Products the
+Discovery Service does not report as contained in a query are cached as explicit negative results.
+"""
+
+
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
+
+from ecommerce.core.utils import get_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def get_catalog_identifier(product):
+    """ Returns the identifier used by the Discovery Service for the product: a course run ID or a course UUID. """
+    if product.is_seat_product:
+        return str(product.course_id)
+    # All other products passed here should be course entitlements.
+    return str(product.attr.UUID)
+
+
+def get_catalog_query_contains_cache_key(site, partner_code, identifier, query):
+    return get_cache_key(
+        site_domain=site.domain,
+        partner_code=partner_code,
+        resource='catalog_query.contains',
+        course_id=identifier,
+        query=query
+    )
+
+
+def resolve_catalog_query_membership(site, products_by_query):
+    """
+    Determines which products are contained in which catalog queries.
+
+    Args:
+        site (Site): The site whose Discovery Service and partner are used.
+        products_by_query (dict): Catalog queries mapped to the seat and entitlement products to check.
+
+    Returns:
+        dict: (query, product ID) tuples mapped to True if the product is contained in the query.
+
+    Raises:
+        Exception: Any error raised while contacting the Discovery Service.
+    """
+    partner_code = site.siteconfiguration.partner.short_code
+    membership = {}
+    uncached = {}
+
+    for query, products in products_by_query.items():
+        for product in products:
+            identifier = get_catalog_identifier(product)
+            cache_key = get_catalog_query_contains_cache_key(site, partner_code, identifier, query)
+            cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+            if cached_response.is_found:
+                membership[(query, product.id)] = bool(cached_response.value)
+            else:
+                uncached.setdefault(cache_key, []).append((query, product, identifier))
+
+    if not uncached:
+        return membership
+
+    for cache_key, value in django_cache.get_many(list(uncached)).items():
+        DEFAULT_REQUEST_CACHE.set(cache_key, value)
+        for query, product, __ in uncached.pop(cache_key):
+            membership[(query, product.id)] = bool(value)
+
+    if not uncached:
+        return membership
+
+    course_run_ids = defaultdict(set)
+    course_uuids = defaultdict(set)
+    for entries in uncached.values():
+        for query, product, identifier in entries:
+            if product.is_seat_product:
+                course_run_ids[query].add(identifier)
+            else:
+                course_uuids[query].add(identifier)
+
+    discovery_api_client = site.siteconfiguration.discovery_api_client
+    contained = {}
+    for query in set(course_run_ids) | set(course_uuids):
+        response = discovery_api_client.catalog.query_contains.get(
+            course_run_ids=','.join(sorted(course_run_ids[query])),
+            course_uuids=','.join(sorted(course_uuids[query])),
+            query=query,
+            partner=partner_code
+        )
+        contained[query] = response
+
+    values = {}
+    for cache_key, entries in uncached.items():
+        for query, product, identifier in entries:
+            # Identifiers missing from the response are cached as not contained, so that they are not requested
+            # again. Convert to int, because this is what memcached will return, and the request cache should
+            # return the same value.
+            in_range = int(bool(contained[query].get(identifier, False)))
+            values[cache_key] = in_range
+            membership[(query, product.id)] = bool(in_range)
+
+    for cache_key, value in values.items():
+        DEFAULT_REQUEST_CACHE.set(cache_key, value)
+    django_cache.set_many(values, settings.COURSES_API_CACHE_TIMEOUT)
+
+    return membership
@@ -0,0 +1,128 @@
+"""
+Running totals of the discounts given by offers, per offer and per offer and user, to completed orders.
+
+A ledger is initialized from the discounts of the completed orders the first time it is read, and is then
+incremented, in the transaction which completes an order, by the discounts of that order. Reading the total of an
+offer, or of an offer and user, is then a single row lookup instead of an aggregate over the order discounts.
+The reconcile_offer_discount_ledger command corrects ledgers which have drifted from the discounts they summarize.
+"""
+
+
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.fulfillment.status import ORDER
+
+OfferDiscountLedger = get_model('offer', 'OfferDiscountLedger')
+OfferUserDiscountLedger = get_model('offer', 'OfferUserDiscountLedger')
+OrderDiscount = get_model('order', 'OrderDiscount')
+
+logger = logging.getLogger(__name__)
+
+
+def _sum_completed_order_discounts(offer_id, user_id=None):
+    discounts = OrderDiscount.objects.filter(offer_id=offer_id, order__status=ORDER.COMPLETE)
+    if user_id is not None:
+        discounts = discounts.filter(order__user_id=user_id)
+    return discounts.aggregate(Sum('amount'))['amount__sum'] or Decimal(0)
+
+
+def _get_or_initialize(model, offer_id, user_id=None):
+    lookup = {'offer_id': offer_id}
+    if user_id is not None:
+        lookup['user_id'] = user_id
+
+    amount = model.objects.filter(**lookup).values_list('amount', flat=True).first()
+    if amount is not None:
+        return amount
+
+    # The ledger is created, and locked, before the discounts are summed, so that the discounts of an order completed
+    # meanwhile are either included in the sum, or added to the ledger by record_order_discounts once it is committed.
+    with transaction.atomic():
+        ledger, created = model.objects.select_for_update().get_or_create(defaults={'amount': Decimal(0)}, **lookup)
+        if created:
+            ledger.amount = _sum_completed_order_discounts(offer_id, user_id)
+            model.objects.filter(id=ledger.id).update(amount=ledger.amount)
+    return ledger.amount
+
+
+def get_offer_discount_total(offer):
+    """ Returns the sum of the discounts given by the offer to completed orders. """
+    return _get_or_initialize(OfferDiscountLedger, offer.id)
+
+
+def get_offer_user_discount_total(offer, user):
+    """ Returns the sum of the discounts given by the offer to the completed orders of the user. """
+    return _get_or_initialize(OfferUserDiscountLedger, offer.id, user.id)
+
+
+def record_order_discounts(order):
+    """
+    Adds the discounts of a newly completed order to the ledgers of its offers.
+
+    Ledgers which have not been initialized yet are left alone, they will include the order once they are.
+    """
+    amounts = {}
+    for discount in order.discounts.all():
+        if discount.offer_id:
+            amounts[discount.offer_id] = amounts.get(discount.offer_id, Decimal(0)) + discount.amount
+
+    with transaction.atomic():
+        for offer_id, amount in amounts.items():
+            OfferDiscountLedger.objects.filter(offer_id=offer_id).update(amount=F('amount') + amount)
+            if order.user_id:
+                OfferUserDiscountLedger.objects.filter(
+                    offer_id=offer_id, user_id=order.user_id
+                ).update(amount=F('amount') + amount)
+
+
+def reconcile_offer_discount_ledgers(offer_ids=None):
+    """
+    Corrects the ledgers whose totals differ from the discounts of the completed orders.
+
+    Args:
+        offer_ids (list): IDs of the offers whose ledgers are reconciled. Defaults to all offers.
+
+    Returns:
+        int: Number of corrected ledgers.
+    """
+    offer_ledgers = OfferDiscountLedger.objects.order_by('offer_id')
+    user_ledgers = OfferUserDiscountLedger.objects.order_by('offer_id')
+    if offer_ids:
+        offer_ledgers = offer_ledgers.filter(offer_id__in=offer_ids)
+        user_ledgers = user_ledgers.filter(offer_id__in=offer_ids)
+
+    corrected = 0
+    for ledger in offer_ledgers:
+        amount = _sum_completed_order_discounts(ledger.offer_id)
+        if ledger.amount != amount:
+            logger.warning(
+                'Corrected the discount ledger of offer [%d] from [%s] to [%s].', ledger.offer_id, ledger.amount, amount
+            )
+            OfferDiscountLedger.objects.filter(id=ledger.id).update(amount=amount)
+            corrected += 1
+
+    user_amounts = {}
+    for offer_id in set(user_ledgers.values_list('offer_id', flat=True)):
+        user_amounts.update({
+            (offer_id, row['order__user_id']): row['total']
+            for row in OrderDiscount.objects.filter(
+                offer_id=offer_id, order__status=ORDER.COMPLETE
+            ).values('order__user_id').order_by('order__user_id').annotate(total=Sum('amount'))
+        })
+
+    for ledger in user_ledgers:
+        amount = user_amounts.get((ledger.offer_id, ledger.user_id)) or Decimal(0)
+        if ledger.amount != amount:
+            logger.warning(
+                'Corrected the discount ledger of offer [%d] and user [%d] from [%s] to [%s].',
+                ledger.offer_id, ledger.user_id, ledger.amount, amount
+            )
+            OfferUserDiscountLedger.objects.filter(id=ledger.id).update(amount=amount)
+            corrected += 1
+
+    return corrected
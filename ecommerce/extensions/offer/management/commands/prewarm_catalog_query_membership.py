@@ -0,0 +1,94 @@
+"""
+This command prewarms the cached catalog query membership of the most used catalog query offers.
+"""
+
+
+import logging
+
+from django.core.management import BaseCommand
+from django.db.models import Q, Sum
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+
+from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
+from ecommerce.extensions.offer.catalog_membership import resolve_catalog_query_membership
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+logger = logging.getLogger(__name__)
+Product = get_model('catalogue', 'Product')
+Range = get_model('offer', 'Range')
+SiteConfiguration = get_model('core', 'SiteConfiguration')
+
+
+class Command(BaseCommand):
+    """
+    Resolves, and caches, whether the seats and entitlements of each site's partner are contained in the
+    catalog queries of the most applied active offers, so that baskets do not wait on the Discovery Service.
+
+    Example:
+
+        ./manage.py prewarm_catalog_query_membership --max-queries 20
+    """
+
+    help = 'Prewarm the cached catalog query membership of the most used catalog query offers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-queries',
+            dest='max_queries',
+            default=50,
+            help='Number of catalog queries, most applied first, to prewarm.',
+            type=int,
+        )
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            default=100,
+            help='Number of products to check with a single Discovery Service call.',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        max_queries = options['max_queries']
+        batch_size = options['batch_size']
+        product_class_names = [SEAT_PRODUCT_CLASS_NAME, COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME]
+
+        queries = list(
+            Range.objects.filter(
+                benefit__offers__in=ConditionalOffer.active.all(),
+                catalog_query__isnull=False,
+            ).exclude(
+                catalog_query='',
+            ).values('catalog_query').annotate(
+                num_applications=Sum('benefit__offers__num_applications'),
+            ).order_by('-num_applications').values_list('catalog_query', flat=True)[:max_queries]
+        )
+        if not queries:
+            logger.info('No active offers with catalog queries found.')
+            return
+
+        for site_configuration in SiteConfiguration.objects.select_related('site', 'partner'):
+            site = site_configuration.site
+            products = list(
+                Product.objects.filter(
+                    Q(product_class__name__in=product_class_names) |
+                    Q(parent__product_class__name__in=product_class_names),
+                    stockrecords__partner=site_configuration.partner,
+                ).exclude(
+                    structure=Product.PARENT,
+                ).exclude(
+                    expires__lt=now(),
+                ).select_related('product_class', 'parent__product_class').distinct()
+            )
+
+            logger.info(
+                'Prewarming catalog query membership of [%d] products for [%d] catalog queries of site [%s].',
+                len(products), len(queries), site.domain
+            )
+            for start in range(0, len(products), batch_size):
+                batch = products[start:start + batch_size]
+                try:
+                    resolve_catalog_query_membership(site, {query: batch for query in queries})
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception('Failed to prewarm catalog query membership for site [%s].', site.domain)
+                    break
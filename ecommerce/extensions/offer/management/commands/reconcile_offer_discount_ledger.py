@@ -0,0 +1,39 @@
+"""
+This command corrects the offer discount ledgers whose totals differ from the discounts of the completed orders.
+"""
+
+
+import logging
+
+from django.core.management import BaseCommand
+
+from ecommerce.extensions.offer.discount_ledger import reconcile_offer_discount_ledgers
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the running totals kept by the offer discount ledgers from the discounts of the completed orders, and
+    corrects the ledgers which have drifted.
+
+    Example:
+
+        ./manage.py reconcile_offer_discount_ledger --offer-ids 1 2
+    """
+
+    help = 'Correct the offer discount ledgers which differ from the discounts of the completed orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--offer-ids',
+            dest='offer_ids',
+            nargs='+',
+            default=None,
+            help='IDs of the offers whose ledgers are reconciled. Defaults to all offers.',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        corrected = reconcile_offer_discount_ledgers(options['offer_ids'])
+        logger.info('[Offer Discount Ledger] Reconciliation completed. Corrected ledgers: %d', corrected)
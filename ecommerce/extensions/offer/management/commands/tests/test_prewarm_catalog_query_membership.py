@@ -0,0 +1,45 @@
+import httpretty
+from django.core.management import call_command
+from edx_django_utils.cache import TieredCache
+from mock import patch
+from oscar.test import factories
+
+from ecommerce.coupons.tests.mixins import DiscoveryMockMixin
+from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
+from ecommerce.extensions.offer.catalog_membership import get_catalog_identifier, get_catalog_query_contains_cache_key
+from ecommerce.tests.testcases import TestCase
+
+LOGGER_NAME = 'ecommerce.extensions.offer.management.commands.prewarm_catalog_query_membership'
+
+
+@httpretty.activate
+class PrewarmCatalogQueryMembershipTests(DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
+    """Tests for prewarm_catalog_query_membership management command."""
+
+    def setUp(self):
+        super(PrewarmCatalogQueryMembershipTests, self).setUp()
+        self.query = 'key:*'
+        self.course, self.seat = self.create_course_and_seat(partner=self.partner)
+        _range = factories.RangeFactory(course_seat_types='verified', catalog_query=self.query)
+        factories.ConditionalOfferFactory(benefit=factories.BenefitFactory(range=_range))
+
+    def test_prewarm(self):
+        """ Verify the membership of the partner's seats is cached for the catalog queries of active offers. """
+        self.mock_access_token_response()
+        self.mock_catalog_query_contains_endpoint(
+            course_run_ids=[self.course.id], course_uuids=[], absent_ids=[], query=self.query,
+            discovery_api_url=self.site_configuration.discovery_api_url
+        )
+
+        call_command('prewarm_catalog_query_membership')
+
+        cache_key = get_catalog_query_contains_cache_key(
+            self.site, self.partner.short_code, get_catalog_identifier(self.seat), self.query
+        )
+        self.assertEqual(TieredCache.get_cached_response(cache_key).value, 1)
+
+    def test_prewarm_failure(self):
+        """ Verify Discovery Service failures are logged, not raised. """
+        with patch('{}.logger.exception'.format(LOGGER_NAME)) as mock_logger:
+            call_command('prewarm_catalog_query_membership')
+        self.assertTrue(mock_logger.called)
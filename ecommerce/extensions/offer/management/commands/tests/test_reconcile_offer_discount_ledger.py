@@ -0,0 +1,31 @@
+from django.core.management import call_command
+from mock import patch
+from oscar.core.loading import get_model
+from oscar.test.factories import OrderDiscountFactory, OrderFactory
+
+from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.offer.discount_ledger import get_offer_discount_total
+from ecommerce.extensions.test import factories
+from ecommerce.tests.testcases import TestCase
+
+LOGGER_NAME = 'ecommerce.extensions.offer.management.commands.reconcile_offer_discount_ledger'
+OfferDiscountLedger = get_model('offer', 'OfferDiscountLedger')
+
+
+class ReconcileOfferDiscountLedgerTests(TestCase):
+    """Tests for reconcile_offer_discount_ledger management command."""
+
+    def test_reconcile(self):
+        """ Verify the ledgers of the given offers are corrected. """
+        offer = factories.EnterpriseOfferFactory(partner=self.partner)
+        OrderDiscountFactory(order=OrderFactory(status=ORDER.COMPLETE), offer_id=offer.id, amount=10)
+        get_offer_discount_total(offer)
+        OfferDiscountLedger.objects.update(amount=0)
+
+        with patch('{}.logger.info'.format(LOGGER_NAME)) as mock_logger:
+            call_command('reconcile_offer_discount_ledger', '--offer-ids', str(offer.id))
+
+        mock_logger.assert_called_once_with(
+            '[Offer Discount Ledger] Reconciliation completed. Corrected ledgers: %d', 1
+        )
+        self.assertEqual(OfferDiscountLedger.objects.get(offer=offer).amount, 10)
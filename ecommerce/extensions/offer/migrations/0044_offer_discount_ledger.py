@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('offer', '0043_offerusageemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferDiscountLedger',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='discount_ledger', to='offer.ConditionalOffer')),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OfferUserDiscountLedger',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_discount_ledgers', to='offer.ConditionalOffer')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('offer', 'user')},
+            },
+        ),
+    ]
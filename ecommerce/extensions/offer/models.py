@@ -25,6 +25,7 @@ from slumber.exceptions import SlumberBaseException
 from threadlocals.threadlocals import get_current_request
 
 from ecommerce.core.utils import get_cache_key, log_message_and_raise_validation_error
+from ecommerce.extensions.offer.catalog_membership import resolve_catalog_query_membership
 from ecommerce.extensions.offer.constants import (
     OFFER_ASSIGNED,
     OFFER_ASSIGNMENT_EMAIL_BOUNCED,
@@ -74,40 +75,6 @@ class Benefit(AbstractBenefit):
             line.product.attr.certificate_type.lower() in applicable_range.course_seat_types
         ]
 
-    def _identify_uncached_product_identifiers(self, lines, domain, partner_code, query):
-        """
-        Checks the cache to see if each line is in the catalog range specified by the given query
-        and tracks identifiers for which discovery service data is still needed.
-        """
-        uncached_course_run_ids = []
-        uncached_course_uuids = []
-
-        applicable_lines = lines
-        for line in applicable_lines:
-            if line.product.is_seat_product:
-                product_id = line.product.course.id
-            else:  # All lines passed to this method should either have a seat or an entitlement product
-                product_id = line.product.attr.UUID
-
-            cache_key = get_cache_key(
-                site_domain=domain,
-                partner_code=partner_code,
-                resource='catalog_query.contains',
-                course_id=product_id,
-                query=query
-            )
-            in_catalog_range_cached_response = TieredCache.get_cached_response(cache_key)
-
-            if not in_catalog_range_cached_response.is_found:
-                if line.product.is_seat_product:
-                    uncached_course_run_ids.append({'id': product_id, 'cache_key': cache_key, 'line': line})
-                else:
-                    uncached_course_uuids.append({'id': product_id, 'cache_key': cache_key, 'line': line})
-            elif not in_catalog_range_cached_response.value:
-                applicable_lines.remove(line)
-
-        return uncached_course_run_ids, uncached_course_uuids, applicable_lines
-
     def get_applicable_lines(self, offer, basket, range=None):  # pylint: disable=redefined-builtin
         """
         Returns the basket lines for which the benefit is applicable.
@@ -119,43 +86,20 @@ class Benefit(AbstractBenefit):
             query = applicable_range.catalog_query
             applicable_lines = self._filter_for_paid_course_products(basket.all_lines(), applicable_range)
 
-            site = basket.site
-            partner_code = site.siteconfiguration.partner.short_code
-            course_run_ids, course_uuids, applicable_lines = self._identify_uncached_product_identifiers(
-                applicable_lines, site.domain, partner_code, query
-            )
-
-            if course_run_ids or course_uuids:
-                # Hit Discovery Service to determine if remaining courses and runs are in the range.
-                try:
-                    response = site.siteconfiguration.discovery_api_client.catalog.query_contains.get(
-                        course_run_ids=','.join([metadata['id'] for metadata in course_run_ids]),
-                        course_uuids=','.join([metadata['id'] for metadata in course_uuids]),
-                        query=query,
-                        partner=partner_code
-                    )
-                except Exception as err:  # pylint: disable=bare-except
-                    logger.exception(
-                        '[Code Redemption Failure] Unable to apply benefit because we failed to query the '
-                        'Discovery Service for catalog data. '
-                        'User: %s, Offer: %s, Basket: %s, Message: %s',
-                        basket.owner.username, offer.id, basket.id, err
-                    )
-                    raise Exception('Failed to contact Discovery Service to retrieve offer catalog_range data.')
-
-                # Cache range-state individually for each course or run identifier and remove lines not in the range.
-                for metadata in course_run_ids + course_uuids:
-                    in_range = response[str(metadata['id'])]
-
-                    # Convert to int, because this is what memcached will return, and the request cache should return
-                    # the same value.
-                    # Note: once the TieredCache is fixed to handle this case, we could remove this line.
-                    in_range = int(in_range)
-                    TieredCache.set_all_tiers(metadata['cache_key'], in_range, settings.COURSES_API_CACHE_TIMEOUT)
-
-                    if not in_range:
-                        applicable_lines.remove(metadata['line'])
+            try:
+                membership = resolve_catalog_query_membership(
+                    basket.site, {query: [line.product for line in applicable_lines]}
+                )
+            except Exception as err:  # pylint: disable=bare-except
+                logger.exception(
+                    '[Code Redemption Failure] Unable to apply benefit because we failed to query the '
+                    'Discovery Service for catalog data. '
+                    'User: %s, Offer: %s, Basket: %s, Message: %s',
+                    basket.owner.username, offer.id, basket.id, err
+                )
+                raise Exception('Failed to contact Discovery Service to retrieve offer catalog_range data.')
 
+            applicable_lines = [line for line in applicable_lines if membership[(query, line.product.id)]]
             return [(line.product.stockrecords.first().price_excl_tax, line) for line in applicable_lines]
         return super(Benefit, self).get_applicable_lines(offer, basket, range=range)  # pylint: disable=bad-super-call
 
@@ -170,6 +114,7 @@ class ConditionalOffer(AbstractConditionalOffer):
         (MONTHLY, 'Monthly'),
     ]
     UPDATABLE_OFFER_FIELDS = ['email_domains', 'max_uses']
+    USAGE_FIELDS = ['num_applications', 'total_discount', 'num_orders']
     email_domains = models.CharField(max_length=255, blank=True, null=True)
     sales_force_id = models.CharField(max_length=30, blank=True, null=True)
     max_user_discount = models.DecimalField(
@@ -209,6 +154,20 @@ class ConditionalOffer(AbstractConditionalOffer):
         self.clean()
         super(ConditionalOffer, self).save(*args, **kwargs)  # pylint: disable=bad-super-call
 
+    def record_usage(self, discount):
+        """
+        Record the usage of the offer by an order, saving only its usage counters, and its status once the offer
+        has been consumed, so that placing orders does not invalidate the active offer index.
+        """
+        self.num_applications += discount['freq']
+        self.total_discount += discount['discount']
+        self.num_orders += 1
+        update_fields = list(self.USAGE_FIELDS)
+        if not self.is_suspended and self.status != self.CONSUMED and self.get_max_applications() == 0:
+            update_fields.append('status')
+        self.save(update_fields=update_fields)
+    record_usage.alters_data = True
+
     def clean(self):
         self.clean_email_domains()
         self.clean_max_global_applications()  # Our frontend uses the name max_uses instead of max_global_applications
@@ -635,4 +594,28 @@ class OfferUsageEmail(TimeStampedModel):
         return record
 
 
+class OfferDiscountLedger(TimeStampedModel):
+    """
+    Running total of the discounts given by an offer to completed orders.
+
+    Maintained by ecommerce.extensions.offer.discount_ledger, see reconcile_offer_discount_ledger.
+    """
+    offer = models.OneToOneField('offer.ConditionalOffer', related_name='discount_ledger', on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+
+class OfferUserDiscountLedger(TimeStampedModel):
+    """
+    Running total of the discounts given by an offer to the completed orders of a user.
+
+    Maintained by ecommerce.extensions.offer.discount_ledger, see reconcile_offer_discount_ledger.
+    """
+    offer = models.ForeignKey('offer.ConditionalOffer', related_name='user_discount_ledgers', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('offer', 'user')
+
+
 from oscar.apps.offer.models import *  # noqa isort:skip pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-position,wrong-import-order,ungrouped-imports
@@ -0,0 +1,49 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from oscar.core.loading import get_class, get_model
+
+from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.offer.applicator import invalidate_active_offer_index
+from ecommerce.extensions.offer.discount_ledger import record_order_discounts
+from ecommerce.extensions.voucher.usage_summary import refresh_voucher_usage_summaries
+
+Benefit = get_model('offer', 'Benefit')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+OfferAssignment = get_model('offer', 'OfferAssignment')
+Range = get_model('offer', 'Range')
+order_status_changed = get_class('order.signals', 'order_status_changed')
+
+
+@receiver(post_delete, sender=Benefit)
+@receiver(post_save, sender=Benefit)
+@receiver(post_delete, sender=Condition)
+@receiver(post_save, sender=Condition)
+@receiver(post_delete, sender=ConditionalOffer)
+@receiver(post_save, sender=ConditionalOffer)
+@receiver(post_delete, sender=Range)
+@receiver(post_save, sender=Range)
+def invalidate_offer_index(sender, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    When offers, or the conditions, benefits and ranges they are built from, change,
+    the active offer index used by the Applicator must be rebuilt.
+
+    Saving only the usage counters of an offer, as orders do, does not change the index.
+    """
+    if sender is ConditionalOffer and update_fields and set(update_fields) <= set(ConditionalOffer.USAGE_FIELDS):
+        return
+    invalidate_active_offer_index()
+
+
+@receiver(order_status_changed, dispatch_uid='offer.record_order_discounts')
+def record_completed_order_discounts(sender, order, old_status, new_status, **kwargs):  # pylint: disable=unused-argument
+    """ The discounts of completed orders are added to the discount ledgers of their offers. """
+    if new_status == ORDER.COMPLETE:
+        record_order_discounts(order)
+
+
+@receiver(post_delete, sender=OfferAssignment, dispatch_uid='offer.refresh_voucher_usage_summary_on_delete')
+@receiver(post_save, sender=OfferAssignment, dispatch_uid='offer.refresh_voucher_usage_summary_on_save')
+def refresh_voucher_usage_summary(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ The usage summary of a voucher is recounted when one of its offer assignments is saved or deleted. """
+    refresh_voucher_usage_summaries([instance.code])
@@ -1,15 +1,23 @@
 
 
+import datetime
 from uuid import uuid4
 
 import ddt
 import mock
+from django.test import override_settings
+from django.utils.timezone import now
 from oscar.core.loading import get_model
 from oscar.test import factories
 from six.moves import range
 
-from ecommerce.core.constants import SYSTEM_ENTERPRISE_LEARNER_ROLE
-from ecommerce.extensions.offer.applicator import Applicator
+from ecommerce.core.constants import (
+    ACTIVE_OFFER_INDEX_SWITCH,
+    CATALOG_QUERY_MEMBERSHIP_PREFETCH_SWITCH,
+    SYSTEM_ENTERPRISE_LEARNER_ROLE
+)
+from ecommerce.core.tests import toggle_switch
+from ecommerce.extensions.offer.applicator import ActiveOfferIndex, Applicator
 from ecommerce.extensions.test.factories import ConditionalOfferFactory, ConditionFactory, ProgramOfferFactory
 from ecommerce.tests.factories import UserFactory
 from ecommerce.tests.testcases import TestCase
@@ -70,6 +78,31 @@ class ApplicatorTests(TestCase):
         # Verify that program offer was not returned without bundle_id
         self.assert_correct_offers(site_offers)
 
+    def test_get_offers_from_index(self):
+        """ Verify offers are looked up in the active offer index if the switch is active. """
+        toggle_switch(ACTIVE_OFFER_INDEX_SWITCH, True)
+        offers_in_db = list(ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE))
+        site_offers = ConditionalOfferFactory.create_batch(3) + offers_in_db
+
+        with mock.patch('ecommerce.extensions.offer.applicator.active_offer_index') as mock_index:
+            mock_index.get_enterprise_offers.return_value = []
+            mock_index.get_site_offers.return_value = site_offers
+            self.assert_correct_offers(site_offers)
+        self.assertTrue(mock_index.get_site_offers.called)
+
+    @ddt.data(True, False)
+    def test_catalog_query_membership_prefetched(self, switch_active):
+        """ Verify the catalog query membership of the basket lines is only prefetched if the switch is active. """
+        toggle_switch(CATALOG_QUERY_MEMBERSHIP_PREFETCH_SWITCH, switch_active)
+        offers = [ConditionalOfferFactory()]
+
+        with mock.patch.object(Applicator, '_prefetch_catalog_query_membership') as mock_prefetch, \
+                mock.patch('oscar.apps.offer.applicator.Applicator.apply_offers') as mock_apply_offers:
+            self.applicator.apply_offers(self.basket, offers)
+
+        self.assertEqual(mock_prefetch.called, switch_active)
+        mock_apply_offers.assert_called_once_with(self.basket, offers)
+
     def test_get_site_offers(self):
         """ Verify get_site_offers returns correct objects based on filter"""
         existing_offers = list(ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE))
@@ -87,7 +120,7 @@ class ApplicatorTests(TestCase):
                 enterprise_customer_uuid=None
             )
             ConditionalOfferFactory(condition=condition)
-        assert self.applicator.get_site_offers().count() == 3 + len(existing_offers)
+        assert len(self.applicator.get_site_offers()) == 3 + len(existing_offers)
 
     @ddt.data(
         (uuid4(), 2),
@@ -130,4 +163,94 @@ class ApplicatorTests(TestCase):
         if num_expected_offers == 0:
             assert not enterprise_offers
         else:
-            assert enterprise_offers.count() == num_expected_offers
+            assert len(enterprise_offers) == num_expected_offers
+
+
+class ActiveOfferIndexTests(TestCase):
+    """ Tests for the process-local active offer index. """
+
+    def setUp(self):
+        super(ActiveOfferIndexTests, self).setUp()
+        self.index = ActiveOfferIndex()
+
+    def test_lookups_do_not_query_database(self):
+        """ Verify the index is only built once while offers are unchanged. """
+        offer = ConditionalOfferFactory()
+        self.assertIn(offer, self.index.get_site_offers())
+
+        with self.assertNumQueries(0):
+            self.assertIn(offer, self.index.get_site_offers())
+
+    def test_index_invalidated_on_save(self):
+        """ Verify saving an offer, or its condition, rebuilds the index. """
+        enterprise_customer_uuid = uuid4()
+        offer = ConditionalOfferFactory()
+        self.assertIn(offer, self.index.get_site_offers())
+
+        offer.condition.enterprise_customer_uuid = enterprise_customer_uuid
+        offer.condition.save()
+        self.assertNotIn(offer, self.index.get_site_offers())
+        self.assertEqual(self.index.get_enterprise_offers(str(enterprise_customer_uuid)), [offer])
+
+        offer.status = ConditionalOffer.SUSPENDED
+        offer.save()
+        self.assertEqual(self.index.get_enterprise_offers(enterprise_customer_uuid), [])
+
+    def test_index_not_invalidated_by_usage(self):
+        """ Verify recording the usage of an offer only rebuilds the index once the offer has been consumed. """
+        offer = ConditionalOfferFactory(max_global_applications=2)
+        self.assertIn(offer, self.index.get_site_offers())
+
+        offer.record_usage({'freq': 1, 'discount': 10})
+        with self.assertNumQueries(1):
+            site_offers = self.index.get_site_offers()
+        self.assertEqual(site_offers[site_offers.index(offer)].num_applications, 1)
+
+        offer.record_usage({'freq': 1, 'discount': 10})
+        self.assertEqual(ConditionalOffer.objects.get(id=offer.id).status, ConditionalOffer.CONSUMED)
+        self.assertNotIn(offer, self.index.get_site_offers())
+
+    def test_lookups_return_copies(self):
+        """ Verify each lookup returns its own copies of the indexed offers. """
+        offer = ConditionalOfferFactory()
+        first_offer, second_offer = [
+            site_offers[site_offers.index(offer)]
+            for site_offers in (self.index.get_site_offers(), self.index.get_site_offers())
+        ]
+        self.assertIsNot(first_offer, second_offer)
+        self.assertIsNot(first_offer.benefit.range, second_offer.benefit.range)
+
+    def test_index_invalidated_on_delete(self):
+        """ Verify deleting an offer rebuilds the index. """
+        offer = ProgramOfferFactory()
+        program_uuid = offer.condition.program_uuid
+        self.assertEqual(self.index.get_program_offers(program_uuid), [offer])
+
+        offer.delete()
+        self.assertEqual(self.index.get_program_offers(program_uuid), [])
+
+    def test_inactive_offers_excluded(self):
+        """ Verify expired offers are not indexed and offers which have not started are not returned. """
+        expired_offer = ConditionalOfferFactory(end_datetime=now() - datetime.timedelta(days=1))
+        future_offer = ConditionalOfferFactory(start_datetime=now() + datetime.timedelta(days=1))
+
+        site_offers = self.index.get_site_offers()
+        self.assertNotIn(expired_offer, site_offers)
+        self.assertNotIn(future_offer, site_offers)
+
+        with mock.patch('ecommerce.extensions.offer.applicator.now') as mock_now:
+            mock_now.return_value = now() + datetime.timedelta(days=2)
+            self.assertIn(future_offer, self.index.get_site_offers())
+
+    def test_index_expires(self):
+        """ Verify the index is rebuilt once ACTIVE_OFFER_INDEX_TIMEOUT has passed. """
+        self.index.get_site_offers()
+        with override_settings(ACTIVE_OFFER_INDEX_TIMEOUT=0):
+            self.index._expires_at = 0  # pylint: disable=protected-access
+            with self.assertNumQueries(1):
+                self.index.get_site_offers()
+
+    def test_invalid_uuid(self):
+        """ Verify lookups with values which are not UUIDs return no offers. """
+        self.assertEqual(self.index.get_enterprise_offers('not-a-uuid'), [])
+        self.assertEqual(self.index.get_program_offers('not-a-uuid'), [])
@@ -0,0 +1,84 @@
+
+
+import httpretty
+from django.core.cache import cache as django_cache
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
+
+from ecommerce.coupons.tests.mixins import DiscoveryMockMixin
+from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
+from ecommerce.extensions.offer.catalog_membership import (
+    get_catalog_identifier,
+    get_catalog_query_contains_cache_key,
+    resolve_catalog_query_membership
+)
+from ecommerce.tests.testcases import TestCase
+
+
+@httpretty.activate
+class ResolveCatalogQueryMembershipTests(DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
+    """ Tests for resolve_catalog_query_membership. """
+
+    def setUp(self):
+        super(ResolveCatalogQueryMembershipTests, self).setUp()
+        self.query = 'uuid:*'
+        self.course, self.seat = self.create_course_and_seat()
+        self.entitlement = self.create_entitlement_product()
+        self.mock_access_token_response()
+
+    def mock_query_contains(self, contained, absent):
+        """ Mocks the Discovery catalog query contains endpoint. """
+        self.mock_catalog_query_contains_endpoint(
+            course_run_ids=[], course_uuids=contained, absent_ids=absent, query=self.query,
+            discovery_api_url=self.site_configuration.discovery_api_url
+        )
+
+    def query_contains_requests(self):
+        return [request for request in httpretty.latest_requests() if 'query_contains' in request.path]
+
+    def test_single_request_for_all_products(self):
+        """ Verify the membership of all products is resolved with a single Discovery Service call. """
+        self.mock_query_contains(contained=[self.course.id], absent=[self.entitlement.attr.UUID])
+
+        membership = resolve_catalog_query_membership(self.site, {self.query: [self.seat, self.entitlement]})
+
+        self.assertEqual(membership, {(self.query, self.seat.id): True, (self.query, self.entitlement.id): False})
+        self.assertEqual(len(self.query_contains_requests()), 1)
+
+        # Verify both positive and negative results are cached
+        httpretty.disable()
+        membership = resolve_catalog_query_membership(self.site, {self.query: [self.seat, self.entitlement]})
+        self.assertEqual(membership, {(self.query, self.seat.id): True, (self.query, self.entitlement.id): False})
+
+    def test_missing_identifiers_cached_as_negative(self):
+        """ Verify products missing from the Discovery Service response are cached as not contained. """
+        self.mock_query_contains(contained=[self.course.id], absent=[])
+
+        membership = resolve_catalog_query_membership(self.site, {self.query: [self.entitlement]})
+
+        self.assertEqual(membership, {(self.query, self.entitlement.id): False})
+        cache_key = get_catalog_query_contains_cache_key(
+            self.site, self.partner.short_code, get_catalog_identifier(self.entitlement), self.query
+        )
+        self.assertEqual(django_cache.get(cache_key), 0)
+
+    def test_django_cache_hits(self):
+        """ Verify results found in the Django cache are not requested from the Discovery Service. """
+        self.mock_query_contains(contained=[self.course.id], absent=[])
+        resolve_catalog_query_membership(self.site, {self.query: [self.seat]})
+        DEFAULT_REQUEST_CACHE.clear()
+
+        with self.assertNumQueries(0):
+            membership = resolve_catalog_query_membership(self.site, {self.query: [self.seat]})
+
+        self.assertEqual(membership, {(self.query, self.seat.id): True})
+        self.assertEqual(len(self.query_contains_requests()), 1)
+
+    def test_discovery_failure(self):
+        """ Verify errors raised while contacting the Discovery Service are propagated, and nothing is cached. """
+        with self.assertRaises(Exception):
+            resolve_catalog_query_membership(self.site, {self.query: [self.seat]})
+
+        cache_key = get_catalog_query_contains_cache_key(
+            self.site, self.partner.short_code, get_catalog_identifier(self.seat), self.query
+        )
+        self.assertIsNone(django_cache.get(cache_key))
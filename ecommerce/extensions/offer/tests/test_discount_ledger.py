@@ -0,0 +1,96 @@
+
+
+import mock
+from oscar.core.loading import get_model
+from oscar.test.factories import OrderDiscountFactory, OrderFactory
+
+from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.offer import discount_ledger
+from ecommerce.extensions.offer.discount_ledger import (
+    get_offer_discount_total,
+    get_offer_user_discount_total,
+    reconcile_offer_discount_ledgers
+)
+from ecommerce.extensions.test import factories
+from ecommerce.tests.factories import UserFactory
+from ecommerce.tests.testcases import TestCase
+
+OfferDiscountLedger = get_model('offer', 'OfferDiscountLedger')
+OfferUserDiscountLedger = get_model('offer', 'OfferUserDiscountLedger')
+
+
+class OfferDiscountLedgerTests(TestCase):
+    """ Tests for the running totals of the discounts given by offers. """
+
+    def setUp(self):
+        super(OfferDiscountLedgerTests, self).setUp()
+        self.offer = factories.EnterpriseOfferFactory(partner=self.partner)
+        self.user = UserFactory()
+
+    def create_order(self, amount, status=ORDER.COMPLETE, user=None):
+        order = OrderFactory(user=user or self.user, status=status)
+        OrderDiscountFactory(order=order, offer_id=self.offer.id, amount=amount)
+        return order
+
+    def assert_totals(self, offer_total, user_total):
+        self.assertEqual(get_offer_discount_total(self.offer), offer_total)
+        self.assertEqual(get_offer_user_discount_total(self.offer, self.user), user_total)
+
+    def test_initialized_from_completed_orders(self):
+        """ Verify the ledgers are initialized from the discounts of the completed orders. """
+        self.create_order(10)
+        self.create_order(20)
+        self.create_order(40, status=ORDER.OPEN)
+        self.create_order(80, user=UserFactory())
+
+        self.assert_totals(110, 30)
+        self.assertEqual(OfferDiscountLedger.objects.get(offer=self.offer).amount, 110)
+        self.assertEqual(OfferUserDiscountLedger.objects.get(offer=self.offer, user=self.user).amount, 30)
+
+        with self.assertNumQueries(2):
+            self.assert_totals(110, 30)
+
+    def test_completed_orders_recorded(self):
+        """ Verify the discounts of orders are added to the initialized ledgers once the orders are completed. """
+        self.create_order(10)
+        self.assert_totals(10, 10)
+
+        order = self.create_order(20, status=ORDER.OPEN)
+        self.assert_totals(10, 10)
+
+        order.set_status(ORDER.COMPLETE)
+        self.assert_totals(30, 30)
+
+    def test_order_completed_while_initializing(self):
+        """ Verify the discounts of an order completed while a ledger is initialized are included in the ledger. """
+        order = self.create_order(20, status=ORDER.OPEN)
+        sum_completed_order_discounts = discount_ledger._sum_completed_order_discounts  # pylint: disable=protected-access
+
+        def complete_order(offer_id, user_id=None):
+            order.set_status(ORDER.COMPLETE)
+            return sum_completed_order_discounts(offer_id, user_id)
+
+        with mock.patch.object(discount_ledger, '_sum_completed_order_discounts', side_effect=complete_order):
+            self.assertEqual(get_offer_discount_total(self.offer), 20)
+        self.assertEqual(OfferDiscountLedger.objects.get(offer=self.offer).amount, 20)
+
+    def test_uninitialized_ledgers_not_created(self):
+        """ Verify completed orders do not create the ledgers of their offers. """
+        self.create_order(10, status=ORDER.OPEN).set_status(ORDER.COMPLETE)
+        self.assertFalse(OfferDiscountLedger.objects.exists())
+        self.assertFalse(OfferUserDiscountLedger.objects.exists())
+
+    def test_reconcile(self):
+        """ Verify the ledgers which have drifted are corrected. """
+        self.create_order(10)
+        self.assert_totals(10, 10)
+        other_user = UserFactory()
+        get_offer_user_discount_total(self.offer, other_user)
+
+        OfferDiscountLedger.objects.update(amount=50)
+        OfferUserDiscountLedger.objects.filter(user=self.user).update(amount=50)
+
+        self.assertEqual(reconcile_offer_discount_ledgers(), 2)
+        self.assert_totals(10, 10)
+        self.assertEqual(get_offer_user_discount_total(self.offer, other_user), 0)
+        self.assertEqual(reconcile_offer_discount_ledgers([self.offer.id]), 0)
@@ -282,6 +282,9 @@ def update_assignments_for_multi_use_per_customer(voucher):
     Update `OfferAssignment` records for MULTI_USE_PER_CUSTOMER coupon type when max_uses changes for a coupon.
     """
     if voucher.usage == voucher.MULTI_USE_PER_CUSTOMER:
+        from ecommerce.extensions.voucher.usage_summary import (  # pylint: disable=import-outside-toplevel
+            refresh_voucher_usage_summaries
+        )
         OfferAssignment = get_model('offer', 'OfferAssignment')
 
         offer = voucher.enterprise_offer
@@ -298,3 +301,4 @@ def update_assignments_for_multi_use_per_customer(voucher):
                 for __ in range(offer_assignments_available)
             ]
             OfferAssignment.objects.bulk_create(assignments)
+            refresh_voucher_usage_summaries([voucher.code])
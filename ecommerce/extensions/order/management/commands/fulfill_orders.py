@@ -0,0 +1,73 @@
+"""
+This command retries the fulfillment of orders with status Fulfillment Error.
+"""
+
+
+import logging
+from textwrap import dedent
+
+from django.core.management import BaseCommand
+from oscar.core.loading import get_class, get_model
+
+from ecommerce.extensions.fulfillment.signals import SHIPPING_EVENT_NAME
+from ecommerce.extensions.fulfillment.status import ORDER
+
+logger = logging.getLogger(__name__)
+
+EventHandler = get_class('order.processing', 'EventHandler')
+Order = get_model('order', 'Order')
+ShippingEventType = get_model('order', 'ShippingEventType')
+
+
+class Command(BaseCommand):
+    """
+    Retry the fulfillment of orders with status Fulfillment Error.
+
+    The orders are fulfilled in batches, so that the seat lines of all orders of a batch are enrolled with a single
+    batch of Enrollment API requests.
+
+    Example:
+        ./manage.py fulfill_orders
+        ./manage.py fulfill_orders --order-numbers EDX-100001 EDX-100002 --batch-size=100
+    """
+
+    help = dedent(__doc__)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order-numbers',
+            action='store',
+            dest='order_numbers',
+            nargs='+',
+            default=None,
+            help='Numbers of the orders to fulfill. Defaults to all orders with status Fulfillment Error.',
+            type=str,
+        )
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            type=int,
+            default=50,
+            help='Number of orders to fulfill together.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        orders = Order.objects.filter(status=ORDER.FULFILLMENT_ERROR).select_related('user').order_by('id')
+        if options['order_numbers']:
+            orders = orders.filter(number__in=options['order_numbers'])
+        orders = list(orders)
+
+        shipping_event, __ = ShippingEventType.objects.get_or_create(name=SHIPPING_EVENT_NAME)
+        failed_orders = []
+        for start in range(0, len(orders), batch_size):
+            batch = orders[start:start + batch_size]
+            EventHandler().handle_shipping_events(batch, shipping_event)
+            failed_orders += [order.number for order in batch if order.is_fulfillable]
+
+        logger.info(
+            '[Fulfill Orders] Fulfillment of [%d] orders completed. Failed orders: %s',
+            len(orders),
+            ', '.join(failed_orders),
+        )
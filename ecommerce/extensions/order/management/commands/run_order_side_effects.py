@@ -0,0 +1,55 @@
+"""
+This command runs the side effects of placed orders which have not been run in the background.
+"""
+
+
+import datetime
+import logging
+from textwrap import dedent
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.checkout.side_effects import run_side_effect
+
+logger = logging.getLogger(__name__)
+
+OrderSideEffect = get_model('order', 'OrderSideEffect')
+
+
+class Command(BaseCommand):
+    """
+    Run the side effects of placed orders, e.g. their tracking events and purchase emails, which are still pending
+    POST_CHECKOUT_SIDE_EFFECT_RETRY_DELAY seconds after they were queued or last attempted, because they failed, did
+    not fit in the queue of their process, or their process was stopped before running them.
+
+    Example:
+        ./manage.py run_order_side_effects
+    """
+
+    help = dedent(__doc__)
+
+    def handle(self, *args, **options):
+        cutoff = now() - datetime.timedelta(seconds=settings.POST_CHECKOUT_SIDE_EFFECT_RETRY_DELAY)
+
+        # Side effects whose process was stopped while running them are run again.
+        OrderSideEffect.objects.filter(status=OrderSideEffect.RUNNING, modified__lt=cutoff).update(
+            status=OrderSideEffect.PENDING
+        )
+
+        side_effect_ids = list(
+            OrderSideEffect.objects.filter(status=OrderSideEffect.PENDING, modified__lt=cutoff).order_by(
+                'id'
+            ).values_list('id', flat=True)
+        )
+        failed_side_effect_ids = [
+            side_effect_id for side_effect_id in side_effect_ids if not run_side_effect(side_effect_id)
+        ]
+
+        logger.info(
+            '[Run Order Side Effects] Ran [%d] side effects. Failed side effects: %s',
+            len(side_effect_ids),
+            ', '.join(str(side_effect_id) for side_effect_id in failed_side_effect_ids),
+        )
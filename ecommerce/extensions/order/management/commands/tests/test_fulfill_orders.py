@@ -0,0 +1,52 @@
+from django.core.management import call_command
+from django.test import override_settings
+from testfixtures import LogCapture
+
+from ecommerce.extensions.fulfillment.status import LINE, ORDER
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.testcases import TestCase
+
+LOGGER_NAME = 'ecommerce.extensions.order.management.commands.fulfill_orders'
+
+
+@override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule', ])
+class FulfillOrdersTests(TestCase):
+    """
+    Tests for `fulfill_orders` command.
+    """
+
+    def setUp(self):
+        super(FulfillOrdersTests, self).setUp()
+        user = self.create_user()
+        self.orders = [create_order(site=self.site, user=user, status=ORDER.FULFILLMENT_ERROR) for __ in range(3)]
+
+    def assert_order_fulfilled(self, order):
+        order.refresh_from_db()
+        self.assertEqual(order.status, ORDER.COMPLETE)
+        self.assertEqual(set(order.lines.values_list('status', flat=True)), {LINE.COMPLETE})
+
+    def test_fulfill_orders(self):
+        """ Verify all orders with status Fulfillment Error are fulfilled, in batches. """
+        with LogCapture(LOGGER_NAME) as log_capture:
+            call_command('fulfill_orders', '--batch-size=2')
+
+            log_capture.check_present(
+                (
+                    LOGGER_NAME,
+                    'INFO',
+                    '[Fulfill Orders] Fulfillment of [3] orders completed. Failed orders: '
+                )
+            )
+
+        for order in self.orders:
+            self.assert_order_fulfilled(order)
+            self.assertEqual(order.shipping_events.count(), 1)
+
+    def test_fulfill_orders_with_order_numbers(self):
+        """ Verify only the given orders are fulfilled. """
+        call_command('fulfill_orders', '--order-numbers', self.orders[0].number)
+
+        self.assert_order_fulfilled(self.orders[0])
+        for order in self.orders[1:]:
+            order.refresh_from_db()
+            self.assertEqual(order.status, ORDER.FULFILLMENT_ERROR)
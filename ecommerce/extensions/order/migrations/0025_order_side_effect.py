@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-19 00:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+import jsonfield.encoder
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0024_markordersstatuscompleteconfig'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSideEffect',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('name', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Complete', 'Complete'), ('Failed', 'Failed')], db_index=True, default='Pending', max_length=32)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('kwargs', jsonfield.fields.JSONField(default=dict, dump_kwargs={'cls': jsonfield.encoder.JSONEncoder, 'separators': (',', ':')}, load_kwargs={})),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='side_effects', to='order.Order')),
+            ],
+            options={
+                'unique_together': {('order', 'name')},
+            },
+        ),
+    ]
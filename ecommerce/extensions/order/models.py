@@ -5,6 +5,8 @@ from django.core.validators import FileExtensionValidator
 from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
+from django_extensions.db.models import TimeStampedModel
+from jsonfield import JSONField
 from oscar.apps.order.abstract_models import AbstractLine, AbstractOrder, AbstractOrderDiscount, AbstractPaymentEvent
 from simple_history.models import HistoricalRecords
 
@@ -56,6 +58,34 @@ class MarkOrdersStatusCompleteConfig(ConfigurationModel):
     )
 
 
+class OrderSideEffect(TimeStampedModel):
+    """
+    Side effect of a placed order, e.g. its tracking event or purchase email, run in the background once the order has
+    been committed. See ecommerce.extensions.checkout.side_effects.
+
+    .. no_pii:
+    """
+    PENDING = 'Pending'
+    RUNNING = 'Running'
+    COMPLETE = 'Complete'
+    FAILED = 'Failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (COMPLETE, _('Complete')),
+        (FAILED, _('Failed')),
+    )
+
+    order = models.ForeignKey('order.Order', related_name='side_effects', on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    status = models.CharField(max_length=32, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    kwargs = JSONField(default=dict)
+
+    class Meta:
+        unique_together = ('order', 'name')
+
+
 # If two models with the same name are declared within an app, Django will only use the first one.
 # noinspection PyUnresolvedReferences
 from oscar.apps.order.models import *  # noqa isort:skip pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-position,wrong-import-order,ungrouped-imports
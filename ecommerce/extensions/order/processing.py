@@ -29,6 +29,31 @@ class EventHandler(processing.EventHandler):
 
         return order
 
+    def handle_shipping_events(self, orders, event_type, **kwargs):
+        """
+        Fulfills many orders together, and creates a ShippingEvent for each of them.
+
+        All lines of each order are fulfilled, as done by the post_checkout receiver for a single order.
+        """
+        orders_and_lines = []
+        for order in orders:
+            lines = order.lines.all()
+            line_quantities = [line.quantity for line in lines]
+            self.validate_shipping_event(order, event_type, lines, line_quantities, **kwargs)
+            orders_and_lines.append((order, lines, line_quantities))
+
+        email_opt_in = kwargs.get('email_opt_in', False)
+        fulfilled_orders = fulfillment_api.fulfill_orders(
+            [(order, lines) for order, lines, __ in orders_and_lines], email_opt_in=email_opt_in
+        )
+
+        for order, __, line_quantities in orders_and_lines:
+            if order in fulfilled_orders:
+                # Reload the lines, to pick up the statuses set by fulfillment.
+                self.create_shipping_event(order, event_type, order.lines.all(), line_quantities, **kwargs)
+
+        return fulfilled_orders
+
     def create_shipping_event(self, order, event_type, lines, line_quantities, **kwargs):
         """
         Creates a ShippingEvent for the order.
@@ -2,9 +2,11 @@
 
 import ddt
 import mock
+from django.test import override_settings
 from oscar.core.loading import get_model
 from oscar.test import factories
 
+from ecommerce.extensions.fulfillment import api as fulfillment_api
 from ecommerce.extensions.fulfillment.signals import SHIPPING_EVENT_NAME
 from ecommerce.extensions.fulfillment.status import LINE
 from ecommerce.extensions.order.processing import EventHandler
@@ -132,3 +134,20 @@ class EventHandlerTests(TestCase):
                 email_opt_in=expected_opt_in,
             )
             mock_fulfill.assert_called_once_with(order, lines, email_opt_in=expected_opt_in)
+
+    @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule', ])
+    def test_handle_shipping_events(self):
+        """
+        Verify the orders are fulfilled together, and a ShippingEvent is created for each of them.
+        """
+        orders = [self.order, create_order()]
+
+        fulfill_orders = fulfillment_api.fulfill_orders
+        with mock.patch.object(fulfillment_api, 'fulfill_orders', wraps=fulfill_orders) as mock_fulfill:
+            fulfilled_orders = EventHandler().handle_shipping_events(orders, self.shipping_event_type)
+
+        mock_fulfill.assert_called_once()
+        self.assertEqual(fulfilled_orders, orders)
+        for order in orders:
+            self.assertEqual(order.shipping_events.count(), 1)
+            self.assertEqual(order.shipping_events.first().lines.count(), 1)
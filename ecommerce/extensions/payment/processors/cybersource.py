@@ -5,19 +5,25 @@ import base64
 import datetime
 import json
 import logging
+import threading
 import uuid
 from decimal import Decimal
 
+import requests
 import six
+import waffle
 from django.conf import settings
 from django.urls import reverse
 from oscar.apps.payment.exceptions import GatewayError, TransactionDeclined, UserCancelled
 from oscar.core.loading import get_class, get_model
+from requests.adapters import HTTPAdapter
 from zeep import Client
+from zeep.cache import SqliteCache
 from zeep.helpers import serialize_object
+from zeep.transports import Transport
 from zeep.wsse import UsernameToken
 
-from ecommerce.core.constants import ISO_8601_FORMAT
+from ecommerce.core.constants import CYBERSOURCE_SHARED_SOAP_CLIENT_SWITCH, ISO_8601_FORMAT
 from ecommerce.core.url_utils import get_ecommerce_url
 from ecommerce.extensions.checkout.utils import get_receipt_page_url
 from ecommerce.extensions.payment.constants import APPLE_PAY_CYBERSOURCE_CARD_TYPE_MAP, CYBERSOURCE_CARD_TYPE_MAP
@@ -46,6 +52,43 @@ Order = get_model('order', 'Order')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 
+_soap_clients = {}
+_soap_clients_lock = threading.Lock()
+
+
+def _create_soap_client(soap_api_url, merchant_id, transaction_key):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=settings.API_CLIENT_POOL_MAXSIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    cache = SqliteCache(path=settings.CYBERSOURCE_WSDL_CACHE_PATH, timeout=settings.CYBERSOURCE_WSDL_CACHE_TIMEOUT)
+    transport = Transport(cache=cache, session=session)
+    return Client(soap_api_url, wsse=UsernameToken(merchant_id, transaction_key), transport=transport)
+
+
+def get_soap_client(soap_api_url, merchant_id, transaction_key):
+    """
+    Returns the SOAP client of the CyberSource account shared by the requests of the process.
+
+    The client is built once per WSDL URL and credentials, from WSDL and XSD documents cached on disk for
+    CYBERSOURCE_WSDL_CACHE_TIMEOUT seconds, and keeps its keep-alive connections to CyberSource pooled.
+    """
+    key = (soap_api_url, merchant_id, transaction_key)
+    client = _soap_clients.get(key)
+    if client is None:
+        with _soap_clients_lock:
+            client = _soap_clients.get(key)
+            if client is None:
+                client = _create_soap_client(soap_api_url, merchant_id, transaction_key)
+                _soap_clients[key] = client
+    return client
+
+
+def clear_soap_clients():
+    """ Discards the shared SOAP clients. """
+    with _soap_clients_lock:
+        _soap_clients.clear()
+
 
 class Cybersource(ApplePayMixin, BaseClientSidePaymentProcessor):
     """
@@ -389,9 +432,14 @@ class Cybersource(ApplePayMixin, BaseClientSidePaymentProcessor):
         use_sop_profile = req_profile_id == self.sop_profile_id
         return response and (self._generate_signature(response, use_sop_profile) == response.get('signature'))
 
+    def _get_soap_client(self):
+        if waffle.switch_is_active(CYBERSOURCE_SHARED_SOAP_CLIENT_SWITCH):
+            return get_soap_client(self.soap_api_url, self.merchant_id, self.transaction_key)
+        return Client(self.soap_api_url, wsse=UsernameToken(self.merchant_id, self.transaction_key))
+
     def issue_credit(self, order_number, basket, reference_number, amount, currency):
         try:
-            client = Client(self.soap_api_url, wsse=UsernameToken(self.merchant_id, self.transaction_key))
+            client = self._get_soap_client()
 
             credit_service = {
                 'captureRequestID': reference_number,
@@ -445,7 +493,7 @@ class Cybersource(ApplePayMixin, BaseClientSidePaymentProcessor):
             GatewayError
         """
         try:
-            client = Client(self.soap_api_url, wsse=UsernameToken(self.merchant_id, self.transaction_key))
+            client = self._get_soap_client()
             card_type = APPLE_PAY_CYBERSOURCE_CARD_TYPE_MAP[payment_token['paymentMethod']['network'].lower()]
             bill_to = {
                 'firstName': billing_address.first_name,
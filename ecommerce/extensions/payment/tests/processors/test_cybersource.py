@@ -3,6 +3,8 @@
 
 
 import copy
+import os
+import tempfile
 from uuid import UUID
 
 import ddt
@@ -16,7 +18,9 @@ from freezegun import freeze_time
 from oscar.apps.payment.exceptions import GatewayError, TransactionDeclined, UserCancelled
 from oscar.core.loading import get_model
 from oscar.test import factories
+from waffle.testutils import override_switch
 
+from ecommerce.core.constants import CYBERSOURCE_SHARED_SOAP_CLIENT_SWITCH
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.basket.tests.test_utils import TEST_BUNDLE_ID
 from ecommerce.extensions.order.models import Order
@@ -30,7 +34,7 @@ from ecommerce.extensions.payment.exceptions import (
     RedundantPaymentNotificationError
 )
 from ecommerce.extensions.payment.models import PaymentProcessorResponse
-from ecommerce.extensions.payment.processors.cybersource import Cybersource
+from ecommerce.extensions.payment.processors.cybersource import Cybersource, clear_soap_clients, get_soap_client
 from ecommerce.extensions.payment.tests.mixins import CybersourceMixin
 from ecommerce.extensions.payment.tests.processors.mixins import PaymentProcessorTestCaseMixin
 from ecommerce.extensions.test.factories import create_basket
@@ -326,6 +330,46 @@ class CybersourceTests(CybersourceMixin, PaymentProcessorTestCaseMixin, TestCase
         self.assert_processor_response_recorded(self.processor.NAME, transaction_id, response, basket)
         self.assertEqual(source.amount_refunded, 0)
 
+    @responses.activate
+    @override_switch(CYBERSOURCE_SHARED_SOAP_CLIENT_SWITCH, active=True)
+    def test_issue_credit_with_shared_soap_client(self):
+        """ Verify credits share the SOAP client, built once from the WSDL cached on disk. """
+        self.addCleanup(clear_soap_clients)
+        clear_soap_clients()
+        cache_dir = tempfile.mkdtemp()
+        self.mock_cybersource_wsdl()
+
+        transaction_id = 'request-1234'
+        with override_settings(CYBERSOURCE_WSDL_CACHE_PATH=os.path.join(cache_dir, 'wsdl.db')):
+            for __ in range(2):
+                refund = self.create_refund(self.processor_name)
+                order = refund.order
+                source = order.sources.first()
+                amount = refund.total_credit_excl_tax
+                self.mock_refund_response(amount=amount, currency=refund.currency, transaction_id=transaction_id,
+                                          basket_id=order.basket.id)
+                actual = self.processor.issue_credit(order.number, order.basket, source.reference, amount,
+                                                     refund.currency)
+                self.assertEqual(actual, transaction_id)
+
+        wsdl_requests = [call for call in responses.calls if call.request.method == 'GET']
+        self.assertEqual(len(wsdl_requests), 2)
+
+    def test_get_soap_client(self):
+        """ Verify SOAP clients are built once per WSDL URL and credentials. """
+        self.addCleanup(clear_soap_clients)
+        clear_soap_clients()
+        create_path = 'ecommerce.extensions.payment.processors.cybersource._create_soap_client'
+
+        with mock.patch(create_path, side_effect=lambda *args: mock.Mock()) as mock_create:
+            client = get_soap_client('https://example.com/wsdl', 'merchant', 'key')
+            self.assertIs(get_soap_client('https://example.com/wsdl', 'merchant', 'key'), client)
+            self.assertIsNot(get_soap_client('https://example.com/wsdl', 'other-merchant', 'key'), client)
+            self.assertEqual(mock_create.call_count, 2)
+
+            clear_soap_clients()
+            self.assertIsNot(get_soap_client('https://example.com/wsdl', 'merchant', 'key'), client)
+
     def test_client_side_payment_url(self):
         """ Verify the property returns the Silent Order POST URL. """
         processor_config = settings.PAYMENT_PROCESSOR_CONFIG[self.partner.name.lower()][self.processor.NAME.lower()]
@@ -13,9 +13,10 @@ from oscar.test import factories
 from requests.exceptions import HTTPError, Timeout
 from six.moves.urllib.parse import urlencode
 
-from ecommerce.core.models import User
+from ecommerce.core.models import SiteConfiguration, User
+from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.payment.models import SDNCheckFailure
-from ecommerce.extensions.payment.utils import SDNClient, clean_field_value, middle_truncate
+from ecommerce.extensions.payment.utils import SDNClient, clean_field_value, embargo_check, middle_truncate
 from ecommerce.tests.testcases import TestCase
 
 
@@ -126,6 +127,32 @@ class SDNCheckTests(TestCase):
         response = self.sdn_validator.search(self.name, self.city, self.country)
         self.assertEqual(response, sdn_response)
 
+    @httpretty.activate
+    def test_sdn_check_cached(self):
+        """ Verify successful searches are cached per normalized name, city and country. """
+        sdn_response = {'total': 0}
+        self.mock_sdn_response(json.dumps(sdn_response))
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), sdn_response)
+        self.assertEqual(
+            self.sdn_validator.search('  dr. EVIL ', self.city.upper(), self.country.lower()), sdn_response
+        )
+        self.assertEqual(len(httpretty.latest_requests()), 1)
+
+        with override_settings(SDN_CHECK_CACHE_TIMEOUT=0):
+            self.sdn_validator.search(self.name, self.city, self.country)
+        self.assertEqual(len(httpretty.latest_requests()), 2)
+
+    @httpretty.activate
+    def test_sdn_check_error_not_cached(self):
+        """ Verify failed searches are not cached, so that the next search calls the SDN API again. """
+        self.mock_sdn_response(json.dumps({'total': 1}), status_code=500)
+        with self.assertRaises(HTTPError):
+            self.sdn_validator.search(self.name, self.city, self.country)
+
+        sdn_response = {'total': 1}
+        self.mock_sdn_response(json.dumps(sdn_response))
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), sdn_response)
+
     def test_deactivate_user(self):
         """ Verify an SDN failure is logged. """
         response = {'description': 'Bad dude.'}
@@ -189,3 +216,36 @@ class EmbargoCheckTests(TestCase):
         self.mock_embargo_response(json.dumps(embargo_response))
         response = self.site.siteconfiguration.embargo_api_client.course_access.get(**self.params)
         self.assertEqual(response, embargo_response)
+
+    def test_embargo_check_cached(self):
+        """ Verify answers are cached, and only courses which have not been found accessible are checked. """
+        user = self.create_user()
+        seats = [
+            CourseFactory(id='edX/Embargo/{}'.format(index), partner=self.partner).create_or_update_seat(
+                'verified', True, 10
+            ) for index in range(3)
+        ]
+        course_ids = [seat.course.id for seat in seats]
+
+        with mock.patch.object(SiteConfiguration, 'embargo_api_client', new_callable=mock.PropertyMock) as client:
+            course_access = client.return_value.course_access.get
+            course_access.return_value = {'access': True}
+            self.assertTrue(embargo_check(user, self.site, seats[:2]))
+            self.assertTrue(embargo_check(user, self.site, seats[:2]))
+            course_access.assert_called_once_with(user=user, ip_address=None, course_ids=course_ids[:2])
+
+            course_access.reset_mock()
+            course_access.return_value = {'access': False}
+            self.assertFalse(embargo_check(user, self.site, seats))
+            self.assertFalse(embargo_check(user, self.site, seats[1:]))
+            course_access.assert_called_once_with(user=user, ip_address=None, course_ids=course_ids[2:])
+
+            with override_settings(EMBARGO_CHECK_CACHE_TIMEOUT=0):
+                self.assertFalse(embargo_check(user, self.site, seats[:1]))
+            self.assertEqual(course_access.call_count, 2)
+
+            # Failed checks are allowed, and not cached.
+            course_access.side_effect = Timeout
+            with override_settings(EMBARGO_CHECK_CACHE_TIMEOUT=0):
+                self.assertTrue(embargo_check(user, self.site, seats[2:]))
+            self.assertFalse(embargo_check(user, self.site, seats[2:]))
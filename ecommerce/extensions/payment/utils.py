@@ -2,6 +2,7 @@
 import copy
 import logging
 import re
+import threading
 
 # Changes part of REV-1209 - see https://github.com/edx/ecommerce/pull/3020
 import crum
@@ -12,11 +13,13 @@ import waffle
 from django.conf import settings
 from django.contrib.auth import logout
 from django.utils.translation import ugettext_lazy as _
+from edx_django_utils.cache import TieredCache
 from oscar.core.loading import get_model
 from requests.exceptions import HTTPError, Timeout
 from six.moves.urllib.parse import urlencode
 
 from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
+from ecommerce.core.utils import get_cache_key
 from ecommerce.extensions.analytics.utils import parse_tracking_context
 from ecommerce.extensions.payment.models import SDNCheckFailure
 
@@ -25,6 +28,9 @@ Basket = get_model('basket', 'Basket')
 BasketAttribute = get_model('basket', 'BasketAttribute')
 BasketAttributeType = get_model('basket', 'BasketAttributeType')
 
+_sdn_session = None
+_sdn_session_lock = threading.Lock()
+
 
 def get_basket_program_uuid(basket):
     """
@@ -111,9 +117,29 @@ def clean_field_value(value):
     return re.sub(r'[\^:"\']', '', value)
 
 
+def _get_embargo_cache_key(site, user, ip, course_ids):
+    return get_cache_key(
+        resource='embargo_course_access',
+        site_domain=site.domain,
+        username=user.username,
+        ip_address=ip,
+        course_ids=','.join(sorted(course_ids)),
+    )
+
+
+def _is_embargo_access_cached(site, user, ip, course_id):
+    cached_response = TieredCache.get_cached_response(_get_embargo_cache_key(site, user, ip, [course_id]))
+    return cached_response.is_found and cached_response.value
+
+
 def embargo_check(user, site, products):
     """ Checks if the user has access to purchase products by calling the LMS embargo API.
 
+    Answers of the embargo API are cached for EMBARGO_CHECK_CACHE_TIMEOUT seconds per user, IP address and
+    courses. Courses found accessible are also cached one by one, so that a later check of any of them, alone or
+    with other accessible courses, does not call the API again. Only the courses which have not been found
+    accessible are sent to the API, in a single request.
+
     Args:
         request : The current request
         products (list): A list of products to check access against
@@ -129,6 +155,17 @@ def embargo_check(user, site, products):
         if product.get_product_class().name == SEAT_PRODUCT_CLASS_NAME:
             courses.append(product.course.id)
 
+    cache_timeout = settings.EMBARGO_CHECK_CACHE_TIMEOUT
+    if courses and cache_timeout:
+        courses = [
+            course_id for course_id in courses
+            if not _is_embargo_access_cached(site, user, ip, course_id)
+        ]
+        if courses:
+            cached_response = TieredCache.get_cached_response(_get_embargo_cache_key(site, user, ip, courses))
+            if cached_response.is_found:
+                return cached_response.value
+
     if courses:
         params = {
             'user': user,
@@ -138,10 +175,19 @@ def embargo_check(user, site, products):
 
         try:
             response = site.siteconfiguration.embargo_api_client.course_access.get(**params)
-            return response.get('access', True)
+            access = response.get('access', True)
         except:  # pylint: disable=bare-except
             # We are going to allow purchase if the API is un-reachable.
             pass
+        else:
+            if cache_timeout:
+                TieredCache.set_all_tiers(_get_embargo_cache_key(site, user, ip, courses), access, cache_timeout)
+                if access:
+                    for course_id in courses:
+                        TieredCache.set_all_tiers(
+                            _get_embargo_cache_key(site, user, ip, [course_id]), True, cache_timeout
+                        )
+            return access
 
     return True
 
@@ -181,6 +227,29 @@ def checkSDN(request, name, city, country):
     return hit_count
 
 
+def get_sdn_session():
+    """ Returns the process-wide session used to call the SDN API.
+
+    The session keeps connections to the SDN API alive, so that checkouts do not pay for a new TCP and TLS
+    handshake on each check.
+    """
+    global _sdn_session  # pylint: disable=global-statement
+    if _sdn_session is None:
+        with _sdn_session_lock:
+            if _sdn_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=settings.API_CLIENT_POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sdn_session = session
+    return _sdn_session
+
+
+def normalize_sdn_search_value(value):
+    """ Returns the given search value without case and whitespace differences, e.g. ' Dr.  Evil' -> 'dr. evil'. """
+    return ' '.join(six.text_type(value).split()).casefold()
+
+
 class SDNClient:
     """A utility class that handles SDN related operations."""
     def __init__(self, api_url, api_key, sdn_list):
@@ -188,6 +257,16 @@ class SDNClient:
         self.api_key = api_key
         self.sdn_list = sdn_list
 
+    def _get_search_cache_key(self, name, city, country):
+        return get_cache_key(
+            resource='sdn_search',
+            api_url=self.api_url,
+            sdn_list=self.sdn_list,
+            name=normalize_sdn_search_value(name),
+            city=normalize_sdn_search_value(city),
+            country=normalize_sdn_search_value(country),
+        )
+
     # Changes part of REV-1209 - see https://github.com/edx/ecommerce/pull/3020
     def make_testing_sdn_call(self, auth_header, first_check_response, params_dict):  # pragma: no cover
         """
@@ -207,7 +286,7 @@ class SDNClient:
                     api_url=self.api_url,
                     params=second_check_params
                 )
-                second_check_response = requests.get(
+                second_check_response = get_sdn_session().get(
                     sdn_check_url,
                     headers=auth_header,
                     timeout=settings.SDN_CHECK_REQUEST_TIMEOUT
@@ -245,6 +324,9 @@ class SDNClient:
             * SDN API returns a non-200 status code response
             * user is not found on the SDN list
 
+        Successful responses are cached for SDN_CHECK_CACHE_TIMEOUT seconds, so that searches for the same
+        individual, regardless of case and whitespace, do not call the SDN API again.
+
         Args:
             name (str): Individual's full name.
             city (str): Individual's city.
@@ -252,6 +334,12 @@ class SDNClient:
         Returns:
             dict: SDN API response.
         """
+        cache_key = self._get_search_cache_key(name, city, country)
+        if settings.SDN_CHECK_CACHE_TIMEOUT:
+            cached_response = TieredCache.get_cached_response(cache_key)
+            if cached_response.is_found:
+                return cached_response.value
+
         # Changes part of REV-1209 - see https://github.com/edx/ecommerce/pull/3020
         params_dict = {
             'sources': self.sdn_list,
@@ -270,7 +358,7 @@ class SDNClient:
         auth_header = {'Authorization': 'Bearer {}'.format(self.api_key)}
 
         try:
-            response = requests.get(
+            response = get_sdn_session().get(
                 sdn_check_url,
                 headers=auth_header,
                 timeout=settings.SDN_CHECK_REQUEST_TIMEOUT
@@ -289,7 +377,10 @@ class SDNClient:
             )
             raise requests.exceptions.HTTPError('Unable to connect to SDN API')
 
-        return response.json()
+        results = response.json()
+        if settings.SDN_CHECK_CACHE_TIMEOUT:
+            TieredCache.set_all_tiers(cache_key, results, settings.SDN_CHECK_CACHE_TIMEOUT)
+        return results
 
     def deactivate_user(self, basket, name, city, country, search_results):
         """ Deactivates a user account.
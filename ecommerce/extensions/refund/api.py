@@ -1,9 +1,20 @@
 
 
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connection, transaction
 from oscar.core.loading import get_model
 
+from ecommerce.extensions.analytics.utils import audit_log
 from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.refund.status import REFUND, REFUND_LINE
+
+logger = logging.getLogger(__name__)
 
+Line = get_model('order', 'Line')
 Option = get_model('catalogue', 'Option')
 Refund = get_model('refund', 'Refund')
 RefundLine = get_model('refund', 'RefundLine')
@@ -32,9 +43,7 @@ def find_orders_associated_with_course(user, course_id):
         return []
 
     # Find all complete orders associated with the course.
-    orders = user.orders.filter(status=ORDER.COMPLETE,
-                                lines__product__attribute_values__attribute__code='course_key',
-                                lines__product__attribute_values__value_text=course_id)
+    orders = user.orders.filter(status=ORDER.COMPLETE, lines__product__course_key=course_id)
 
     return list(orders)
 
@@ -80,12 +89,150 @@ def create_refunds(orders, course_id):
 
     for order in orders:
         # Find lines associated with the course and not refunded.
-        lines = order.lines.filter(refund_lines__id__isnull=True,
-                                   product__attribute_values__attribute__code='course_key',
-                                   product__attribute_values__value_text=course_id)
+        lines = order.lines.filter(refund_lines__id__isnull=True, product__course_key=course_id)
 
         refund = Refund.create_with_lines(order, lines)
         if refund is not None:
             refunds.append(refund)
 
     return refunds
+
+
+def find_lines_to_refund_for_course(course_id):
+    """
+    Returns the lines of the completed orders of all users which are associated with the given course and have
+    not been refunded, with their orders and users, ordered by order.
+
+    Arguments:
+        course_id (str): Identifier of the course associated with the order lines
+
+    Returns:
+        QuerySet: order lines to refund
+    """
+    refunded_lines = RefundLine.objects.exclude(status=REFUND_LINE.DENIED).values('order_line_id')
+
+    return Line.objects.filter(
+        order__status=ORDER.COMPLETE,
+        product__course_key=course_id
+    ).exclude(
+        id__in=refunded_lines
+    ).select_related('order', 'order__user').order_by('order_id', 'id')
+
+
+def _create_refunds_for_batch(lines_by_order):
+    refund_status = getattr(settings, 'OSCAR_INITIAL_REFUND_STATUS', REFUND.OPEN)
+    line_status = getattr(settings, 'OSCAR_INITIAL_REFUND_LINE_STATUS', REFUND_LINE.OPEN)
+    refunds = []
+    refund_lines = []
+
+    with transaction.atomic():
+        for order, lines in lines_by_order:
+            refund = Refund.objects.create(
+                order=order,
+                user=order.user,
+                status=refund_status,
+                total_credit_excl_tax=sum(line.line_price_excl_tax for line in lines)
+            )
+            refunds.append(refund)
+            refund_lines += [
+                RefundLine(
+                    refund=refund,
+                    order_line=line,
+                    line_credit_excl_tax=line.line_price_excl_tax,
+                    quantity=line.quantity,
+                    status=line_status
+                ) for line in lines
+            ]
+
+        RefundLine.objects.bulk_create(refund_lines)
+        # Bulk creation neither sends signals nor returns primary keys on every backend, so the historical records
+        # of the refund lines are created from the rows.
+        RefundLine.history.bulk_history_create(list(RefundLine.objects.filter(refund__in=refunds)))
+
+    for refund in refunds:
+        audit_log(
+            'refund_created',
+            amount=refund.total_credit_excl_tax,
+            currency=refund.currency,
+            order_number=refund.order.number,
+            refund_id=refund.id,
+            user_id=refund.user.id
+        )
+
+    return refunds
+
+
+def create_refunds_for_course(course_id, batch_size=None):
+    """
+    Creates refunds for the unrefunded lines of all completed orders associated with the given course.
+
+    The lines are selected with a single query, and the refunds of each batch of orders are created in one
+    transaction, with their refund lines inserted in bulk. As with Refund.create_with_lines, refunds with a total
+    credit of $0 are approved upon creation.
+
+    Arguments:
+        course_id (str): Identifier of the course associated with the order lines
+        batch_size (int): Number of orders whose refunds are created in each transaction. Defaults to
+            settings.REFUND_BATCH_SIZE.
+
+    Returns:
+        list: refunds created
+    """
+    batch_size = batch_size or settings.REFUND_BATCH_SIZE
+    refunds = []
+    batch = []
+
+    for __, lines in groupby(find_lines_to_refund_for_course(course_id).iterator(), key=lambda line: line.order_id):
+        lines = list(lines)
+        batch.append((lines[0].order, lines))
+        if len(batch) == batch_size:
+            refunds += _create_refunds_for_batch(batch)
+            batch = []
+
+    if batch:
+        refunds += _create_refunds_for_batch(batch)
+
+    for refund in refunds:
+        if refund.total_credit_excl_tax == 0:
+            refund.approve(notify_purchaser=False)
+
+    return refunds
+
+
+def approve_refunds(refunds, revoke_fulfillment=True, max_workers=None):
+    """
+    Approves the given refunds, issuing their credits and revoking their fulfillment concurrently.
+
+    Each refund is approved on its own, by one of at most max_workers threads, and its status records how far its
+    approval went, so that refunds which failed can be approved again later. Refunds are approved one after another
+    if max_workers is 1.
+
+    Arguments:
+        refunds (list): refunds to approve
+        revoke_fulfillment (bool): Whether the fulfillment of the refunded lines should be revoked
+        max_workers (int): Maximum number of refunds approved at the same time. Defaults to
+            settings.REFUND_MAX_WORKERS.
+
+    Returns:
+        dict: result of the approval of each refund, keyed by refund ID
+    """
+    def approve(refund):
+        try:
+            return refund.id, refund.approve(revoke_fulfillment=revoke_fulfillment)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Failed to approve Refund [%d].', refund.id)
+            return refund.id, False
+
+    def approve_in_worker(refund):
+        try:
+            return approve(refund)
+        finally:
+            # Worker threads open their own database connections, which would otherwise outlive them.
+            connection.close()
+
+    max_workers = min(max_workers or settings.REFUND_MAX_WORKERS, len(refunds))
+    if max_workers <= 1:
+        return dict(approve(refund) for refund in refunds)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(executor.map(approve_in_worker, refunds))
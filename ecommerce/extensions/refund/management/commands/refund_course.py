@@ -0,0 +1,76 @@
+"""
+This command creates, and optionally approves, refunds for all orders associated with a course.
+"""
+
+
+import logging
+from collections import Counter
+
+from django.core.management import BaseCommand
+
+from ecommerce.extensions.refund.api import approve_refunds, create_refunds_for_course
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Creates refunds for the unrefunded lines of all completed orders associated with a course, for instance when a
+    course run is cancelled, and approves them if requested.
+
+    Example:
+
+        ./manage.py refund_course --course-id course-v1:edX+DemoX+Demo_Course --approve
+    """
+
+    help = 'Create, and optionally approve, refunds for all orders associated with a course.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course-id',
+            dest='course_id',
+            required=True,
+            help='Identifier of the course whose orders are refunded.',
+            type=str,
+        )
+        parser.add_argument(
+            '--approve',
+            action='store_true',
+            dest='approve',
+            default=False,
+            help='Approve the refunds once created, issuing credits and revoking fulfillment.',
+        )
+        parser.add_argument(
+            '--payment-only',
+            action='store_true',
+            dest='payment_only',
+            default=False,
+            help='Issue credits for the approved refunds without revoking fulfillment.',
+        )
+        parser.add_argument(
+            '--workers',
+            dest='workers',
+            default=None,
+            help='Maximum number of refunds approved at the same time. Defaults to REFUND_MAX_WORKERS.',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        course_id = options['course_id']
+        refunds = create_refunds_for_course(course_id)
+        logger.info('[Course Refund] Created %d refunds for course [%s].', len(refunds), course_id)
+
+        if not options['approve']:
+            return
+
+        results = approve_refunds(
+            refunds, revoke_fulfillment=not options['payment_only'], max_workers=options['workers']
+        )
+        statuses = Counter(refund.status for refund in refunds)
+        failed = sorted(refund_id for refund_id, result in results.items() if not result)
+        logger.info(
+            '[Course Refund] Approved %d of %d refunds for course [%s]. Statuses: %s',
+            len(results) - len(failed), len(results), course_id, dict(statuses)
+        )
+        if failed:
+            logger.error('[Course Refund] Failed to approve refunds: %s', failed)
@@ -0,0 +1,47 @@
+from django.core.management import call_command
+from mock import patch
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.refund.status import REFUND
+from ecommerce.extensions.refund.tests.mixins import RefundTestMixin
+from ecommerce.tests.factories import UserFactory
+from ecommerce.tests.testcases import TestCase
+
+LOGGER_NAME = 'ecommerce.extensions.refund.management.commands.refund_course'
+Refund = get_model('refund', 'Refund')
+
+
+class RefundCourseTests(RefundTestMixin, TestCase):
+    """Tests for refund_course management command."""
+
+    def setUp(self):
+        super(RefundCourseTests, self).setUp()
+        self.user = UserFactory()
+        self.orders = [self.create_order(), self.create_order(user=UserFactory())]
+
+    def test_create_refunds(self):
+        """ Verify refunds are created, and left open, for the orders of the course. """
+        call_command('refund_course', '--course-id', self.course.id)
+        self.assertEqual(
+            list(Refund.objects.order_by('order_id').values_list('order_id', 'status')),
+            [(order.id, REFUND.OPEN) for order in self.orders]
+        )
+
+    def test_approve(self):
+        """ Verify the refunds are approved, and the refunds which could not be are logged. """
+        def approve(refund, revoke_fulfillment=True):
+            self.assertFalse(revoke_fulfillment)
+            refund.status = REFUND.COMPLETE if refund.order == self.orders[0] else REFUND.PAYMENT_REFUND_ERROR
+            return refund.status == REFUND.COMPLETE
+
+        with patch.object(Refund, 'approve', side_effect=approve, autospec=True):
+            with patch('{}.logger'.format(LOGGER_NAME)) as mock_logger:
+                call_command('refund_course', '--course-id', self.course.id, '--approve', '--payment-only',
+                             '--workers', '1')
+
+        failed_refund = Refund.objects.get(order=self.orders[1])
+        mock_logger.info.assert_called_with(
+            '[Course Refund] Approved %d of %d refunds for course [%s]. Statuses: %s',
+            1, 2, self.course.id, {REFUND.COMPLETE: 1, REFUND.PAYMENT_REFUND_ERROR: 1}
+        )
+        mock_logger.error.assert_called_once_with('[Course Refund] Failed to approve refunds: %s', [failed_refund.id])
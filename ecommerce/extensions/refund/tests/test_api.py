@@ -1,11 +1,19 @@
 
 
 import ddt
+import mock
 from django.test import override_settings
 from oscar.core.loading import get_model
 
 from ecommerce.extensions.fulfillment.status import ORDER
-from ecommerce.extensions.refund.api import create_refunds, find_orders_associated_with_course
+from ecommerce.extensions.refund.api import (
+    approve_refunds,
+    create_refunds,
+    create_refunds_for_course,
+    find_lines_to_refund_for_course,
+    find_orders_associated_with_course
+)
+from ecommerce.extensions.refund.status import REFUND, REFUND_LINE
 from ecommerce.extensions.refund.tests.factories import RefundLineFactory
 from ecommerce.extensions.refund.tests.mixins import RefundTestMixin
 from ecommerce.tests.factories import UserFactory
@@ -14,6 +22,7 @@ from ecommerce.tests.testcases import TestCase
 ProductAttribute = get_model("catalogue", "ProductAttribute")
 ProductClass = get_model("catalogue", "ProductClass")
 Refund = get_model('refund', 'Refund')
+RefundLine = get_model('refund', 'RefundLine')
 
 OSCAR_INITIAL_REFUND_STATUS = 'REFUND_OPEN'
 OSCAR_INITIAL_REFUND_LINE_STATUS = 'REFUND_LINE_OPEN'
@@ -79,3 +88,65 @@ class ApiTests(RefundTestMixin, TestCase):
 
         actual = create_refunds([order], self.course.id)
         self.assertEqual(actual, [])
+
+    def test_find_lines_to_refund_for_course(self):
+        """ The method should return the unrefunded lines of the completed orders of all users. """
+        order = self.create_order(multiple_lines=True)
+        other_order = self.create_order(user=UserFactory())
+        self.create_order(user=UserFactory(), status=ORDER.OPEN)
+        refunded_order = self.create_order(user=UserFactory())
+        RefundLineFactory(order_line=refunded_order.lines.first())
+        denied_order = self.create_order(user=UserFactory())
+        RefundLineFactory(order_line=denied_order.lines.first(), status=REFUND_LINE.DENIED)
+
+        users = [self.user, self.user, other_order.user, denied_order.user]
+        with self.assertNumQueries(1):
+            lines = list(find_lines_to_refund_for_course(self.course.id))
+            self.assertEqual([line.order.user for line in lines], users)
+        self.assertEqual(lines, list(order.lines.order_by('id')) + list(other_order.lines.all()) +
+                         list(denied_order.lines.all()))
+
+    @override_settings(OSCAR_INITIAL_REFUND_STATUS=OSCAR_INITIAL_REFUND_STATUS,
+                       OSCAR_INITIAL_REFUND_LINE_STATUS=OSCAR_INITIAL_REFUND_LINE_STATUS)
+    def test_create_refunds_for_course(self):
+        """ The method should create refunds for the orders of all users, in batches. """
+        orders = [self.create_order(multiple_lines=True)] + [self.create_order(user=UserFactory()) for __ in range(2)]
+        refunded_order = self.create_order(user=UserFactory())
+        RefundLineFactory(order_line=refunded_order.lines.first())
+
+        refunds = create_refunds_for_course(self.course.id, batch_size=2)
+        self.assertEqual([refund.order for refund in refunds], orders)
+        for refund, order in zip(refunds, orders):
+            self.assert_refund_matches_order(refund, order)
+            self.assertEqual(refund.history.count(), 1)
+            for refund_line in refund.lines.all():
+                self.assertEqual(refund_line.history.count(), 1)
+
+        self.assertEqual(create_refunds_for_course(self.course.id), [])
+
+    def test_create_refunds_for_course_free(self):
+        """ The method should approve refunds with a total credit of $0 upon creation. """
+        self.create_order(free=True)
+
+        with mock.patch.object(Refund, '_revoke_lines', autospec=True) as mock_revoke:
+            mock_revoke.side_effect = lambda refund: refund.set_status(REFUND.COMPLETE)
+            refund, = create_refunds_for_course(self.course.id)
+
+        self.assertEqual(refund.status, REFUND.COMPLETE)
+
+    @ddt.data(1, 2)
+    def test_approve_refunds(self, max_workers):
+        """ The method should approve each refund and return the result of each approval. """
+        refunds = [self.create_refund() for __ in range(3)]
+        results = {refunds[0].id: True, refunds[1].id: False}
+
+        def approve(refund, revoke_fulfillment=True):
+            self.assertFalse(revoke_fulfillment)
+            if refund.id not in results:
+                raise Exception
+            return results[refund.id]
+
+        with mock.patch.object(Refund, 'approve', side_effect=approve, autospec=True):
+            actual = approve_refunds(refunds, revoke_fulfillment=False, max_workers=max_workers)
+
+        self.assertEqual(actual, {**results, refunds[2].id: False})
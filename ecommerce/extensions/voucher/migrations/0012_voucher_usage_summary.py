@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 22:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voucher', '0011_auto_20200403_2046'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoucherUsageSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('num_assignments', models.PositiveIntegerField(default=0)),
+                ('voucher', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='usage_summary', to='voucher.Voucher')),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
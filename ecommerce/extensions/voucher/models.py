@@ -6,6 +6,7 @@ import logging
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
+from django_extensions.db.models import TimeStampedModel
 from oscar.apps.voucher.abstract_models import (  # pylint: disable=ungrouped-imports
     AbstractVoucher,
     AbstractVoucherApplication
@@ -97,6 +98,14 @@ class Voucher(AbstractVoucher):
 
     @property
     def original_offer(self):
+        if 'offers' in getattr(self, '_prefetched_objects_cache', {}):
+            # Prefetched offers, e.g. those of the vouchers of a coupon report, are not queried again.
+            offers = self.offers.all()
+            for offer in offers:
+                if offer.condition.range_id is not None:
+                    return offer
+            return sorted(offers, key=lambda offer: offer.date_created)[0]
+
         try:
             return self.offers.filter(condition__range__isnull=False)[0]
         except (IndexError, ObjectDoesNotExist):
@@ -167,6 +176,16 @@ class Voucher(AbstractVoucher):
         return offer_max_uses - (self.num_orders + num_assignments)
 
 
+class VoucherUsageSummary(TimeStampedModel):
+    """
+    Number of the active, neither redeemed nor revoked, offer assignments of a voucher.
+
+    Maintained by ecommerce.extensions.voucher.usage_summary. Redemptions are counted by Voucher.num_orders.
+    """
+    voucher = models.OneToOneField('voucher.Voucher', related_name='usage_summary', on_delete=models.CASCADE)
+    num_assignments = models.PositiveIntegerField(default=0)
+
+
 class VoucherApplication(AbstractVoucherApplication):
     history = HistoricalRecords()
 
@@ -4,6 +4,7 @@ import datetime
 
 import ddt
 from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
 from django.utils.timezone import now
 from oscar.core.loading import get_model
 from oscar.test.factories import OrderFactory, OrderLineFactory
@@ -82,6 +83,25 @@ class VoucherTests(TestCase):
         voucher.offers.add(third_offer)
         assert voucher.best_offer == second_offer
 
+    def test_best_offer_prefetched(self):
+        """ Verify the best offer of a voucher is found among its prefetched offers without querying them again. """
+        voucher = Voucher.objects.create(**self.data)
+        first_offer = factories.ConditionalOfferFactory(condition=factories.ConditionFactory(range=None))
+        range_offer = factories.ConditionalOfferFactory()
+        voucher.offers.add(first_offer, range_offer)
+        offers = ConditionalOffer.objects.select_related('condition')
+        voucher = Voucher.objects.prefetch_related(Prefetch('offers', queryset=offers)).get(id=voucher.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(voucher.best_offer, range_offer)
+            self.assertEqual(voucher.original_offer, range_offer)
+
+        enterprise_offer = factories.EnterpriseOfferFactory()
+        voucher.offers.add(enterprise_offer)
+        voucher = Voucher.objects.prefetch_related(Prefetch('offers', queryset=offers)).get(id=voucher.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(voucher.best_offer, enterprise_offer)
+
     def test_create_voucher_with_multi_use_per_customer_usage(self):
         """ Verify voucher is created with `MULTI_USE_PER_CUSTOMER` usage type. """
         voucher_data = dict(self.data, usage=Voucher.MULTI_USE_PER_CUSTOMER)
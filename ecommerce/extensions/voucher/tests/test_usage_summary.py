@@ -0,0 +1,67 @@
+
+
+from oscar.core.loading import get_model
+from oscar.test.factories import VoucherFactory
+
+from ecommerce.extensions.offer.constants import OFFER_ASSIGNMENT_REVOKED, OFFER_REDEEMED
+from ecommerce.extensions.test.factories import OfferAssignmentFactory
+from ecommerce.extensions.voucher.usage_summary import get_voucher_num_assignments, refresh_voucher_usage_summaries
+from ecommerce.tests.testcases import TestCase
+
+Voucher = get_model('voucher', 'Voucher')
+VoucherUsageSummary = get_model('voucher', 'VoucherUsageSummary')
+
+
+class VoucherUsageSummaryTests(TestCase):
+    """ Tests for the summaries of the offer assignments of vouchers. """
+
+    def setUp(self):
+        super(VoucherUsageSummaryTests, self).setUp()
+        self.voucher = VoucherFactory(code='SUMMARYCODE1')
+        self.other_voucher = VoucherFactory(code='SUMMARYCODE2')
+
+    def assert_num_assignments(self, num_assignments, other_num_assignments=0):
+        vouchers = Voucher.objects.filter(id__in=[self.voucher.id, self.other_voucher.id])
+        self.assertEqual(get_voucher_num_assignments(vouchers), {
+            self.voucher.code: num_assignments,
+            self.other_voucher.code: other_num_assignments,
+        })
+
+    def test_initialized_from_active_assignments(self):
+        """ Verify the summaries are initialized from the active offer assignments of the vouchers. """
+        OfferAssignmentFactory.create_batch(2, code=self.voucher.code)
+        OfferAssignmentFactory(code=self.voucher.code, status=OFFER_REDEEMED)
+        OfferAssignmentFactory(code=self.voucher.code, status=OFFER_ASSIGNMENT_REVOKED)
+        self.assertFalse(VoucherUsageSummary.objects.exists())
+
+        self.assert_num_assignments(2)
+        self.assertEqual(VoucherUsageSummary.objects.get(voucher=self.voucher).num_assignments, 2)
+        self.assertEqual(VoucherUsageSummary.objects.get(voucher=self.other_voucher).num_assignments, 0)
+
+        with self.assertNumQueries(1):
+            self.assert_num_assignments(2)
+
+    def test_refreshed_on_assignment_changes(self):
+        """ Verify the summaries are refreshed when offer assignments are created, revoked and deleted. """
+        self.assert_num_assignments(0)
+
+        assignment = OfferAssignmentFactory(code=self.voucher.code)
+        OfferAssignmentFactory(code=self.other_voucher.code)
+        self.assert_num_assignments(1, 1)
+
+        assignment.status = OFFER_ASSIGNMENT_REVOKED
+        assignment.save()
+        self.assert_num_assignments(0, 1)
+
+        OfferAssignmentFactory(code=self.voucher.code).delete()
+        self.assert_num_assignments(0, 1)
+
+    def test_refresh(self):
+        """ Verify only the initialized summaries of the given codes are refreshed. """
+        self.assert_num_assignments(0)
+        VoucherUsageSummary.objects.filter(voucher=self.other_voucher).delete()
+        VoucherUsageSummary.objects.update(num_assignments=5)
+
+        refresh_voucher_usage_summaries([self.voucher.code, self.other_voucher.code])
+        self.assertEqual(VoucherUsageSummary.objects.get(voucher=self.voucher).num_assignments, 0)
+        self.assertFalse(VoucherUsageSummary.objects.filter(voucher=self.other_voucher).exists())
@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
 
+import itertools
 import uuid
 
 import ddt
 import httpretty
+import mock
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.test import override_settings
@@ -34,10 +36,13 @@ from ecommerce.extensions.fulfillment.status import LINE
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
 from ecommerce.extensions.test.factories import create_order, prepare_voucher
 from ecommerce.extensions.voucher.utils import (
+    _generate_code_strings,
+    create_new_vouchers,
     create_vouchers,
     generate_coupon_report,
     get_voucher_and_products_from_code,
     get_voucher_discount_info,
+    stream_coupon_report,
     update_voucher_offer
 )
 from ecommerce.tests.factories import UserFactory
@@ -299,6 +304,37 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         with self.assertRaises(ValueError):
             create_vouchers(**self.data)
 
+    @override_settings(VOUCHER_CODE_BATCH_SIZE=4)
+    def test_create_new_vouchers(self):
+        """
+        Test that vouchers are created in batches, with a single query checking the
+        codes of each batch for collisions and a single query inserting them.
+        """
+        # Each batch checks the codes, inserts the vouchers and reads them back.
+        with self.assertNumQueries(9):
+            vouchers = create_new_vouchers(
+                end_datetime=self.data['end_datetime'],
+                name=self.data['name'],
+                quantity=10,
+                start_datetime=self.data['start_datetime'],
+                voucher_type=Voucher.SINGLE_USE,
+            )
+
+        self.assertEqual(len(vouchers), 10)
+        self.assertEqual(len({voucher.code for voucher in vouchers}), 10)
+        self.assertTrue(all(voucher.id for voucher in vouchers))
+        self.assertEqual(Voucher.objects.filter(name=self.data['name']).count(), 10)
+
+    def test_generate_code_strings_collision(self):
+        """
+        Test that generated strings which are already used as voucher codes are replaced.
+        """
+        existing_code = Voucher.objects.first().code
+        random_code_strings = [existing_code, 'A', 'B']
+        with mock.patch('ecommerce.extensions.voucher.utils._random_code_string', side_effect=random_code_strings):
+            codes = _generate_code_strings(1, 2)
+        self.assertEqual(sorted(codes), ['A', 'B'])
+
     def test_create_discount_coupon(self):
         """
         Test discount voucher creation with specified code
@@ -645,6 +681,28 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         self.assertEqual(rows[2]['Redeemed By Username'], self.user.username)
         self.assertEqual(rows[3]['Redemption Count'], 0)
 
+    @override_settings(COUPON_REPORT_CHUNK_SIZE=2)
+    def test_stream_coupon_report_queries(self):
+        """ Verify the vouchers are streamed in chunks, each loaded by a fixed number of queries. """
+        coupon = self.create_coupon(title='Test report queries', catalog=self.catalog, quantity=3)
+        vouchers = coupon.attr.coupon_vouchers.vouchers.order_by('id')
+        self.use_voucher('TESTORDER1', vouchers[0], self.user)
+        self.use_voucher('TESTORDER2', vouchers[1], UserFactory())
+        self.use_voucher('TESTORDER3', vouchers[2], self.user)
+
+        field_names, rows = stream_coupon_report([coupon.attr.coupon_vouchers])
+        self.assertIn('Redeemed By Username', field_names)
+        self.assertEqual(next(rows)['Coupon Name'], 'Test report queries')
+
+        # Each chunk is loaded by four queries: vouchers, offers, voucher applications and order lines.
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                [row['Order Number'] for row in itertools.islice(rows, 4)],
+                ['', 'TESTORDER1', '', 'TESTORDER2']
+            )
+        with self.assertNumQueries(4):
+            self.assertEqual([row['Order Number'] for row in rows], ['', 'TESTORDER3'])
+
     def test_generate_coupon_report_for_used_query_coupon(self):
         """Test that used query coupon voucher reports which course was it used for."""
         catalog_query = '*:*'
@@ -0,0 +1,81 @@
+"""
+Per-voucher summaries of the offer assignments used by the enterprise coupon code usage and overview endpoints.
+
+A summary is initialized from the offer assignments of its voucher the first time it is read, and is then refreshed
+whenever an offer assignment of the voucher is created, changes status or is deleted. Reading the number of active
+assignments of any number of vouchers is then a single lookup instead of an aggregate over their offer assignments.
+"""
+
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.offer.constants import (
+    OFFER_ASSIGNED,
+    OFFER_ASSIGNMENT_EMAIL_BOUNCED,
+    OFFER_ASSIGNMENT_EMAIL_PENDING
+)
+
+OfferAssignment = get_model('offer', 'OfferAssignment')
+VoucherUsageSummary = get_model('voucher', 'VoucherUsageSummary')
+
+ACTIVE_ASSIGNMENT_STATUSES = [OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING, OFFER_ASSIGNMENT_EMAIL_BOUNCED]
+
+
+def _count_active_assignments(codes):
+    assignments = OfferAssignment.objects.filter(
+        code__in=codes, status__in=ACTIVE_ASSIGNMENT_STATUSES
+    ).values('code').annotate(num_assignments=Count('id')).order_by()
+    return {assignment['code']: assignment['num_assignments'] for assignment in assignments}
+
+
+def get_voucher_num_assignments(vouchers):
+    """
+    Returns the number of active offer assignments of each of the vouchers.
+
+    The summaries are joined to the vouchers, and the vouchers are otherwise only used as a subquery, so that coupons
+    with many vouchers are not looked up with lists of all their voucher IDs or codes.
+
+    Args:
+        vouchers (QuerySet): Vouchers whose assignments are counted.
+
+    Returns:
+        dict: Number of active assignments keyed by voucher code.
+    """
+    num_assignments = {}
+    uninitialized = []
+    for voucher_id, code, count in vouchers.values_list('id', 'code', 'usage_summary__num_assignments'):
+        if count is None:
+            uninitialized.append((voucher_id, code))
+        else:
+            num_assignments[code] = count
+
+    if uninitialized:
+        counts = _count_active_assignments(vouchers.filter(usage_summary__isnull=True).values('code'))
+        # Summaries initialized by a concurrent request are kept.
+        VoucherUsageSummary.objects.bulk_create([
+            VoucherUsageSummary(voucher_id=voucher_id, num_assignments=counts.get(code, 0))
+            for voucher_id, code in uninitialized
+        ], batch_size=settings.VOUCHER_CODE_BATCH_SIZE, ignore_conflicts=True)
+        num_assignments.update({code: counts.get(code, 0) for __, code in uninitialized})
+
+    return num_assignments
+
+
+def refresh_voucher_usage_summaries(codes):
+    """
+    Recounts the active offer assignments of the vouchers with the given codes.
+
+    Summaries which have not been initialized yet are left alone, they will be up to date once they are.
+    """
+    codes = set(codes)
+    counts = _count_active_assignments(codes)
+    codes_by_count = defaultdict(set)
+    for code in codes:
+        codes_by_count[counts.get(code, 0)].add(code)
+
+    for count, counted_codes in codes_by_count.items():
+        VoucherUsageSummary.objects.filter(voucher__code__in=counted_codes).update(num_assignments=count)
@@ -5,12 +5,15 @@ import base64
 import datetime
 import hashlib
 import logging
+import time
 import uuid
+from collections import defaultdict
 from decimal import Decimal, DecimalException
 
 import dateutil.parser
 import pytz
 from django.conf import settings
+from django.db.models import Prefetch
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import TieredCache
@@ -40,6 +43,7 @@ Benefit = get_model('offer', 'Benefit')
 Condition = get_model('offer', 'Condition')
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
 CouponVouchers = get_model('voucher', 'CouponVouchers')
+Line = get_model('order', 'Line')
 Order = get_model('order', 'Order')
 Product = get_model('catalogue', 'Product')
 ProductCategory = get_model('catalogue', 'ProductCategory')
@@ -114,7 +118,7 @@ def _get_course_id_and_organization(seat_stockrecord):
     """
     if seat_stockrecord.product.is_course_entitlement_product:
         return None, None
-    course_id = seat_stockrecord.product.attr.course_key
+    course_id = seat_stockrecord.product.course_key
     course_organization = CourseKey.from_string(course_id).org
     return course_id, course_organization
 
@@ -196,8 +200,8 @@ def _get_info_for_coupon_report(coupon, voucher):
     return coupon_data
 
 
-def _get_voucher_info_for_coupon_report(voucher):
-    offer = voucher.best_offer
+def _get_voucher_info_for_coupon_report(voucher, offer=None):
+    offer = offer or voucher.best_offer
     status = _get_voucher_status(voucher, offer)
     path = '{path}?code={code}'.format(path=reverse('coupons:offer'), code=voucher.code)
     url = get_ecommerce_url(path)
@@ -248,18 +252,7 @@ def _get_redemption_course_ids(voucher_application):
     return redemption_course_ids
 
 
-def generate_coupon_report(coupon_vouchers):
-    """
-    Generate coupon report data
-
-    Args:
-        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
-
-    Returns:
-        List[str]
-        List[dict]
-    """
-
+def _get_coupon_report_field_names(header_row):
     field_names = [
         _('Code'),
         _('Coupon Name'),
@@ -289,48 +282,14 @@ def generate_coupon_report(coupon_vouchers):
         _('Coupon Expiry Date'),
         _('Email Domains'),
     ]
-    rows = []
-
-    for coupon_voucher in coupon_vouchers:
-        coupon = coupon_voucher.coupon
-        client = Invoice.objects.get(order__lines__product=coupon).business_client.name
-        rows.append(_get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first()))
-        rows[0][_('Client')] = client
-
-        for voucher in coupon_voucher.vouchers.all().prefetch_related('offers'):
-            row = _get_voucher_info_for_coupon_report(voucher)
-
-            for item in (_('Order Number'), _('Redeemed By Username'),):
-                row[item] = ''
-
-            rows.append(row)
-
-            if voucher.num_orders > 0:
-                voucher_applications = VoucherApplication.objects.filter(
-                    voucher=voucher).prefetch_related('user', 'order__lines')
-
-                for application in voucher_applications:
-                    redemption_course_ids = _get_redemption_course_ids(application)
-                    redemption_user_username = application.user.username
 
-                    new_row = row.copy()
-                    _add_redemption_course_ids(new_row, rows[0], redemption_course_ids)
-                    new_row.update({
-                        _('Status'): _('Redeemed'),
-                        _('Order Number'): application.order.number,
-                        _('Redeemed By Username'): redemption_user_username,
-                        _('Maximum Coupon Usage'): 1,
-                        _('Redemption Count'): 1,
-                    })
-                    rows.append(new_row)
-
-    if _('Program UUID') in rows[0]:
+    if _('Program UUID') in header_row:
         field_names.remove(_('Course ID'))
         field_names.remove(_('Organization'))
         field_names.remove(_('Catalog Query'))
         field_names.remove(_('Course Seat Types'))
         field_names.remove(_('Redeemed For Course ID'))
-    elif _('Catalog Query') in rows[0]:
+    elif _('Catalog Query') in header_row:
         field_names.remove(_('Course ID'))
         field_names.remove(_('Organization'))
         field_names.remove(_('Program UUID'))
@@ -341,7 +300,133 @@ def generate_coupon_report(coupon_vouchers):
         field_names.remove(_('Redeemed For Course IDs'))
         field_names.remove(_('Program UUID'))
 
-    return field_names, rows
+    return field_names
+
+
+def _get_coupon_row_for_coupon_report(coupon_voucher):
+    coupon = coupon_voucher.coupon
+    invoice = Invoice.objects.select_related('business_client').get(order__lines__product=coupon)
+    row = _get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first())
+    row[_('Client')] = invoice.business_client.name
+    return row
+
+
+def _get_voucher_chunks_for_coupon_report(vouchers):
+    """
+    Yield the vouchers in chunks of COUPON_REPORT_CHUNK_SIZE, with their offers and conditions prefetched.
+
+    Chunks are paginated on the voucher id, so each chunk is loaded by two queries regardless of its position.
+    """
+    offers = ConditionalOffer.objects.select_related('condition')
+    vouchers = vouchers.order_by('id').prefetch_related(Prefetch('offers', queryset=offers))
+    chunk_size = settings.COUPON_REPORT_CHUNK_SIZE
+    last_id = 0
+    while True:
+        chunk = list(vouchers.filter(id__gt=last_id)[:chunk_size])
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1].id
+
+
+def _get_voucher_applications_for_coupon_report(vouchers):
+    """
+    Return the applications of the redeemed vouchers, keyed by voucher id, with their users, orders and order lines
+    loaded by a fixed number of queries.
+    """
+    applications = defaultdict(list)
+    redeemed_voucher_ids = [voucher.id for voucher in vouchers if voucher.num_orders > 0]
+    if not redeemed_voucher_ids:
+        return applications
+
+    lines = Line.objects.select_related('product__product_class', 'product__parent__product_class')
+    voucher_applications = VoucherApplication.objects.filter(
+        voucher_id__in=redeemed_voucher_ids
+    ).select_related('user', 'order').prefetch_related(Prefetch('order__lines', queryset=lines)).order_by('id')
+
+    for application in voucher_applications:
+        applications[application.voucher_id].append(application)
+    return applications
+
+
+def _get_voucher_rows_for_coupon_report(vouchers, header_row):
+    for chunk in _get_voucher_chunks_for_coupon_report(vouchers):
+        applications = _get_voucher_applications_for_coupon_report(chunk)
+
+        for voucher in chunk:
+            row = _get_voucher_info_for_coupon_report(voucher, voucher.best_offer)
+
+            for item in (_('Order Number'), _('Redeemed By Username'),):
+                row[item] = ''
+
+            yield row
+
+            for application in applications[voucher.id]:
+                redemption_course_ids = _get_redemption_course_ids(application)
+                redemption_user_username = application.user.username
+
+                new_row = row.copy()
+                _add_redemption_course_ids(new_row, header_row, redemption_course_ids)
+                new_row.update({
+                    _('Status'): _('Redeemed'),
+                    _('Order Number'): application.order.number,
+                    _('Redeemed By Username'): redemption_user_username,
+                    _('Maximum Coupon Usage'): 1,
+                    _('Redemption Count'): 1,
+                })
+                yield new_row
+
+
+def _get_rows_for_coupon_report(header_row, first_coupon_voucher, coupon_vouchers):
+    yield header_row
+    for row in _get_voucher_rows_for_coupon_report(first_coupon_voucher.vouchers.all(), header_row):
+        yield row
+
+    for coupon_voucher in coupon_vouchers:
+        yield _get_coupon_row_for_coupon_report(coupon_voucher)
+        for row in _get_voucher_rows_for_coupon_report(coupon_voucher.vouchers.all(), header_row):
+            yield row
+
+
+def stream_coupon_report(coupon_vouchers):
+    """
+    Generate coupon report data incrementally.
+
+    The report rows are yielded one at a time, and the vouchers are loaded in chunks of COUPON_REPORT_CHUNK_SIZE
+    with a fixed number of queries per chunk. The row of the first coupon, which determines the field names, is
+    generated before this function returns, so errors in it are raised before any row is consumed.
+
+    Args:
+        coupon_vouchers (Iterable[CouponVouchers]): coupon_vouchers the report should be generated for
+
+    Returns:
+        List[str]
+        Iterator[dict]
+    """
+    coupon_vouchers = iter(coupon_vouchers)
+    first_coupon_voucher = next(coupon_vouchers, None)
+    if first_coupon_voucher is None:
+        return _get_coupon_report_field_names({}), iter([])
+
+    header_row = _get_coupon_row_for_coupon_report(first_coupon_voucher)
+    field_names = _get_coupon_report_field_names(header_row)
+    return field_names, _get_rows_for_coupon_report(header_row, first_coupon_voucher, coupon_vouchers)
+
+
+def generate_coupon_report(coupon_vouchers):
+    """
+    Generate coupon report data
+
+    Args:
+        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+
+    Returns:
+        List[str]
+        List[dict]
+    """
+    field_names, rows = stream_coupon_report(coupon_vouchers)
+    return field_names, list(rows)
 
 
 def generate_offer_name(coupon_id, benefit_type, benefit_value, offer_number=None, is_enterprise=False):
@@ -505,15 +590,48 @@ def _generate_code_string(length):
     if length < 1:
         raise ValueError("Voucher code length must be a positive number.")
 
-    h = hashlib.sha256()
-    h.update(uuid.uuid4().bytes)
-    voucher_code = base64.b32encode(h.digest())[0:length].decode('utf-8')
+    voucher_code = _random_code_string(length)
     if Voucher.objects.filter(code__iexact=voucher_code).exists():
         return _generate_code_string(length)
 
     return voucher_code
 
 
+def _random_code_string(length):
+    h = hashlib.sha256()
+    h.update(uuid.uuid4().bytes)
+    return base64.b32encode(h.digest())[0:length].decode('utf-8')
+
+
+def _generate_code_strings(length, count):
+    """
+    Create unique strings of random characters, which are not used by any voucher yet.
+
+    The collisions of each batch of candidate strings with existing voucher codes are checked with a single query.
+
+    Args:
+        length (int): Defines the length of randomly generated strings.
+        count (int): Number of strings to generate.
+
+    Raises:
+        ValueError raised if length is less than one.
+
+    Returns:
+        list
+    """
+    if length < 1:
+        raise ValueError("Voucher code length must be a positive number.")
+
+    voucher_codes = set()
+    while len(voucher_codes) < count:
+        candidates = {_random_code_string(length) for __ in range(count - len(voucher_codes))} - voucher_codes
+        # Voucher codes are saved in uppercase, like the generated strings, so an exact match finds all collisions.
+        existing = Voucher.objects.filter(code__in=candidates).values_list('code', flat=True)
+        voucher_codes.update(candidates.difference(existing))
+
+    return list(voucher_codes)
+
+
 def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
     """
     Creates a voucher.
@@ -532,11 +650,7 @@ def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
         Voucher
     """
     voucher_code = code or _generate_code_string(settings.VOUCHER_CODE_LENGTH)
-    if not isinstance(start_datetime, datetime.datetime):
-        start_datetime = dateutil.parser.parse(start_datetime)
-
-    if not isinstance(end_datetime, datetime.datetime):
-        end_datetime = dateutil.parser.parse(end_datetime)
+    start_datetime, end_datetime = _parse_voucher_datetimes(start_datetime, end_datetime)
 
     voucher = Voucher.objects.create(
         name=name[:128],
@@ -549,6 +663,68 @@ def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
     return voucher
 
 
+def _parse_voucher_datetimes(start_datetime, end_datetime):
+    if not isinstance(start_datetime, datetime.datetime):
+        start_datetime = dateutil.parser.parse(start_datetime)
+
+    if not isinstance(end_datetime, datetime.datetime):
+        end_datetime = dateutil.parser.parse(end_datetime)
+
+    return start_datetime, end_datetime
+
+
+def create_new_vouchers(end_datetime, name, quantity, start_datetime, voucher_type):
+    """
+    Creates vouchers with randomly generated codes, in batches of VOUCHER_CODE_BATCH_SIZE vouchers.
+
+    The codes of each batch are checked for collisions with a single query, and the vouchers of each batch
+    are inserted with a single query.
+
+    Args:
+        end_datetime (datetime): Voucher end date.
+        name (str): Voucher name.
+        quantity (int): Number of vouchers to be created.
+        start_datetime (datetime): Voucher start date.
+        voucher_type (str): Voucher usage.
+
+    Returns:
+        List[Voucher]
+    """
+    started = time.time()
+    start_datetime, end_datetime = _parse_voucher_datetimes(start_datetime, end_datetime)
+    batch_size = settings.VOUCHER_CODE_BATCH_SIZE
+
+    vouchers = []
+    for batch_start in range(0, quantity, batch_size):
+        codes = _generate_code_strings(settings.VOUCHER_CODE_LENGTH, min(batch_size, quantity - batch_start))
+        batch = [
+            Voucher(
+                name=name[:128],
+                code=voucher_code,
+                usage=voucher_type,
+                start_datetime=start_datetime,
+                end_datetime=end_datetime,
+            )
+            for voucher_code in codes
+        ]
+        # bulk_create does not call Voucher.save, which validates the voucher. All vouchers share their fields,
+        # except for the generated codes, so validating one of them is enough.
+        batch[0].clean()
+        Voucher.objects.bulk_create(batch)
+        # Not every database returns the primary keys of bulk created rows.
+        voucher_ids = dict(Voucher.objects.filter(code__in=codes).values_list('code', 'id'))
+        for voucher in batch:
+            voucher.id = voucher_ids[voucher.code]
+        vouchers.extend(batch)
+
+    duration = time.time() - started
+    logger.info(
+        'Created [%d] vouchers in [%.2f] seconds, [%d] vouchers per second.',
+        quantity, duration, quantity / duration if duration else quantity
+    )
+    return vouchers
+
+
 def create_vouchers_and_attach_offers(
         code,
         end_datetime,
@@ -577,17 +753,29 @@ def create_vouchers_and_attach_offers(
     Returns:
         List[Voucher]
     """
-    vouchers = []
-    voucher_offers = []
-    enterprise_voucher_offers = []
-    for i in range(quantity):
-        voucher = create_new_voucher(
+    if code:
+        vouchers = [
+            create_new_voucher(
+                end_datetime=end_datetime,
+                start_datetime=start_datetime,
+                voucher_type=voucher_type,
+                code=code,
+                name=name
+            )
+            for __ in range(quantity)
+        ]
+    else:
+        vouchers = create_new_vouchers(
             end_datetime=end_datetime,
+            name=name,
+            quantity=quantity,
             start_datetime=start_datetime,
-            voucher_type=voucher_type,
-            code=code,
-            name=name
+            voucher_type=voucher_type
         )
+
+    voucher_offers = []
+    enterprise_voucher_offers = []
+    for i, voucher in enumerate(vouchers):
         voucher_offers.append(
             VoucherOffer(voucher=voucher, conditionaloffer=offers[i] if len(offers) > 1 else offers[0])
         )
@@ -598,10 +786,9 @@ def create_vouchers_and_attach_offers(
                     conditionaloffer=enterprise_offers[i] if len(enterprise_offers) > 1 else enterprise_offers[0]
                 )
             )
-        vouchers.append(voucher)
 
-    VoucherOffer.objects.bulk_create(voucher_offers)
-    VoucherOffer.objects.bulk_create(enterprise_voucher_offers)
+    VoucherOffer.objects.bulk_create(voucher_offers, batch_size=settings.VOUCHER_CODE_BATCH_SIZE)
+    VoucherOffer.objects.bulk_create(enterprise_voucher_offers, batch_size=settings.VOUCHER_CODE_BATCH_SIZE)
     return vouchers
 
 
@@ -3,6 +3,7 @@
 import logging
 import operator
 
+import waffle
 from django.conf import settings
 from edx_django_utils.cache import TieredCache
 from oscar.apps.offer import utils as oscar_utils
@@ -11,9 +12,11 @@ from requests.exceptions import ConnectionError as ReqConnectionError
 from requests.exceptions import Timeout
 from slumber.exceptions import HttpNotFoundError, SlumberBaseException
 
+from ecommerce.core.constants import PROGRAM_OWNERSHIP_SNAPSHOT_SWITCH
 from ecommerce.core.utils import deprecated_traverse_pagination, get_cache_key
 from ecommerce.extensions.offer.decorators import check_condition_applicability
 from ecommerce.extensions.offer.mixins import SingleItemConsumptionConditionMixin
+from ecommerce.programs.ownership import get_user_ownership
 from ecommerce.programs.utils import get_program
 
 Condition = get_model('offer', 'Condition')
@@ -78,7 +81,12 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
         entitlements = []
 
         site_configuration = basket.site.siteconfiguration
-        if site_configuration.enable_partial_program:
+        if (site_configuration.enable_partial_program and basket.owner and
+                waffle.switch_is_active(PROGRAM_OWNERSHIP_SNAPSHOT_SWITCH)):
+            enrollments, entitlements = get_user_ownership(
+                site_configuration, basket.owner.username, retrieve_entitlements
+            )
+        elif site_configuration.enable_partial_program:
             enrollments = self._get_lms_resource(
                 basket, 'enrollments', site_configuration.enrollment_api_client.enrollment)
             if retrieve_entitlements:
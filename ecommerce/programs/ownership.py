@@ -0,0 +1,176 @@
+"""
+Snapshots of the enrollments and entitlements owned by a user, used to evaluate program offers.
+
+A snapshot is retrieved from the LMS once, and kept in the Django cache for PROGRAM_OWNERSHIP_SNAPSHOT_TIMEOUT
+seconds. Enrollments and entitlements created by our own fulfillment are added to the snapshot as they happen.
+Once a snapshot is older than PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_INTERVAL seconds, it is still used, but it is
+retrieved again in the background, so that changes made in the LMS are eventually picked up without making the
+user wait for the LMS.
+
+Every change made to a snapshot, by fulfillment or refunds, increments its version. A snapshot retrieved from the LMS
+is only cached if its version has not changed while it was retrieved, so that a retrieval which started before the
+change does not overwrite it.
+"""
+
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from requests.exceptions import ConnectionError as ReqConnectionError
+from requests.exceptions import Timeout
+from slumber.exceptions import SlumberBaseException
+
+from ecommerce.core.utils import deprecated_traverse_pagination, get_cache_key
+
+logger = logging.getLogger(__name__)
+
+_refresh_executor = None
+_refresh_executor_lock = threading.Lock()
+
+
+def get_ownership_snapshot_cache_key(site, username):
+    return get_cache_key(
+        site_domain=site.domain,
+        resource='program_ownership_snapshot',
+        username=username,
+    )
+
+
+def _get_snapshot_version_key(cache_key):
+    return cache_key + '.version'
+
+
+def _increment_snapshot_version(cache_key):
+    """ Marks the snapshot as changed, so that snapshots being retrieved from the LMS are not cached. """
+    version_key = _get_snapshot_version_key(cache_key)
+    try:
+        django_cache.incr(version_key)
+    except ValueError:
+        django_cache.set(version_key, 1, settings.PROGRAM_OWNERSHIP_SNAPSHOT_TIMEOUT)
+
+
+def _get_refresh_executor():
+    global _refresh_executor  # pylint: disable=global-statement
+    if _refresh_executor is None:
+        with _refresh_executor_lock:
+            if _refresh_executor is None:
+                _refresh_executor = ThreadPoolExecutor(max_workers=settings.PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_WORKERS)
+    return _refresh_executor
+
+
+def _retrieve_enrollments(site_configuration, username):
+    return site_configuration.enrollment_api_client.enrollment.get(user=username) or []
+
+
+def _retrieve_entitlements(site_configuration, username):
+    endpoint = site_configuration.entitlement_api_client.entitlements
+    response = endpoint.get(user=username) or []
+    if isinstance(response, dict):
+        return deprecated_traverse_pagination(response, endpoint)
+    return response
+
+
+def _retrieve_snapshot(site_configuration, username, retrieve_entitlements):
+    """
+    Retrieves the user's enrollments, and optionally entitlements, from the LMS, and caches them, unless the snapshot
+    has changed while they were retrieved.
+    """
+    cache_key = get_ownership_snapshot_cache_key(site_configuration.site, username)
+    version_key = _get_snapshot_version_key(cache_key)
+    version = django_cache.get(version_key)
+    snapshot = {
+        'enrollments': _retrieve_enrollments(site_configuration, username),
+        'entitlements': _retrieve_entitlements(site_configuration, username) if retrieve_entitlements else None,
+        'retrieved': time.time(),
+    }
+    if django_cache.get(version_key) == version:
+        django_cache.set(cache_key, snapshot, settings.PROGRAM_OWNERSHIP_SNAPSHOT_TIMEOUT)
+    else:
+        logger.info('The program ownership snapshot of user [%s] changed while it was retrieved.', username)
+    return snapshot
+
+
+def _refresh_snapshot(site_configuration, username, retrieve_entitlements):
+    try:
+        _retrieve_snapshot(site_configuration, username, retrieve_entitlements)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Failed to refresh the program ownership snapshot of user [%s].', username)
+
+
+def _schedule_refresh(site_configuration, username, retrieve_entitlements):
+    """ Refreshes the snapshot in the background, unless a refresh of the snapshot is already scheduled. """
+    lock_key = get_ownership_snapshot_cache_key(site_configuration.site, username) + '.refresh'
+    if django_cache.add(lock_key, 1, settings.PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_INTERVAL):
+        _get_refresh_executor().submit(_refresh_snapshot, site_configuration, username, retrieve_entitlements)
+
+
+def get_user_ownership(site_configuration, username, retrieve_entitlements=False):
+    """
+    Returns the enrollments, and entitlements, of the user.
+
+    Args:
+        site_configuration (SiteConfiguration): Configuration of the site whose LMS is queried.
+        username (str): Username of the user.
+        retrieve_entitlements (bool): Whether the user's entitlements are needed.
+
+    Returns:
+        tuple: The lists of the user's enrollments and entitlements. The entitlements are empty, unless
+            retrieve_entitlements is True. Both are empty if the LMS cannot be reached.
+    """
+    snapshot = django_cache.get(get_ownership_snapshot_cache_key(site_configuration.site, username))
+    if snapshot is None or (retrieve_entitlements and snapshot['entitlements'] is None):
+        try:
+            snapshot = _retrieve_snapshot(site_configuration, username, retrieve_entitlements)
+        except (ReqConnectionError, SlumberBaseException, Timeout) as exc:
+            logger.error('Failed to retrieve the program ownership snapshot of user [%s]: %s', username, str(exc))
+            return [], []
+    elif time.time() - snapshot['retrieved'] > settings.PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_INTERVAL:
+        _schedule_refresh(site_configuration, username, snapshot['entitlements'] is not None)
+
+    return snapshot['enrollments'], snapshot['entitlements'] or []
+
+
+def _update_snapshot(site, username, update):
+    if site is None:
+        return
+    cache_key = get_ownership_snapshot_cache_key(site, username)
+    _increment_snapshot_version(cache_key)
+    snapshot = django_cache.get(cache_key)
+    if snapshot is None:
+        # The snapshot will be retrieved, including the change, when it is next needed.
+        return
+    update(snapshot)
+    django_cache.set(cache_key, snapshot, settings.PROGRAM_OWNERSHIP_SNAPSHOT_TIMEOUT)
+
+
+def add_enrollment_to_snapshot(site, username, course_id, mode):
+    """ Records an enrollment, created by fulfillment, in the user's snapshot. """
+    def update(snapshot):
+        snapshot['enrollments'] = [
+            enrollment for enrollment in snapshot['enrollments']
+            if enrollment['course_details']['course_id'] != course_id
+        ] + [{'mode': mode, 'course_details': {'course_id': course_id}}]
+
+    _update_snapshot(site, username, update)
+
+
+def add_entitlement_to_snapshot(site, username, course_uuid, mode):
+    """ Records an entitlement, created by fulfillment, in the user's snapshot. """
+    def update(snapshot):
+        if snapshot['entitlements'] is not None:
+            snapshot['entitlements'].append({'mode': mode, 'course_uuid': course_uuid})
+
+    _update_snapshot(site, username, update)
+
+
+def invalidate_snapshot(site, username):
+    """ Discards the user's snapshot, e.g. after enrollments or entitlements are revoked. """
+    if site is None:
+        return
+    cache_key = get_ownership_snapshot_cache_key(site, username)
+    _increment_snapshot_version(cache_key)
+    django_cache.delete(cache_key)
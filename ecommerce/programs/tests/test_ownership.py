@@ -0,0 +1,170 @@
+
+
+import time
+
+import httpretty
+import mock
+from django.core.cache import cache as django_cache
+from django.test import override_settings
+from oscar.test.factories import BasketFactory
+from waffle.testutils import override_switch
+
+from ecommerce.core.constants import PROGRAM_OWNERSHIP_SNAPSHOT_SWITCH
+from ecommerce.extensions.test import factories
+from ecommerce.programs import ownership
+from ecommerce.programs.ownership import (
+    add_enrollment_to_snapshot,
+    add_entitlement_to_snapshot,
+    get_ownership_snapshot_cache_key,
+    get_user_ownership,
+    invalidate_snapshot
+)
+from ecommerce.programs.tests.mixins import ProgramTestMixin
+from ecommerce.tests.factories import UserFactory
+from ecommerce.tests.testcases import TestCase
+
+LOGGER_NAME = 'ecommerce.programs.ownership'
+ENROLLMENTS = [{'mode': 'verified', 'course_details': {'course_id': 'course-v1:test-org+course+1'}}]
+ENTITLEMENTS = [{'mode': 'verified', 'course_uuid': '268afbfc-cc1e-415b-a5d8-c58d955bcfc3'}]
+
+
+@httpretty.activate
+class OwnershipSnapshotTests(ProgramTestMixin, TestCase):
+    """ Tests for the snapshots of the enrollments and entitlements owned by a user. """
+
+    def setUp(self):
+        super(OwnershipSnapshotTests, self).setUp()
+        self.username = UserFactory().username
+        self.mock_user_data(self.username, owned_products=ENROLLMENTS)
+        self.mock_user_data(self.username, mocked_api='entitlements', owned_products=ENTITLEMENTS)
+
+    def get_snapshot(self):
+        return django_cache.get(get_ownership_snapshot_cache_key(self.site, self.username))
+
+    def assert_lms_requests(self, expected):
+        paths = [request.path for request in httpretty.httpretty.latest_requests if 'user=' in request.path]
+        self.assertEqual(len(paths), expected)
+
+    def test_get_user_ownership(self):
+        """ Verify the user's enrollments are retrieved once, and the entitlements only when needed. """
+        self.assertEqual(get_user_ownership(self.site_configuration, self.username), (ENROLLMENTS, []))
+        self.assertEqual(get_user_ownership(self.site_configuration, self.username), (ENROLLMENTS, []))
+        self.assert_lms_requests(1)
+
+        expected = (ENROLLMENTS, ENTITLEMENTS)
+        self.assertEqual(get_user_ownership(self.site_configuration, self.username, True), expected)
+        self.assertEqual(get_user_ownership(self.site_configuration, self.username, True), expected)
+        self.assert_lms_requests(3)
+
+    def test_get_user_ownership_failure(self):
+        """ Verify nothing is owned, and nothing cached, if the LMS cannot be reached. """
+        self.mock_user_data(self.username, response_code=500)
+        with mock.patch('{}.logger.error'.format(LOGGER_NAME)) as mock_logger:
+            self.assertEqual(get_user_ownership(self.site_configuration, self.username), ([], []))
+        self.assertTrue(mock_logger.called)
+        self.assertIsNone(self.get_snapshot())
+
+    @override_settings(PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_INTERVAL=60)
+    def test_stale_snapshot_refreshed(self):
+        """ Verify a stale snapshot is returned while a single refresh is scheduled in the background. """
+        get_user_ownership(self.site_configuration, self.username, True)
+        snapshot = self.get_snapshot()
+        snapshot['enrollments'] = []
+        snapshot['retrieved'] = time.time() - 61
+        django_cache.set(get_ownership_snapshot_cache_key(self.site, self.username), snapshot)
+
+        with mock.patch('ecommerce.programs.ownership._get_refresh_executor') as mock_executor:
+            self.assertEqual(get_user_ownership(self.site_configuration, self.username), ([], ENTITLEMENTS))
+            self.assertEqual(get_user_ownership(self.site_configuration, self.username), ([], ENTITLEMENTS))
+
+        self.assertEqual(mock_executor.return_value.submit.call_count, 1)
+        refresh, site_configuration, username, retrieve_entitlements = mock_executor.return_value.submit.call_args[0]
+        self.assertTrue(retrieve_entitlements)
+
+        refresh(site_configuration, username, retrieve_entitlements)
+        self.assertEqual(get_user_ownership(self.site_configuration, self.username), (ENROLLMENTS, ENTITLEMENTS))
+
+    def test_refresh_failure(self):
+        """ Verify failures of background refreshes are logged, and the snapshot is kept. """
+        get_user_ownership(self.site_configuration, self.username)
+        with mock.patch('ecommerce.programs.ownership._get_refresh_executor') as mock_executor:
+            with override_settings(PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_INTERVAL=-1):
+                get_user_ownership(self.site_configuration, self.username)
+        refresh, site_configuration, username, retrieve_entitlements = mock_executor.return_value.submit.call_args[0]
+
+        self.mock_user_data(self.username, response_code=500)
+        with mock.patch('{}.logger.exception'.format(LOGGER_NAME)) as mock_logger:
+            refresh(site_configuration, username, retrieve_entitlements)
+        self.assertTrue(mock_logger.called)
+        self.assertEqual(self.get_snapshot()['enrollments'], ENROLLMENTS)
+
+    @override_settings(PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_INTERVAL=-1)
+    def test_refresh_does_not_overwrite_changes(self):
+        """ Verify a refresh does not overwrite the changes made to the snapshot while the LMS was queried. """
+        course_id = 'course-v1:test-org+course+2'
+        get_user_ownership(self.site_configuration, self.username)
+        with mock.patch('ecommerce.programs.ownership._get_refresh_executor') as mock_executor:
+            get_user_ownership(self.site_configuration, self.username)
+        refresh, site_configuration, username, retrieve_entitlements = mock_executor.return_value.submit.call_args[0]
+
+        retrieve_enrollments = ownership._retrieve_enrollments  # pylint: disable=protected-access
+
+        def fulfill_enrollment(site_configuration, username):
+            enrollments = retrieve_enrollments(site_configuration, username)
+            add_enrollment_to_snapshot(self.site, self.username, course_id, 'verified')
+            return enrollments
+
+        with mock.patch.object(ownership, '_retrieve_enrollments', side_effect=fulfill_enrollment):
+            refresh(site_configuration, username, retrieve_entitlements)
+
+        self.assertEqual(
+            self.get_snapshot()['enrollments'],
+            ENROLLMENTS + [{'mode': 'verified', 'course_details': {'course_id': course_id}}]
+        )
+
+    def test_add_to_snapshot(self):
+        """ Verify fulfilled enrollments and entitlements are added to the snapshot. """
+        course_id = 'course-v1:test-org+course+2'
+        course_uuid = '268afbfc-cc1e-415b-a5d8-c58d955bcfc4'
+
+        # Nothing is recorded until the snapshot is retrieved.
+        add_enrollment_to_snapshot(self.site, self.username, course_id, 'verified')
+        self.assertIsNone(self.get_snapshot())
+
+        get_user_ownership(self.site_configuration, self.username)
+        add_enrollment_to_snapshot(self.site, self.username, course_id, 'verified')
+        add_enrollment_to_snapshot(self.site, self.username, course_id, 'professional')
+        add_entitlement_to_snapshot(self.site, self.username, course_uuid, 'verified')
+        enrollments, entitlements = get_user_ownership(self.site_configuration, self.username)
+        self.assertEqual(
+            enrollments,
+            ENROLLMENTS + [{'mode': 'professional', 'course_details': {'course_id': course_id}}]
+        )
+        self.assertEqual(entitlements, [])
+
+        get_user_ownership(self.site_configuration, self.username, True)
+        add_entitlement_to_snapshot(self.site, self.username, course_uuid, 'verified')
+        __, entitlements = get_user_ownership(self.site_configuration, self.username, True)
+        self.assertEqual(entitlements, ENTITLEMENTS + [{'mode': 'verified', 'course_uuid': course_uuid}])
+
+    def test_invalidate_snapshot(self):
+        """ Verify an invalidated snapshot is retrieved again. """
+        get_user_ownership(self.site_configuration, self.username)
+        invalidate_snapshot(self.site, self.username)
+        self.assertIsNone(self.get_snapshot())
+
+        get_user_ownership(self.site_configuration, self.username)
+        self.assert_lms_requests(2)
+
+    def test_condition_uses_snapshot(self):
+        """ Verify program conditions use the snapshot if the switch is active. """
+        self.site_configuration.enable_partial_program = True
+        condition = factories.ProgramCourseRunSeatsConditionFactory()
+        basket = BasketFactory(site=self.site, owner=UserFactory(username=self.username + 'x'))
+        self.mock_user_data(basket.owner.username, owned_products=ENROLLMENTS)
+
+        with override_switch(PROGRAM_OWNERSHIP_SNAPSHOT_SWITCH, active=True):
+            # pylint: disable=protected-access
+            enrollments, __ = condition._get_user_ownership_data(basket, retrieve_entitlements=False)
+        self.assertEqual(enrollments, ENROLLMENTS)
+        self.assertIsNotNone(django_cache.get(get_ownership_snapshot_cache_key(self.site, basket.owner.username)))
@@ -297,6 +297,12 @@ ENROLLMENT_FULFILLMENT_TIMEOUT = 7
 # Coupon code length
 VOUCHER_CODE_LENGTH = 16
 
+# Number of coupon codes generated, checked for collisions and inserted together
+VOUCHER_CODE_BATCH_SIZE = 1000
+
+# Number of coupon vouchers loaded together, with their redemptions, when generating a coupon report
+COUPON_REPORT_CHUNK_SIZE = 500
+
 THUMBNAIL_DEBUG = False
 
 OSCAR_FROM_EMAIL = 'testing@example.com'
@@ -267,13 +267,46 @@ CREDIT_PROVIDER_CACHE_TIMEOUT = 600
 # Anonymous User Calculate Cache timeout
 ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT = 3600  # Value is in seconds.
 
+# Display data of the products in baskets, rebuilt when a product is updated. Should not exceed the cache timeout
+# of the course metadata it is built from.
+BASKET_LINE_DISPLAY_CACHE_TIMEOUT = 3600  # Value is in seconds.
+
+# Maximum number of baskets calculated by a single batch basket calculate request
+BASKET_CALCULATE_BATCH_MAX_SIZE = 100
+
+# Maximum age of the process-local index of active offers used by the Applicator
+ACTIVE_OFFER_INDEX_TIMEOUT = 300  # Value is in seconds.
+
 # LMS API settings used for fetching information from LMS
 LMS_API_CACHE_TIMEOUT = 30  # Value is in seconds.
+# Snapshots of the enrollments and entitlements of users, used to evaluate program offers.
+# See ecommerce.programs.ownership.
+PROGRAM_OWNERSHIP_SNAPSHOT_TIMEOUT = 86400  # Value is in seconds.
+PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_INTERVAL = 300  # Value is in seconds.
+PROGRAM_OWNERSHIP_SNAPSHOT_REFRESH_WORKERS = 2
 # END URL CONFIGURATION
 
 VOUCHER_CACHE_TIMEOUT = 10  # Value is in seconds.
 
 SDN_CHECK_REQUEST_TIMEOUT = 5  # Value is in seconds.
+# Answers of the LMS embargo API are cached for this long, per user, IP address and courses. 0 disables it.
+EMBARGO_CHECK_CACHE_TIMEOUT = 300  # Value is in seconds.
+# Successful SDN searches are cached for this long, per list and normalized name, city and country. 0 disables it.
+SDN_CHECK_CACHE_TIMEOUT = 3600  # Value is in seconds.
+
+# Settings of the API clients shared by the requests of a process. See ecommerce.core.api_clients.
+API_CLIENT_POOL_MAXSIZE = 10  # Maximum number of pooled connections per site and service.
+API_CLIENT_TIMEOUT = 5  # Value is in seconds.
+# Timeouts of specific services, e.g. {'discovery': 10}, overriding API_CLIENT_TIMEOUT.
+API_CLIENT_TIMEOUTS = {}
+
+# Settings of the CyberSource SOAP client shared by the requests of a process.
+# Path of the SQLite file caching the WSDL and XSD documents. Defaults to the zeep cache directory of the user.
+CYBERSOURCE_WSDL_CACHE_PATH = None
+CYBERSOURCE_WSDL_CACHE_TIMEOUT = 86400  # Value is in seconds.
+
+# Access tokens are refreshed this many seconds before they expire.
+OAUTH2_ACCESS_TOKEN_REFRESH_MARGIN = 60  # Value is in seconds.
 
 # APP CONFIGURATION
 DJANGO_APPS = [
@@ -636,6 +669,13 @@ EDX_DRF_EXTENSIONS = {
 # created for the Enrollment code products.
 ENROLLMENT_CODE_EXIPRATION_DATE = datetime.datetime.now() + datetime.timedelta(weeks=520)
 ENROLLMENT_FULFILLMENT_TIMEOUT = 7
+# Maximum number of threads used to send the enrollment and entitlement requests of an order concurrently
+FULFILLMENT_MAX_WORKERS = 5
+
+# Number of orders whose refunds are created in the same transaction when refunding all orders of a course
+REFUND_BATCH_SIZE = 500
+# Maximum number of threads used to approve the refunds of a course concurrently
+REFUND_MAX_WORKERS = 10
 
 # Affiliate cookie key
 AFFILIATE_COOKIE_KEY = 'affiliate_id'
@@ -681,6 +721,22 @@ if os.environ.get('ENABLE_DJANGO_TOOLBAR', False):
 # Determines if events are actually sent to Segment. This should only be set to False for testing purposes.
 SEND_SEGMENT_EVENTS = True
 
+# Settings of the Segment clients shared by the requests of a process. See ecommerce.core.segment_clients.
+SEGMENT_MAX_QUEUE_SIZE = 10000  # Events queued beyond this number are dropped.
+SEGMENT_UPLOAD_SIZE = 100  # Maximum number of events uploaded in a single batch.
+SEGMENT_FLUSH_INTERVAL = 1  # Maximum time, in seconds, an event waits for its batch to fill up.
+# Path of a local file to which the events are appended, as JSON lines, instead of being sent to Segment.
+# This should only be set for testing purposes.
+SEGMENT_EVENTS_FILE_PATH = None
+
+# Side effects of placed orders run in the background. See ecommerce.extensions.checkout.side_effects.
+POST_CHECKOUT_SIDE_EFFECT_MAX_ATTEMPTS = 3
+# Side effects queued beyond this number, per process, are left to the run_order_side_effects command.
+POST_CHECKOUT_SIDE_EFFECT_MAX_QUEUE_SIZE = 1000
+# Side effects which are still pending, or running, this long after they were queued or last attempted are run by the
+# run_order_side_effects command.
+POST_CHECKOUT_SIDE_EFFECT_RETRY_DELAY = 600  # Value is in seconds.
+
 NEW_CODES_EMAIL_CONFIG = {
     'email_subject': 'New edX codes available',
     'from_email': 'customersuccess@edx.org',
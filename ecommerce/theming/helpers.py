@@ -5,9 +5,11 @@
 
 import logging
 import os
+from functools import lru_cache
 
 import waffle
 from django.conf import ImproperlyConfigured, settings
+from django.utils.functional import cached_property
 from path import Path
 from threadlocals.threadlocals import get_current_request
 
@@ -46,11 +48,7 @@ def get_current_theme():
     if not site_theme:
         return None
     try:
-        return Theme(
-            name=site_theme.theme_dir_name,
-            theme_dir_name=site_theme.theme_dir_name,
-            themes_base_dir=get_theme_base_dir(site_theme.theme_dir_name),
-        )
+        return _get_theme(site_theme.theme_dir_name, get_theme_base_dir(site_theme.theme_dir_name))
     except ValueError as e:
         # Log exception message and return None, so that open source theme is used instead
         logger.exception('Theme not found in any of the themes dirs. [%s]', e)
@@ -68,7 +66,7 @@ def get_theme_base_dir(theme_dir_name, suppress_error=False):
         (str): Base directory that contains the given theme
     """
     for themes_dir in get_theme_base_dirs():
-        if theme_dir_name in (_dir for _dir in os.listdir(themes_dir) if is_theme_dir(themes_dir / _dir)):
+        if theme_dir_name in _get_theme_dirs(themes_dir):
             return themes_dir
 
     if suppress_error:
@@ -155,12 +153,21 @@ def get_theme_base_dirs():
         raise ImproperlyConfigured("COMPREHENSIVE_THEME_DIRS must be a list.")
     if not all([isinstance(theme_dir, str) for theme_dir in theme_dirs]):
         raise ImproperlyConfigured("COMPREHENSIVE_THEME_DIRS must contain only strings.")
+
+    return list(_get_theme_base_dirs(tuple(theme_dirs)))
+
+
+@lru_cache(maxsize=None)
+def _get_theme_base_dirs(theme_dirs):
+    """
+    Validates the themes directories once per process, as they do not change while it runs.
+    """
     if not all([theme_dir.startswith("/") for theme_dir in theme_dirs]):
         raise ImproperlyConfigured("COMPREHENSIVE_THEME_DIRS must contain only absolute paths to themes dirs.")
     if not all([os.path.isdir(theme_dir) for theme_dir in theme_dirs]):
         raise ImproperlyConfigured("COMPREHENSIVE_THEME_DIRS must contain valid paths.")
 
-    return [Path(theme_dir) for theme_dir in theme_dirs]
+    return tuple(Path(theme_dir) for theme_dir in theme_dirs)
 
 
 def get_themes(themes_dir=None):
@@ -180,7 +187,7 @@ def get_themes(themes_dir=None):
     # pick only directories and discard files in themes directory
     themes = []
     for tdir in themes_dirs:
-        themes.extend([Theme(name, name, tdir) for name in get_theme_dirs(tdir)])
+        themes.extend([_get_theme(name, tdir) for name in get_theme_dirs(tdir)])
 
     return themes
 
@@ -188,8 +195,32 @@ def get_themes(themes_dir=None):
 def get_theme_dirs(themes_dir=None):
     """
     Return all theme dirs in given dir.
+
+    The themes directory is scanned once per process, as themes are deployed along with the code.
+    """
+    return list(_get_theme_dirs(Path(themes_dir)))
+
+
+@lru_cache(maxsize=None)
+def _get_theme_dirs(themes_dir):
+    return tuple(_dir for _dir in os.listdir(themes_dir) if is_theme_dir(themes_dir / _dir))
+
+
+@lru_cache(maxsize=None)
+def _get_theme(theme_dir_name, themes_base_dir):
     """
-    return [_dir for _dir in os.listdir(themes_dir) if is_theme_dir(themes_dir / _dir)]
+    Returns the Theme with the given directory, shared by all the sites and requests using it.
+    """
+    return Theme(name=theme_dir_name, theme_dir_name=theme_dir_name, themes_base_dir=themes_base_dir)
+
+
+def clear_theme_caches():
+    """
+    Clears the themes and themes directories memoized by the process, e.g. after themes are added to a directory.
+    """
+    _get_theme_base_dirs.cache_clear()
+    _get_theme_dirs.cache_clear()
+    _get_theme.cache_clear()
 
 
 def is_theme_dir(_dir):
@@ -250,7 +281,7 @@ class Theme:
     def path(self):
         return Path(self.themes_base_dir) / self.theme_dir_name
 
-    @property
+    @cached_property
     def template_dirs(self):
         return [
             self.path / 'templates',
@@ -3,6 +3,15 @@
 from django.conf import settings
 from django.contrib.sites.models import Site
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from edx_django_utils.cache import TieredCache
+
+from ecommerce.core.utils import get_cache_key
+
+
+def get_site_theme_cache_key(site_id):
+    return get_cache_key(resource='site_theme', site_id=site_id)
 
 
 class SiteTheme(models.Model):
@@ -31,9 +40,25 @@ class SiteTheme(models.Model):
         if not site:
             return None
 
-        theme = site.themes.first()
+        # The fields of the theme of the site are cached, rather than the default theme, so that a change of
+        # DEFAULT_SITE_THEME applies to sites without a theme straight away.
+        cache_key = get_site_theme_cache_key(site.id)
+        cached_response = TieredCache.get_cached_response(cache_key)
+        if cached_response.is_found:
+            theme = SiteTheme(site=site, **cached_response.value) if cached_response.value else None
+        else:
+            theme = site.themes.first()
+            theme_fields = {'id': theme.id, 'theme_dir_name': theme.theme_dir_name} if theme else None
+            TieredCache.set_all_tiers(cache_key, theme_fields, settings.THEME_CACHE_TIMEOUT)
 
         if (not theme) and settings.DEFAULT_SITE_THEME:
             theme = SiteTheme(site=site, theme_dir_name=settings.DEFAULT_SITE_THEME)
 
         return theme
+
+
+@receiver(post_save, sender=SiteTheme, dispatch_uid='theming.invalidate_site_theme_on_save')
+@receiver(post_delete, sender=SiteTheme, dispatch_uid='theming.invalidate_site_theme_on_delete')
+def invalidate_site_theme(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ Drops the cached theme of the site of the given SiteTheme, so that the change is picked up. """
+    TieredCache.delete_all_tiers(get_site_theme_cache_key(instance.site_id))
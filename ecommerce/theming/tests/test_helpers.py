@@ -4,12 +4,14 @@ Tests of comprehensive theming.
 
 
 from django.conf import ImproperlyConfigured, settings
+from django.contrib.sites.models import Site
 from django.test import override_settings
 from mock import patch
 
 from ecommerce.tests.testcases import TestCase
 from ecommerce.theming.helpers import (
     Theme,
+    clear_theme_caches,
     get_all_theme_template_dirs,
     get_current_site_theme,
     get_current_theme,
@@ -17,6 +19,7 @@ from ecommerce.theming.helpers import (
     get_theme_base_dirs,
     get_themes
 )
+from ecommerce.theming.models import SiteTheme
 from ecommerce.theming.test_utils import with_comprehensive_theme
 
 
@@ -195,3 +198,37 @@ class TestHelpers(TestCase):
         Tests get_theme_base_dir returns None if theme is not found istead of raising an error.
         """
         self.assertIsNone(get_theme_base_dir("non-existent-theme", suppress_error=True))
+
+    @with_comprehensive_theme('test-theme')
+    def test_get_current_theme_memoized(self):
+        """
+        Tests the current theme is resolved without scanning the themes directories again.
+        """
+        clear_theme_caches()
+        self.addCleanup(clear_theme_caches)
+        theme = get_current_theme()
+        themes = get_themes()
+
+        with patch('ecommerce.theming.helpers.os') as mock_os:
+            self.assertIs(get_current_theme(), theme)
+            self.assertIs(get_current_theme().template_dirs, theme.template_dirs)
+            self.assertEqual(get_themes(), themes)
+            self.assertFalse(mock_os.mock_calls)
+
+    def test_site_theme_cached(self):
+        """
+        Tests the theme of a site is looked up once, until a theme of the site is saved or deleted.
+        """
+        site = Site.objects.create(domain='cached-theme.org', name='cached-theme.org')
+        self.assertEqual(SiteTheme.get_theme(site).theme_dir_name, settings.DEFAULT_SITE_THEME)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(SiteTheme.get_theme(site).theme_dir_name, settings.DEFAULT_SITE_THEME)
+
+        site_theme = SiteTheme.objects.create(site=site, theme_dir_name='test-theme-2')
+        self.assertEqual(SiteTheme.get_theme(site), site_theme)
+        with self.assertNumQueries(0):
+            self.assertEqual(SiteTheme.get_theme(site).theme_dir_name, 'test-theme-2')
+
+        site_theme.delete()
+        self.assertEqual(SiteTheme.get_theme(site).theme_dir_name, settings.DEFAULT_SITE_THEME)